@@ -0,0 +1,95 @@
+import heapq
+import itertools
+import math
+import time
+
+
+class AnimationScheduler:
+    """Runs any number of animations from the Tk event loop without blocking it.
+
+    An animation is a generator: each step does its drawing and yields the
+    delay in milliseconds until the next step. All running animations share
+    a single after() timer that fires when the earliest one is due. Closing
+    the generator cancels the animation, so a try/finally inside it is the
+    place to restore whatever it changed.
+
+    after and after_cancel are the scheduling functions of the Tk root.
+    """
+
+    def __init__(self, after, after_cancel, clock=time.monotonic):
+        self.after = after
+        self.after_cancel = after_cancel
+        self.clock = clock
+        self._queue = []  # Heap of (due time, id)
+        self._running = {}  # Id -> (generator, tag)
+        self._ids = itertools.count(1)
+        self._timer = None
+        self._timer_due = None
+
+    def __len__(self):
+        return len(self._running)
+
+    def start(self, animation, tag=None):
+        """Run a generator animation, its first step happens right away"""
+        anim_id = next(self._ids)
+        self._running[anim_id] = (animation, tag)
+        self._step(anim_id, self.clock())
+        self._schedule()
+        return anim_id
+
+    def cancel(self, anim_id):
+        entry = self._running.pop(anim_id, None)
+        if entry is not None:
+            entry[0].close()
+        self._schedule()
+
+    def cancel_tag(self, tag):
+        """Cancel every running animation started with tag"""
+        for anim_id, (animation, anim_tag) in list(self._running.items()):
+            if anim_tag == tag:
+                self.cancel(anim_id)
+
+    def cancel_all(self):
+        for anim_id in list(self._running):
+            self.cancel(anim_id)
+
+    def _step(self, anim_id, now):
+        animation = self._running[anim_id][0]
+        try:
+            delay = next(animation)
+        except StopIteration:
+            self._running.pop(anim_id, None)
+            return
+        except Exception:
+            self._running.pop(anim_id, None)
+            raise
+        heapq.heappush(self._queue, (now + delay / 1000.0, anim_id))
+
+    def _tick(self):
+        self._timer = None
+        self._timer_due = None
+        now = self.clock()
+        while self._queue and self._queue[0][0] <= now:
+            due, anim_id = heapq.heappop(self._queue)
+            if anim_id in self._running:
+                self._step(anim_id, now)
+        self._schedule()
+
+    def _schedule(self):
+        # Drop heap entries of animations that were cancelled
+        while self._queue and self._queue[0][1] not in self._running:
+            heapq.heappop(self._queue)
+        if not self._queue:
+            if self._timer is not None:
+                self.after_cancel(self._timer)
+                self._timer = None
+                self._timer_due = None
+            return
+        due = self._queue[0][0]
+        if self._timer is not None and self._timer_due <= due:
+            return
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+        delay_ms = max(int(math.ceil((due - self.clock()) * 1000 - 1e-6)), 0)
+        self._timer = self.after(delay_ms, self._tick)
+        self._timer_due = due
@@ -0,0 +1,407 @@
+import asyncio
+import json
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import timedelta
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from csv_import import check_duration, normalize_hour
+from taskstore import PRIORITIES, Task, key_week, new_task, parse_date, split_key, to_json, week_id, week_start
+
+# Only this machine can connect
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+# Virtual event telling the Tk thread that API requests queued calls
+API_CALLS_EVENT = "<<ApiCalls>>"
+# Largest request body accepted, e.g. a batch of many tasks
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+# Host headers accepted, anything else may be a web page using DNS rebinding
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+# JSON type a task field sent by a client must have, and how to name it in errors
+FIELD_TYPES = {
+    "name": (str, "a string"),
+    "notes": (str, "a string"),
+    "completed": (bool, "true or false"),
+    "created": (str, "a \"YYYY-MM-DD HH:MM\" string"),
+    "duration": (int, "a whole number of minutes")
+}
+
+
+class ApiError(Exception):
+    """A request that can't be served, answered with status and the message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MainThreadCalls:
+    """Functions handed from other threads to the Tk thread.
+
+    submit() may be called from any thread and returns a Future for the
+    result. The first call queued after a run calls wake(), which must be
+    safe from any thread and make the Tk thread call run_pending() soon,
+    so the calls may use the task store and widgets like any event
+    handler. Nothing runs on the Tk thread while no calls come in.
+    """
+
+    def __init__(self, wake):
+        self.wake = wake
+        self._calls = queue.Queue()
+        self._lock = threading.Lock()
+        self._woken = False  # wake() was called and run_pending() hasn't run since
+        self._running = False
+
+    def start(self):
+        with self._lock:
+            self._running = True
+            wake = not self._calls.empty() and not self._woken
+            self._woken |= wake
+        if wake:
+            self.wake()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+
+    def submit(self, function, *args):
+        future = Future()
+        self._calls.put((future, function, args))
+        with self._lock:
+            wake = self._running and not self._woken
+            self._woken |= wake
+        if wake:
+            self.wake()
+        return future
+
+    def run_pending(self):
+        """Run the calls submitted so far, on the calling (Tk) thread"""
+        # Calls submitted from here on wake the Tk thread again
+        with self._lock:
+            self._woken = False
+        while True:
+            try:
+                future, function, args = self._calls.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+def task_from_json(data):
+    """Task from a request's dict form, raising ApiError if it isn't a valid task"""
+    if not isinstance(data, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "A task must be a JSON object")
+    if not isinstance(data.get("name"), str) or not data["name"].strip():
+        raise ApiError(HTTPStatus.BAD_REQUEST, "A task needs a name")
+    if data.get("priority", "medium") not in PRIORITIES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Priority must be one of {', '.join(PRIORITIES)}")
+    if data.get("series") is not None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Recurring tasks can only be added in the app")
+    # Task.from_dict() would take e.g. "completed": "false" as true
+    for field, (kind, description) in FIELD_TYPES.items():
+        value = data.get(field)
+        if field in data and (not isinstance(value, kind) or kind is int and isinstance(value, bool)):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"{field} must be {description}")
+    try:
+        # Fields left out get their defaults, the creation time is now
+        task = Task.from_dict(dict(new_task(data["name"]), **data))
+    except (TypeError, ValueError) as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid task: {e}") from e
+    try:
+        # A snapshot can't hold just any number, and nothing lasts longer than a day
+        check_duration(task.duration)
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e).capitalize()) from e
+    return task
+
+
+def check_key(key):
+    """key if it names a slot of the grid, "YYYY-MM-DD|H:00", raising ApiError otherwise"""
+    try:
+        # Only the exact form of the keys the grid uses, e.g. not "08:00" or "8:30"
+        valid = key_week(key) is not None and normalize_hour(split_key(key)[1]) == split_key(key)[1]
+    except (AttributeError, ValueError):
+        valid = False
+    if not valid:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Task key {key!r} is not \"YYYY-MM-DD|H:00\" with an hour of the schedule")
+    return key
+
+
+def slot_order(key):
+    """Sort key for task keys: by date, then by time of day"""
+    day_text, hour = split_key(key)
+    return day_text, tuple(int(part) for part in hour.split(":"))
+
+
+def find_tasks(storage, weeks, recurrences, start=None, end=None, priority=None, completed=None):
+    """key -> task of the tasks dated start..end (both optional) that match the filters.
+
+    weeks maps week id -> tasks for the weeks as they are in memory, the
+    others are read from storage one week at a time, so this is safe off
+    the Tk thread. A storage with query(), i.e. a database, filters its
+    tasks itself. Occurrences of recurring tasks are included when both
+    start and end are given. The result is sorted by date and time.
+    """
+    queried = hasattr(storage, "query")
+    if start is not None and end is not None:
+        ids = []
+        monday = week_start(start)
+        while monday <= end:
+            ids.append(week_id(monday))
+            monday += timedelta(weeks=1)
+    else:
+        first = week_id(start) if start is not None else ""
+        last = week_id(end) if end is not None else "~"
+        stored = set() if queried else set(storage.weeks())
+        ids = sorted(week for week in stored | set(weeks) if first <= week <= last)
+    tasks = {}
+    if queried:
+        # Only the weeks in memory are scanned here
+        tasks.update((key, task) for key, task in storage.query(start, end, priority, completed).items()
+                     if key_week(key) not in weeks)
+    for week in ids:
+        if week in weeks:
+            tasks.update(weeks[week])
+        elif not queried:
+            tasks.update(storage.read_week(week))
+    if start is not None and end is not None:
+        taken = {}  # Week -> stored tasks, for the weeks the query filtered
+        for key, task in recurrences.expand(start, end).items():
+            week = key_week(key)
+            if queried and week not in weeks:
+                # A stored task takes the slot of an occurrence, even one the filters left out
+                if week not in taken:
+                    taken[week] = storage.read_week(week)
+                if key in taken[week]:
+                    continue
+            tasks.setdefault(key, task)
+
+    first = start.isoformat() if start is not None else ""
+    last = end.isoformat() if end is not None else "~"
+    # Tasks from the query match already, this checks the rest
+    found = [key for key, task in tasks.items()
+             if first <= split_key(key)[0] <= last
+             and (priority is None or task["priority"] == priority)
+             and (completed is None or bool(task["completed"]) == completed)]
+    found.sort(key=slot_order)
+    return {key: tasks[key] for key in found}
+
+
+def apply_operations(app, operations):
+    """Apply a batch of task operations to the app, all or none, and return the results.
+
+    Runs on the Tk thread. Each operation is {"op": "put", "key", "task"},
+    {"op": "update", "key", "fields"} or {"op": "delete", "key"}. Every
+    operation is checked before anything changes, then all of them are
+    applied together, repainted once and undone as one step.
+    """
+    if not isinstance(operations, list):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "operations must be a list")
+    changes = {}
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "An operation must be a JSON object")
+        op, key = operation.get("op"), check_key(operation.get("key"))
+        if op == "put":
+            changes[key] = task_from_json(operation.get("task"))
+        elif op in ("update", "delete"):
+            fields = operation.get("fields")
+            if op == "update" and not isinstance(fields, dict):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "update needs the fields to change")
+            task = changes[key] if key in changes else app.get_task(key)
+            if task is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"No task at {key}")
+            if task.series is not None:
+                raise ApiError(HTTPStatus.CONFLICT, f"The task at {key} repeats, edit it in the app")
+            changes[key] = task_from_json(dict(task.to_dict(), **fields)) if op == "update" else None
+        else:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown operation {op!r}")
+    with app.undoable("changes from the API"), app.store.batch():
+        for key, task in changes.items():
+            app.set_task(key, task)
+    if changes:
+        app.status_var.set(f"Applied {len(changes)} change(s) from the API")
+    return changes
+
+
+class ApiServer:
+    """Loopback-only HTTP/JSON API to the tasks of a running app.
+
+    GET /tasks?start=&end=&priority=&completed= lists tasks (dates as
+    YYYY-MM-DD), GET, PUT, PATCH and DELETE /tasks/<key> work on one task
+    and POST /batch applies {"operations": [...]} (see apply_operations())
+    in a single round trip. Connections are kept alive between requests.
+
+    The server runs an asyncio loop on a thread of its own. Requests are
+    parsed and answered there, and what needs the app's state runs on the
+    Tk thread through MainThreadCalls. Tasks of weeks that aren't in memory
+    are read from storage on the server thread, so big queries don't hold
+    up the app. Writes must be sent as application/json with a loopback
+    Host header, which web pages can't do.
+    """
+
+    def __init__(self, app, port=API_PORT):
+        self.app = app
+        self.port = port
+        self.calls = MainThreadCalls(self._wake)
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        """Start serving, port 0 picks a free port; raises OSError if the port is taken"""
+        started = Future()
+        self.app.root.bind(API_CALLS_EVENT, lambda event: self.calls.run_pending())
+        self._thread = threading.Thread(target=self._run, args=(started,), name="autodo-api", daemon=True)
+        self._thread.start()
+        self.port = started.result()
+        self.calls.start()
+
+    def stop(self):
+        self.calls.stop()
+        self.app.root.unbind(API_CALLS_EVENT)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(1)
+            self._loop = None
+
+    def _wake(self):
+        # Tkinter hands an event generated on another thread to the Tk thread
+        self.app.root.event_generate(API_CALLS_EVENT, when="tail")
+
+    def _run(self, started):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            server = loop.run_until_complete(asyncio.start_server(self._serve, API_HOST, self.port))
+        except OSError as e:
+            loop.close()
+            started.set_exception(e)
+            return
+        self._loop = loop
+        started.set_result(server.sockets[0].getsockname()[1])
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    async def _serve(self, reader, writer):
+        """Answer the requests of one connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_REQUEST_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, result = HTTPStatus.OK, await self._handle(method, target, headers, body)
+                except ApiError as e:
+                    status, result = e.status, {"error": str(e)}
+                except Exception as e:  # E.g. an unreadable week file, or a bug; the connection stays usable
+                    status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, result, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # Gone, or not speaking HTTP
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, result, keep_alive):
+        # The encoding of a big answer would hold up other connections, so it runs on a worker
+        body = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: json.dumps(result, default=to_json, ensure_ascii=False).encode("utf-8"))
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _handle(self, method, target, headers, body):
+        """Result of a request as JSON data, raising ApiError if it can't be served"""
+        if headers.get("host", "").rsplit(":", 1)[0] not in LOOPBACK_HOSTS:
+            raise ApiError(HTTPStatus.FORBIDDEN, "Only local clients are served")
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        data = None
+        if method in ("PUT", "PATCH", "POST"):
+            if headers.get("content-type", "").split(";")[0].strip() != "application/json":
+                raise ApiError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Send the body as application/json")
+            try:
+                data = json.loads(body)
+            except ValueError as e:
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}") from e
+
+        if parts == ["tasks"] and method == "GET":
+            return {"tasks": await self._find(**self._filters(parse_qs(url.query)))}
+        if len(parts) == 2 and parts[0] == "tasks":
+            key = check_key(parts[1])
+            if method == "GET":
+                day = parse_date(split_key(key)[0])
+                task = (await self._find(start=day, end=day)).get(key)
+                if task is None:
+                    raise ApiError(HTTPStatus.NOT_FOUND, f"No task at {key}")
+                return {"key": key, "task": task}
+            operation = {"PUT": {"op": "put", "key": key, "task": data},
+                         "PATCH": {"op": "update", "key": key, "fields": data},
+                         "DELETE": {"op": "delete", "key": key}}.get(method)
+            if operation is None:
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported here")
+            changes = await self._call(apply_operations, self.app, [operation])
+            return {"key": key, "task": changes[key]}
+        if parts == ["batch"] and method == "POST":
+            if not isinstance(data, dict):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Send {\"operations\": [...]}")
+            changes = await self._call(apply_operations, self.app, data.get("operations"))
+            return {"count": len(changes), "tasks": changes}
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No {method} {url.path}")
+
+    async def _call(self, function, *args):
+        """Result of function(*args) run on the Tk thread"""
+        return await asyncio.wrap_future(self.calls.submit(function, *args))
+
+    async def _find(self, **filters):
+        # Unsaved changes are taken from the app, saved weeks read here
+        weeks, recurrences = await self._call(self.app.read_view)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: find_tasks(self.app.storage, weeks, recurrences, **filters))
+
+    @staticmethod
+    def _filters(query):
+        """find_tasks() arguments from the query string of GET /tasks"""
+        filters = {}
+        try:
+            for name in ("start", "end"):
+                if name in query:
+                    filters[name] = parse_date(query[name][0])
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Dates must be YYYY-MM-DD") from e
+        if "priority" in query:
+            filters["priority"] = query["priority"][0]
+        if "completed" in query:
+            filters["completed"] = query["completed"][0].lower() in ("1", "true", "yes")
+        return filters
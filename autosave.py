@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+
+# Quiet period after the last edit before an autosave starts
+AUTOSAVE_DELAY_MS = 1500
+# How often the main thread checks for finished background saves
+POLL_INTERVAL_MS = 50
+
+
+class AutoSaver:
+    """Debounced saving on a background thread.
+
+    schedule() is called after every edit and restarts a timer, so a burst
+    of edits results in a single save once things calm down. When the timer
+    fires, prepare() runs on the main thread and returns a (write, on_done)
+    pair, or None if there is nothing to save. write() does the actual disk
+    I/O on a single worker thread, which keeps writes ordered and the Tk
+    event loop free. Results are handed back through a queue that the main
+    thread polls, so on_done(error) and on_status(message) are always called
+    on the main thread.
+
+    after and after_cancel are the scheduling functions of the Tk root (or
+    any object with the same interface), which keeps this class free of Tk
+    imports.
+    """
+
+    def __init__(self, after, after_cancel, prepare, on_status=None, delay_ms=AUTOSAVE_DELAY_MS):
+        self.after = after
+        self.after_cancel = after_cancel
+        self.prepare = prepare
+        self.on_status = on_status
+        self.delay_ms = delay_ms
+        self._timer = None
+        self._poll_timer = None
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._in_flight = 0
+        self._worker = None
+
+    @property
+    def busy(self):
+        return self._in_flight > 0
+
+    def schedule(self):
+        """Start or restart the debounce timer"""
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+        self._timer = self.after(self.delay_ms, self._fire)
+
+    def save_now(self):
+        """Save immediately, skipping the debounce delay.
+
+        Returns False if there was nothing to save.
+        """
+        self._cancel_timer()
+        return self._submit()
+
+    def flush(self, timeout=None):
+        """Save pending changes and block until all writes are finished"""
+        self.save_now()
+        return self.wait(timeout)
+
+    def wait(self, timeout=None):
+        """Drop any pending autosave and block until running writes finish"""
+        self._cancel_timer()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._in_flight:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                result = self._results.get(timeout=remaining)
+            except queue.Empty:
+                return False
+            self._finish(*result)
+        return True
+
+    def _fire(self):
+        self._timer = None
+        self._submit()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+
+    def _submit(self):
+        prepared = self.prepare()
+        if prepared is None:
+            return False
+        write, on_done = prepared
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="autodo-autosave", daemon=True)
+            self._worker.start()
+        self._in_flight += 1
+        self._status("Saving...")
+        self._jobs.put((write, on_done))
+        if self._poll_timer is None:
+            self._poll_timer = self.after(POLL_INTERVAL_MS, self._poll)
+        return True
+
+    def _run(self):
+        while True:
+            write, on_done = self._jobs.get()
+            try:
+                write()
+            except Exception as e:
+                self._results.put((on_done, e))
+            else:
+                self._results.put((on_done, None))
+
+    def _poll(self):
+        self._poll_timer = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(*result)
+        if self._in_flight:
+            self._poll_timer = self.after(POLL_INTERVAL_MS, self._poll)
+
+    def _finish(self, on_done, error):
+        self._in_flight -= 1
+        if on_done is not None:
+            on_done(error)
+        if error is not None:
+            self._status(f"Save failed: {error}")
+        elif not self._in_flight:
+            self._status(f"All changes saved at {time.strftime('%H:%M:%S')}")
+
+    def _status(self, message):
+        if self.on_status is not None:
+            self.on_status(message)
@@ -0,0 +1,471 @@
+"""Benchmarks for the task store, persistence, search, recurrences, export and the grid.
+
+Synthetic schedules of each size are written to a temporary directory and
+every benchmark is timed a few times on them. Results are written as JSON
+and can be compared with the results of another version:
+
+    python benchmark.py --sizes 100,10000 --output new.json
+    python benchmark.py --sizes 100,10000 --compare old.json
+
+The grid benchmarks need tkinter and a display. Without $DISPLAY they run
+under Xvfb when it is installed and are skipped otherwise.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from csv_export import COLUMN_SETS, csv_rows, iter_tasks, write_csv
+from recurrence import Recurrences, make_rule, new_series
+from searchindex import SearchIndex
+from storage import WeeklyStorage, open_storage
+from taskstore import DAYS, HOURS, PRIORITIES, TaskStore, date_key, key_week, new_task, week_id, week_start
+
+DEFAULT_SIZES = (100, 10000, 1000000)
+DEFAULT_REPEAT = 3
+RESULTS_FORMAT = 1
+# Tasks per synthetic week, out of len(DAYS) * len(HOURS) slots
+TASKS_PER_WEEK = 100
+# One recurring series per this many tasks
+TASKS_PER_SERIES = 1000
+# Tasks changed before each timed save
+SAVE_BATCH = 100
+# A benchmark regresses when its median grows by more than this fraction...
+REGRESSION_THRESHOLD = 0.2
+# ...and by more than this many seconds, so that noise in tiny timings is ignored
+NOISE_FLOOR = 0.001
+XVFB_STARTUP_SECONDS = 5
+# Storage backend -> SAVE_FILE extension selecting it
+BACKENDS = {"json": ".json", "sqlite": ".db", "snapshot": ".snap"}
+# Settings of a run that change what is timed, results differing in one can't be compared...
+WORKLOAD_SETTINGS = ("format", "backend", "workload")
+# ...and ones that only make the timings less alike
+MACHINE_SETTINGS = ("repeat", "python", "platform")
+
+WORDS = ["review", "report", "meeting", "call", "study", "python", "email", "plan", "budget",
+         "design", "gym", "lunch", "client", "write", "read", "project", "team", "doctor",
+         "shopping", "invoice", "deploy", "sprint", "backup", "garden", "piano", "dentist"]
+SEARCH_QUERIES = ["report", "pro", "team meeting", "py stu", "zzz"]
+
+
+def synthetic_tasks(count, first_monday, seed=0):
+    """Yield count (key, task) pairs, TASKS_PER_WEEK per week from first_monday on"""
+    rng = random.Random(seed)
+    slots = [(day, hour) for day in range(len(DAYS)) for hour in HOURS]
+    monday = first_monday
+    while count > 0:
+        for day, hour in sorted(rng.sample(slots, min(TASKS_PER_WEEK, count)), key=lambda slot: slot[0]):
+            task = new_task(
+                " ".join(rng.sample(WORDS, 2)).capitalize(),
+                priority=rng.choice(PRIORITIES),
+                notes=" ".join(rng.sample(WORDS, 4)) if rng.random() < 0.3 else "",
+                completed=rng.random() < 0.2,
+                created="2025-01-01 09:00",
+                duration=rng.choice((60, 60, 60, 30, 90, 120))
+            )
+            yield date_key(monday + timedelta(days=day), hour), task
+        count -= TASKS_PER_WEEK
+        monday += timedelta(weeks=1)
+
+
+def synthetic_series(count, first_monday, seed=0):
+    """Series id -> recurring series, a mix of daily, weekday and weekly rules"""
+    rng = random.Random(seed)
+    series = {}
+    for i in range(count):
+        start = first_monday - timedelta(days=rng.randrange(365))
+        rule = rng.choice((
+            make_rule("daily", start),
+            make_rule("weekly", start, by_day=[0, 1, 2, 3, 4]),
+            make_rule("weekly", start, interval=rng.choice((1, 2)))
+        ))
+        task = new_task(" ".join(rng.sample(WORDS, 2)).capitalize(), repeat="Weekly")
+        series[f"bench-{i}"] = new_series(task, rng.choice(HOURS), rule)
+    return series
+
+
+class Fixture:
+    """A synthetic schedule of size tasks saved in directory"""
+
+    def __init__(self, size, directory, seed=0, backend="json"):
+        self.size = size
+        self.directory = directory
+        self.path = os.path.join(directory, "schedule" + BACKENDS[backend])
+        # The schedule starts in the current week, which is the one the app opens
+        self.monday = week_start(date.today())
+        self.week = week_id(self.monday)
+        self.tasks = dict(synthetic_tasks(size, self.monday, seed))
+        self.series = synthetic_series(max(1, size // TASKS_PER_SERIES), self.monday, seed)
+
+        storage = open_storage(self.path)
+        weeks = WeeklyStorage.group_by_week(self.tasks)
+        if hasattr(storage, "replace_all"):
+            # Compacting a snapshot rewrites all of it, write it once instead
+            storage.replace_all(sorted(weeks.items()))
+        else:
+            for week, tasks in weeks.items():
+                storage.compact(week, tasks)
+        storage.compact_series(self.series)
+        self.weeks = storage.weeks()
+
+    def changed_tasks(self, count=SAVE_BATCH):
+        """count edited tasks of the current week, as an autosave would write them"""
+        keys = [key for key in self.tasks if key_week(key) == self.week][:count]
+        return {key: dict(self.tasks[key], completed=not self.tasks[key]["completed"]) for key in keys}
+
+
+def measure(run, repeat, setup=None):
+    """Time run() repeat times; setup() runs untimed before each run and its result is passed on"""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        gc.collect()
+        start = time.perf_counter()
+        if setup is not None:
+            run(state)
+        else:
+            run()
+        times.append(time.perf_counter() - start)
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+        "runs": repeat
+    }
+
+
+# Headless benchmarks, each returns name -> timings
+
+def bench_store(fixture, repeat):
+    results = {"store.load": measure(lambda: TaskStore().load(fixture.tasks), repeat)}
+    store = TaskStore(fixture.tasks)
+    results["store.query"] = measure(lambda: [store.query(week=fixture.week, priority=priority)
+                                              for priority in PRIORITIES], repeat)
+    keys = list(fixture.tasks)[:SAVE_BATCH]
+    results["store.conflicts"] = measure(lambda: [store.conflicts(key) for key in keys], repeat)
+    return results
+
+
+def bench_persistence(fixture, repeat):
+    results = {
+        "storage.load_week": measure(lambda: open_storage(fixture.path).load_week(fixture.week), repeat),
+        "storage.load_all": measure(lambda: sum(len(tasks) for week, tasks in open_storage(fixture.path).iter_weeks()),
+                                    repeat)
+    }
+    storage = open_storage(fixture.path)
+    if hasattr(storage, "query"):
+        # Every open high-priority task of the first month, straight from the indexes
+        month_end = fixture.monday + timedelta(days=30)
+        results["storage.query"] = measure(
+            lambda: storage.query(fixture.monday, month_end, priority="high", completed=False), repeat)
+    changes = fixture.changed_tasks()
+    results["storage.save"] = measure(lambda: storage.append(changes), repeat)
+    week_tasks = storage.load_week(fixture.week)
+    results["storage.compact"] = measure(lambda: storage.compact(fixture.week, week_tasks), repeat)
+    return results
+
+
+def bench_search(fixture, repeat):
+    store = TaskStore(fixture.tasks)
+    results = {"search.index": measure(lambda: SearchIndex(store), repeat)}
+    index = SearchIndex(store)
+    results["search.query"] = measure(lambda: [index.search(query) for query in SEARCH_QUERIES], repeat)
+    return results
+
+
+def bench_recurrence(fixture, repeat):
+    recurrences = Recurrences(fixture.series)
+    return {
+        "recurrence.expand_week": measure(lambda: recurrences.expand_week(fixture.monday), repeat),
+        "recurrence.expand_year": measure(
+            lambda: recurrences.expand(fixture.monday, fixture.monday + timedelta(days=364)), repeat)
+    }
+
+
+def bench_csv_export(fixture, repeat):
+    storage = open_storage(fixture.path)
+    path = os.path.join(fixture.directory, "export.csv")
+
+    def export():
+        write_csv(path, csv_rows(iter_tasks(storage, fixture.weeks), COLUMN_SETS["All fields"]))
+
+    return {"csv.export": measure(export, repeat)}
+
+
+HEADLESS_BENCHMARKS = [bench_store, bench_persistence, bench_search, bench_recurrence, bench_csv_export]
+
+
+# Grid benchmarks, run through the real application window
+
+def bench_gui(fixture, repeat):
+    import gui
+
+    def open_app(**options):
+        return gui.Autodo("Benchmark", "1200x800", fixture.path, **options)
+
+    def close_app(app):
+        app.autosaver.wait()
+        app.root.destroy()
+
+    def timed_with_app(action, prepare=None, **options):
+        def setup():
+            app = open_app(**options)
+            if prepare is not None:
+                prepare(app)
+            return app
+
+        def run(app):
+            try:
+                action(app)
+            finally:
+                close_app(app)
+        return measure(run, repeat, setup=setup)
+
+    def build_grid(app):
+        app.create_week_schedule()
+        app.root.update()
+
+    def edit(app):
+        app.load_schedule()
+        with app.store.batch():
+            for key, task in fixture.changed_tasks().items():
+                app.store.add(key, task)
+
+    def save(app):
+        app.save_schedule()
+        app.autosaver.wait()
+
+    def next_week(app):
+        app.next_week()
+        app.root.update()
+
+    def build_grid_and_prefetch(app):
+        build_grid(app)
+        app.week_cache.get(week_id(app.week_start + timedelta(weeks=1)))
+
+    def add_daily_task(app):
+        build_grid(app)
+        app.add_recurring_tasks("Monday", "9:00", "Daily", "medium", "", "Daily")
+        app.root.update()
+
+    def undo(app):
+        app.undo()
+        app.root.update()
+
+    return {
+        "gui.load_schedule": timed_with_app(lambda app: app.load_schedule()),
+        "gui.save_schedule": timed_with_app(save, prepare=edit),
+        "gui.grid.entries": timed_with_app(build_grid),
+        "gui.grid.fast_start": timed_with_app(build_grid, fast_start=True),
+        "gui.grid.canvas": timed_with_app(build_grid, render_mode="canvas"),
+        "gui.week.next": timed_with_app(next_week, prepare=build_grid),
+        "gui.week.next_prefetched": timed_with_app(next_week, prepare=build_grid_and_prefetch),
+        "gui.undo.recurring_task": timed_with_app(undo, prepare=add_daily_task)
+    }
+
+
+@contextmanager
+def virtual_display():
+    """Yield True if a display is available, starting Xvfb if there is none yet"""
+    if os.environ.get("DISPLAY"):
+        yield True
+        return
+    if shutil.which("Xvfb") is None:
+        yield False
+        return
+    display = f":{os.getpid() % 1000 + 100}"
+    server = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    try:
+        yield wait_for_display(XVFB_STARTUP_SECONDS)
+    finally:
+        del os.environ["DISPLAY"]
+        server.terminate()
+        server.wait()
+
+
+def wait_for_display(timeout):
+    """Whether tkinter can open the display within timeout seconds"""
+    import tkinter as tk
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            tk.Tk().destroy()
+            return True
+        except tk.TclError:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.1)
+
+
+def has_tkinter():
+    return importlib.util.find_spec("tkinter") is not None
+
+
+def version_label():
+    """git describe of the working tree, or "unknown" outside a checkout"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, gui=True, label=None, log=None, backend="json"):
+    """Run every benchmark for each size and return the results document"""
+    results = {}
+    skipped = []
+    with tempfile.TemporaryDirectory(prefix="autodo-bench-") as root_dir:
+        for size in sizes:
+            directory = os.path.join(root_dir, str(size))
+            os.makedirs(directory)
+            start = time.perf_counter()
+            fixture = Fixture(size, directory, backend=backend)
+            if log:
+                log(f"{size} tasks: generated in {time.perf_counter() - start:.2f} s")
+            benchmarks = list(HEADLESS_BENCHMARKS)
+            if gui:
+                benchmarks.append(bench_gui)
+            for benchmark in benchmarks:
+                if benchmark is bench_gui:
+                    if not has_tkinter():
+                        skipped.append(f"gui/{size}: tkinter is not available")
+                        continue
+                    with virtual_display() as available:
+                        if not available:
+                            skipped.append(f"gui/{size}: no display and no Xvfb")
+                            continue
+                        timings = benchmark(fixture, repeat)
+                else:
+                    timings = benchmark(fixture, repeat)
+                for name, timing in timings.items():
+                    results[f"{name}/{size}"] = timing
+                    if log:
+                        log(f"  {name:<24} {format_seconds(timing['median'])}")
+            del fixture
+    return {
+        "label": label or version_label(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": list(sizes),
+        **workload_settings(backend),
+        "repeat": repeat,
+        "results": results,
+        "skipped": skipped
+    }
+
+
+def workload_settings(backend):
+    """The WORKLOAD_SETTINGS of a run with backend"""
+    return {
+        "format": RESULTS_FORMAT,
+        "backend": backend,
+        "workload": {"tasks_per_week": TASKS_PER_WEEK, "tasks_per_series": TASKS_PER_SERIES, "save_batch": SAVE_BATCH}
+    }
+
+
+def setting_differences(old, new, settings):
+    """"name: old -> new" for each of settings that differs between two results"""
+    return [f"{name}: {old.get(name)} -> {new.get(name)}" for name in settings if old.get(name) != new.get(name)]
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD, noise_floor=NOISE_FLOOR):
+    """Return (name, old median, new median, ratio, regressed) for benchmarks in both results.
+
+    Raises ValueError if the two runs timed different work, e.g. another
+    storage backend, as every difference would look like a regression.
+    """
+    differences = setting_differences(old, new, WORKLOAD_SETTINGS)
+    if differences:
+        raise ValueError(f"the results are of different runs ({'; '.join(differences)})")
+    rows = []
+    for name, timing in sorted(new["results"].items()):
+        if name not in old["results"]:
+            continue
+        before = old["results"][name]["median"]
+        after = timing["median"]
+        ratio = after / before if before else float("inf")
+        regressed = after > before * (1 + threshold) and after - before > noise_floor
+        rows.append((name, before, after, ratio, regressed))
+    return rows
+
+
+def format_seconds(seconds):
+    if seconds < 1:
+        return f"{seconds * 1000:9.2f} ms"
+    return f"{seconds:9.2f} s "
+
+
+def print_comparison(rows, old_label, new_label, out=sys.stdout):
+    print(f"{'benchmark':<36} {old_label[:12]:>12} {new_label[:12]:>12}  change", file=out)
+    for name, before, after, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<36} {format_seconds(before)} {format_seconds(after)} {(ratio - 1) * 100:+7.1f}%{flag}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Autodo on synthetic schedules")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated schedule sizes in tasks (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per benchmark (default: %(default)s)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the grid benchmarks")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="json", help="storage backend (default: %(default)s)")
+    parser.add_argument("--label", help="name of this run in the results (default: git describe)")
+    parser.add_argument("--output", help="write the results to this JSON file instead of stdout")
+    parser.add_argument("--compare", metavar="RESULTS",
+                        help="compare with earlier results of the same backend; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown that counts as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    old = None
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        # Checked before the runs, which can take minutes
+        differences = setting_differences(old, workload_settings(args.backend), WORKLOAD_SETTINGS)
+        if differences:
+            log(f"Cannot compare with {args.compare}, it timed different work: {'; '.join(differences)}")
+            return 2
+
+    document = run_suite(sizes, args.repeat, gui=not args.no_gui, label=args.label, log=log, backend=args.backend)
+    for reason in document["skipped"]:
+        log(f"skipped {reason}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    elif not args.compare:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+
+    if old is not None:
+        for difference in setting_differences(old, document, MACHINE_SETTINGS):
+            log(f"WARNING: the runs differ in more than the code, {difference}")
+        rows = compare(old, document, args.threshold)
+        print_comparison(rows, old.get("label", "old"), document["label"])
+        if any(regressed for *_, regressed in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
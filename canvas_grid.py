@@ -0,0 +1,326 @@
+import math
+import tkinter as tk
+
+# Grid geometry in pixels
+HEADER_HEIGHT = 26
+LABEL_WIDTH = 70
+CELL_HEIGHT = 28
+MIN_CELL_WIDTH = 110
+AVG_CHAR_WIDTH = 7  # Used to shorten names that don't fit in a cell
+
+HEADER_BG = "#dddddd"
+GRID_LINE = "#bbbbbb"
+
+
+def visible_range(count, start, size, offset, step):
+    """Indexes of the count cells, step pixels each and starting offset pixels
+    in, that show in the size pixels from start on, partly shown ones included"""
+    first = max(int((start - offset) // step), 0)
+    last = min(math.ceil((start + size - offset) / step), count)
+    return range(first, last)
+
+
+def cell_rect(column, row, cell_width, rows=1):
+    """Bounds (x0, y0, x1, y1) of the block of rows cells from column, row (indexes) down"""
+    x0 = LABEL_WIDTH + column * cell_width
+    y0 = HEADER_HEIGHT + row * CELL_HEIGHT
+    return x0, y0, x0 + cell_width, y0 + rows * CELL_HEIGHT
+
+
+def cell_index(x, y, cell_width, columns, rows):
+    """(column, row) indexes of the cell at canvas coordinates x, y, None outside the cells"""
+    x -= LABEL_WIDTH
+    y -= HEADER_HEIGHT
+    if x < 0 or y < 0:
+        return None
+    column, row = int(x // cell_width), int(y // CELL_HEIGHT)
+    if column >= columns or row >= rows:
+        return None
+    return column, row
+
+
+def fit_text(text, width):
+    """text shortened with an ellipsis to about fit width pixels"""
+    max_chars = max(width // AVG_CHAR_WIDTH - 1, 3)
+    if len(text) > max_chars:
+        return text[:max_chars - 1] + "…"
+    return text
+
+
+class CanvasGrid:
+    """Schedule grid drawn on a single tk.Canvas.
+
+    Cells are addressed by (column, row) keys, e.g. ("Monday", "8:00"), the
+    same cell keys the Entry based grid uses. Only cells inside the visible
+    part of the canvas have canvas items, and those items are recycled while
+    scrolling, so drawing cost depends on the window size instead of on the
+    number of cells. One Entry widget is laid over the cell being edited.
+
+    cell_info(cell_key) returns the (text, background, outline) of a cell,
+    outline None meaning the normal grid line. on_commit(cell_key, text)
+    receives edited text, on_open(cell_key) is called on double-click and
+    on_edit_start(cell_key) when editing begins. column_labels optionally
+    replaces the column keys as header captions.
+
+    cell_block(cell_key) optionally merges cells into taller blocks: it
+    returns the first cell of the block cell_key belongs to and the number
+    of rows the block covers. Blocks are drawn, clicked and edited as one.
+    """
+
+    def __init__(self, parent, columns, rows, cell_info, on_commit, on_open, on_edit_start=None, column_labels=None,
+                 cell_block=None):
+        self.columns = list(columns)
+        self.rows = list(rows)
+        self.column_labels = list(column_labels or columns)
+        self.cell_info = cell_info
+        self.cell_block = cell_block
+        self.on_commit = on_commit
+        self.on_open = on_open
+        self.on_edit_start = on_edit_start
+        self.cell_width = MIN_CELL_WIDTH
+
+        self.canvas = tk.Canvas(parent, bg="white", highlightthickness=0)
+        self.xscrollbar = None
+        self.yscrollbar = None
+
+        self._items = {}  # Visible block's first cell key -> (rect id, text id)
+        self._labels = {}  # ("column", index) / ("row", index) -> (rect id, text id)
+        self._free = []  # Recycled (rect id, text id) pairs
+        self._highlights = {}  # Cell key -> temporary background color
+        self._redraw_pending = False
+
+        # In-place editor overlay
+        self._editor = tk.Entry(self.canvas, justify='center', relief='solid', bd=1)
+        self._editor_window = self.canvas.create_window(0, 0, window=self._editor, anchor="nw", state="hidden")
+        self._editing = None
+        self._editing_original = ""
+
+        self._editor.bind("<Return>", lambda e: self.finish_edit())
+        self._editor.bind("<FocusOut>", lambda e: self.finish_edit())
+        self._editor.bind("<Escape>", lambda e: self.finish_edit(cancel=True))
+        self._editor.bind("<Double-Button-1>", self._on_editor_double_click)
+
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+        self._update_scrollregion()
+
+    # Scrolling
+
+    def attach_scrollbars(self, xscrollbar, yscrollbar):
+        """Connect scrollbars, redrawing whenever the visible area moves"""
+        self.xscrollbar = xscrollbar
+        self.yscrollbar = yscrollbar
+        xscrollbar.configure(command=self.canvas.xview)
+        yscrollbar.configure(command=self.canvas.yview)
+        self.canvas.configure(xscrollcommand=self._on_xscroll, yscrollcommand=self._on_yscroll)
+
+    def _on_xscroll(self, first, last):
+        if self.xscrollbar is not None:
+            self.xscrollbar.set(first, last)
+        self.schedule_redraw()
+
+    def _on_yscroll(self, first, last):
+        if self.yscrollbar is not None:
+            self.yscrollbar.set(first, last)
+        self.schedule_redraw()
+
+    def scroll_to(self, cell_key):
+        """Scroll so that cell_key is visible"""
+        x0, y0, x1, y1 = self.cell_bounds(cell_key)
+        total_width = LABEL_WIDTH + len(self.columns) * self.cell_width
+        total_height = HEADER_HEIGHT + len(self.rows) * CELL_HEIGHT
+        view_x0, view_y0 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        view_x1 = view_x0 + self.canvas.winfo_width()
+        view_y1 = view_y0 + self.canvas.winfo_height()
+        if x0 < view_x0 or x1 > view_x1:
+            self.canvas.xview_moveto(max(x0 - LABEL_WIDTH, 0) / total_width)
+        if y0 < view_y0 or y1 > view_y1:
+            self.canvas.yview_moveto(max(y0 - HEADER_HEIGHT, 0) / total_height)
+        self.schedule_redraw()
+
+    # Geometry
+
+    def cell_bounds(self, cell_key):
+        column, row = cell_key
+        return cell_rect(self.columns.index(column), self.rows.index(row), self.cell_width)
+
+    def block_of(self, cell_key):
+        """(first cell, rows) of the block containing cell_key"""
+        if self.cell_block is None:
+            return cell_key, 1
+        return self.cell_block(cell_key)
+
+    def block_bounds(self, cell_key):
+        """Bounds of the whole block starting at cell_key"""
+        column, row = cell_key
+        return cell_rect(self.columns.index(column), self.rows.index(row), self.cell_width, self.block_of(cell_key)[1])
+
+    def cell_at(self, x, y):
+        """Return the cell key under window coordinates x, y, or None"""
+        index = cell_index(self.canvas.canvasx(x), self.canvas.canvasy(y), self.cell_width,
+                           len(self.columns), len(self.rows))
+        if index is None:
+            return None
+        return self.columns[index[0]], self.rows[index[1]]
+
+    def _update_scrollregion(self):
+        width = LABEL_WIDTH + len(self.columns) * self.cell_width
+        height = HEADER_HEIGHT + len(self.rows) * CELL_HEIGHT
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+
+    def _on_resize(self, event):
+        # Stretch columns to fill the window, but never below the minimum
+        width = (event.width - LABEL_WIDTH) // max(len(self.columns), 1)
+        self.cell_width = max(width, MIN_CELL_WIDTH)
+        self._update_scrollregion()
+        self.schedule_redraw()
+
+    # Drawing
+
+    def schedule_redraw(self):
+        """Redraw once the event loop is idle, coalescing repeated requests"""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.canvas.after_idle(self.redraw)
+
+    def redraw(self):
+        """Create, move or recycle items so that exactly the visible cells are drawn"""
+        self._redraw_pending = False
+        view_x, view_y = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        cols = visible_range(len(self.columns), view_x, self.canvas.winfo_width(), LABEL_WIDTH, self.cell_width)
+        rows = visible_range(len(self.rows), view_y, self.canvas.winfo_height(), HEADER_HEIGHT, CELL_HEIGHT)
+
+        # A block is drawn by its first cell, even when only its lower part shows
+        visible = {self.block_of((self.columns[c], self.rows[r]))[0] for c in cols for r in rows}
+        for cell_key in list(self._items):
+            if cell_key not in visible:
+                self._release(self._items.pop(cell_key))
+        for cell_key in visible:
+            if cell_key not in self._items:
+                self._items[cell_key] = self._acquire()
+            self._draw_cell(cell_key)
+
+        labels = {("column", c) for c in cols} | {("row", r) for r in rows}
+        for label_key in list(self._labels):
+            if label_key not in labels:
+                self._release(self._labels.pop(label_key))
+        for label_key in labels:
+            if label_key not in self._labels:
+                self._labels[label_key] = self._acquire()
+            self._draw_label(label_key)
+
+        # Keep the editor above the cell items
+        if self._editing is not None:
+            self.canvas.tag_raise(self._editor_window)
+
+    def refresh(self, cell_key):
+        """Redraw a single cell if it is visible"""
+        cell_key = self.block_of(cell_key)[0]
+        if cell_key in self._items:
+            self._draw_cell(cell_key)
+
+    def refresh_all(self):
+        for cell_key in self._items:
+            self._draw_cell(cell_key)
+
+    def set_highlight(self, cell_key, color=None):
+        """Temporarily override a cell's background, None restores it"""
+        if color is None:
+            self._highlights.pop(cell_key, None)
+        else:
+            self._highlights[cell_key] = color
+        self.refresh(cell_key)
+
+    def _draw_cell(self, cell_key):
+        rect, text = self._items[cell_key]
+        name, background, outline = self.cell_info(cell_key)
+        background = self._highlights.get(cell_key, background)
+        x0, y0, x1, y1 = self.block_bounds(cell_key)
+        self.canvas.coords(rect, x0, y0, x1, y1)
+        self.canvas.itemconfigure(rect, fill=background, outline=outline or GRID_LINE,
+                                  width=2 if outline else 1, state="normal")
+        self.canvas.coords(text, (x0 + x1) / 2, (y0 + y1) / 2)
+        self.canvas.itemconfigure(text, text=fit_text(name, self.cell_width), state="normal")
+
+    def _draw_label(self, label_key):
+        rect, text = self._labels[label_key]
+        kind, index = label_key
+        if kind == "column":
+            x0, y0, x1, y1 = cell_rect(index, 0, self.cell_width)
+            bounds = (x0, 0, x1, HEADER_HEIGHT)
+            caption = self.column_labels[index]
+        else:
+            x0, y0, x1, y1 = cell_rect(0, index, self.cell_width)
+            bounds = (0, y0, LABEL_WIDTH, y1)
+            caption = self.rows[index]
+        self.canvas.coords(rect, *bounds)
+        self.canvas.itemconfigure(rect, fill=HEADER_BG, outline=GRID_LINE, state="normal")
+        self.canvas.coords(text, (bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2)
+        self.canvas.itemconfigure(text, text=caption, state="normal")
+
+    def _acquire(self):
+        if self._free:
+            return self._free.pop()
+        rect = self.canvas.create_rectangle(0, 0, 0, 0)
+        text = self.canvas.create_text(0, 0, anchor="center")
+        return rect, text
+
+    def _release(self, items):
+        for item in items:
+            self.canvas.itemconfigure(item, state="hidden")
+        self._free.append(items)
+
+    # Editing
+
+    def start_edit(self, cell_key):
+        """Show the editor overlay on top of cell_key"""
+        if self._editing is not None:
+            self.finish_edit()
+        cell_key = self.block_of(cell_key)[0]
+        self._editing = cell_key
+        self._editing_original = self.cell_info(cell_key)[0]
+        x0, y0, x1, y1 = self.block_bounds(cell_key)
+        self.canvas.coords(self._editor_window, x0, y0)
+        self.canvas.itemconfigure(self._editor_window, width=x1 - x0, height=y1 - y0, state="normal")
+        self.canvas.tag_raise(self._editor_window)
+        self._editor.delete(0, tk.END)
+        self._editor.insert(0, self._editing_original)
+        self._editor.focus_set()
+        self._editor.select_range(0, tk.END)
+        if self.on_edit_start is not None:
+            self.on_edit_start(cell_key)
+
+    def finish_edit(self, cancel=False):
+        """Hide the editor and hand its text to on_commit"""
+        cell_key = self._editing
+        if cell_key is None:
+            return
+        text = self._editing_original if cancel else self._editor.get().strip()
+        self._editing = None
+        self.canvas.itemconfigure(self._editor_window, state="hidden")
+        self.on_commit(cell_key, text)
+        self.refresh(cell_key)
+
+    def editor_text(self, cell_key):
+        """Text typed into the editor for cell_key, or None if it isn't being edited"""
+        if self._editing != cell_key:
+            return None
+        return self._editor.get()
+
+    def _on_click(self, event):
+        cell_key = self.cell_at(event.x, event.y)
+        if cell_key is not None:
+            self.start_edit(cell_key)
+
+    def _on_double_click(self, event):
+        cell_key = self.cell_at(event.x, event.y)
+        if cell_key is not None:
+            self.on_open(self.block_of(cell_key)[0])
+
+    def _on_editor_double_click(self, event):
+        cell_key = self._editing
+        self.finish_edit()
+        if cell_key is not None:
+            self.on_open(cell_key)
+        return "break"
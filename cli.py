@@ -0,0 +1,255 @@
+import argparse
+import json
+import sys
+from datetime import date, timedelta
+
+from csv_export import COLUMN_SETS, csv_rows, iter_tasks, task_order, weeks_in_range, write_csv
+from csv_import import CONFLICT_POLICIES, import_csv, normalize_hour, parse_duration
+from recurrence import Recurrences
+from searchindex import matches, tokenize
+from storage import COMPACT_AFTER, open_storage
+from taskstore import (DEFAULT_DURATION, MAX_DURATION, PRIORITIES, date_key, key_week, new_task, parse_date, split_key, to_json,
+                       week_id, week_monday, week_start)
+
+# The schedule the app opens unless told otherwise, the same as gui.SAVE_FILE
+SAVE_FILE = "weekly_schedule.json"
+
+
+def date_arg(text):
+    """argparse type for a "YYYY-MM-DD" date, or "today" """
+    if text == "today":
+        return date.today()
+    try:
+        return parse_date(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {text!r}, expected YYYY-MM-DD")
+
+
+def hour_arg(text):
+    try:
+        return normalize_hour(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def duration_arg(text):
+    """argparse type for a duration, 1 to MAX_DURATION minutes"""
+    try:
+        return parse_duration(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def format_task(key, task):
+    """One line of the list and search output"""
+    day_text, hour = split_key(key)
+    done = "x" if task.get("completed") else " "
+    return f"{day_text} {hour:>5}  [{done}] {task.get('priority', 'medium'):<6}  {task['name']}"
+
+
+def weeks_to_read(storage, start, end):
+    """Stored weeks overlapping start..end, plus every week between the two when
+    both are given, so occurrences in weeks without stored tasks show up too"""
+    weeks = set(storage.weeks())
+    if start is not None and end is not None:
+        monday = week_start(start)
+        while monday <= end:
+            weeks.add(week_id(monday))
+            monday += timedelta(days=7)
+    return weeks_in_range(weeks, start, end)
+
+
+def matches_filters(task, args):
+    """Whether task has the priority and status the list filters ask for"""
+    return ((args.priority is None or task.get("priority", "medium") == args.priority)
+            and (args.completed is None or bool(task.get("completed")) == args.completed))
+
+
+def stored_tasks(storage, args):
+    """Stream (key, task) of the stored tasks and occurrences matching the list filters"""
+    recurrences = Recurrences(storage.load_series())
+    weeks = weeks_to_read(storage, args.start, args.end)
+    if not hasattr(storage, "query"):
+        for key, task in iter_tasks(storage, weeks, start=args.start, end=args.end, recurrences=recurrences):
+            if matches_filters(task, args):
+                yield key, task
+        return
+    # The database filters its tasks with its indexes, only occurrences are checked here
+    tasks = storage.query(args.start, args.end, args.priority, args.completed)
+    first = args.start.isoformat() if args.start is not None else ""
+    last = args.end.isoformat() if args.end is not None else "~"
+    for week in weeks if len(recurrences) else ():
+        occurrences = {key: task for key, task in recurrences.expand_week(week_monday(week)).items()
+                       if first <= split_key(key)[0] <= last and matches_filters(task, args)}
+        if occurrences:
+            # A stored task takes the slot of an occurrence, even one the filters left out
+            stored = storage.read_week(week)
+            tasks.update((key, task) for key, task in occurrences.items() if key not in stored)
+    for key in sorted(tasks, key=task_order):
+        yield key, tasks[key]
+
+
+def print_tasks(tasks, as_json):
+    count = 0
+    for key, task in tasks:
+        if as_json:
+            print(json.dumps(dict(task, key=key), default=to_json))
+        else:
+            print(format_task(key, task))
+        count += 1
+    return count
+
+
+def append_task(storage, key, task):
+    """Journal one task, compacting its week when the journal has grown too long"""
+    week = key_week(key)
+    storage.append({key: task})
+    if storage.needs_compaction(week):
+        storage.compact(week, storage.load_week(week))
+
+
+# Commands
+
+def cmd_add(storage, args):
+    key = date_key(args.date, args.hour)
+    existing = storage.load_week(key_week(key))
+    if key in existing and not args.replace:
+        raise ValueError(f"{key} already has {existing[key]['name']!r}, use --replace to overwrite it")
+    append_task(storage, key, new_task(args.name, args.priority, args.notes, duration=args.duration))
+    print(f"Added {key}")
+
+
+def cmd_list(storage, args):
+    print_tasks(stored_tasks(storage, args), args.json)
+
+
+def cmd_search(storage, args):
+    words = tokenize(args.query)
+    print_tasks(((key, task) for key, task in stored_tasks(storage, args) if matches(task, words)), args.json)
+
+
+def cmd_complete(storage, args):
+    key = date_key(args.date, args.hour)
+    day_text = split_key(key)[0]
+    task = storage.load_week(key_week(key)).get(key)
+    recurrences = None
+    if task is None:
+        # Not stored, maybe an occurrence of a recurring task
+        recurrences = Recurrences(storage.load_series())
+        task = recurrences.expand(args.date, args.date).get(key)
+        if task is None:
+            raise ValueError(f"No task at {key}")
+    task = dict(task, completed=not args.reopen)
+    if recurrences is not None:
+        recurrences.set_override(task["series"], day_text, task)
+        storage.append_series(recurrences.take_changes())
+    else:
+        append_task(storage, key, task)
+    print(f"{'Reopened' if args.reopen else 'Completed'} {key}: {task['name']}")
+
+
+def cmd_export(storage, args):
+    recurrences = Recurrences(storage.load_series())
+    weeks = weeks_to_read(storage, args.start, args.end)
+    tasks = iter_tasks(storage, weeks, start=args.start, end=args.end, recurrences=recurrences)
+    rows = write_csv(args.path, csv_rows(tasks, COLUMN_SETS[args.columns]))
+    # Less the header row
+    print(f"Exported {rows - 1} task(s) to {args.path}")
+
+
+def cmd_import(storage, args):
+    # There is no week on screen, so every week goes straight to storage
+    report = import_csv(args.path, None, storage, None, args.policy, week_start(date.today()))
+    print(report.summary())
+    return 1 if report.invalid else 0
+
+
+def cmd_compact(storage, args):
+    compacted = 0
+    for week in storage.weeks():
+        # Loading a week counts the records of its journal
+        tasks = storage.load_week(week)
+        if storage.needs_compaction(week):
+            storage.compact(week, tasks)
+            compacted += 1
+    series = storage.load_series()
+    if storage.series_due_for_compaction({}):
+        storage.compact_series(series)
+    print(f"Compacted {compacted} week(s)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Work with a schedule without the GUI")
+    parser.add_argument("--file", default=SAVE_FILE, help=f"the schedule, default {SAVE_FILE}")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--from", dest="start", type=date_arg, help="first date, YYYY-MM-DD")
+    filters.add_argument("--to", dest="end", type=date_arg, help="last date, YYYY-MM-DD")
+    filters.add_argument("--priority", choices=PRIORITIES)
+    status = filters.add_mutually_exclusive_group()
+    status.add_argument("--completed", action="store_const", const=True)
+    status.add_argument("--open", dest="completed", action="store_const", const=False)
+    filters.add_argument("--json", action="store_true", help="print one JSON object per task")
+
+    add = commands.add_parser("add", help="add a task")
+    add.add_argument("date", type=date_arg)
+    add.add_argument("hour", type=hour_arg)
+    add.add_argument("name")
+    add.add_argument("--priority", choices=PRIORITIES, default="medium")
+    add.add_argument("--notes", default="")
+    add.add_argument("--duration", type=duration_arg, default=DEFAULT_DURATION, help=f"minutes, up to {MAX_DURATION}")
+    add.add_argument("--replace", action="store_true", help="overwrite a task in the same slot")
+    add.set_defaults(run=cmd_add)
+
+    listing = commands.add_parser("list", parents=[filters], help="list tasks in date order")
+    listing.set_defaults(run=cmd_list)
+
+    search = commands.add_parser("search", parents=[filters], help="find tasks by name or notes")
+    search.add_argument("query", help='words that start words of the task, e.g. "stu py"')
+    search.set_defaults(run=cmd_search)
+
+    complete = commands.add_parser("complete", help="mark a task completed")
+    complete.add_argument("date", type=date_arg)
+    complete.add_argument("hour", type=hour_arg)
+    complete.add_argument("--reopen", action="store_true", help="mark it not completed instead")
+    complete.set_defaults(run=cmd_complete)
+
+    export = commands.add_parser("export", help="export tasks to CSV")
+    export.add_argument("path")
+    export.add_argument("--from", dest="start", type=date_arg)
+    export.add_argument("--to", dest="end", type=date_arg)
+    export.add_argument("--columns", choices=list(COLUMN_SETS), default="Standard")
+    export.set_defaults(run=cmd_export)
+
+    imported = commands.add_parser("import", help="import tasks from CSV")
+    imported.add_argument("path")
+    imported.add_argument("--policy", choices=CONFLICT_POLICIES, default="skip",
+                          help="what to do with a task whose slot is taken")
+    imported.set_defaults(run=cmd_import)
+
+    compact = commands.add_parser("compact", help="fold every journal into its snapshot")
+    compact.set_defaults(run=cmd_compact)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        # A threshold of one journal record makes compact fold every journal
+        storage = open_storage(args.file, compact_after=1 if args.command == "compact" else COMPACT_AFTER)
+    except (OSError, ValueError) as e:
+        print(f"Cannot open {args.file}: {e}", file=sys.stderr)
+        return 1
+    try:
+        return args.run(storage, args) or 0
+    except (OSError, ValueError) as e:
+        print(f"{args.command} failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if hasattr(storage, "close"):
+            storage.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
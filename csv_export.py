@@ -0,0 +1,199 @@
+import csv
+import itertools
+import os
+import queue
+import threading
+
+from taskstore import DEFAULT_DURATION, split_key, parse_date, week_id, week_monday
+
+# Rows handed to the csv writer at a time
+CHUNK_SIZE = 500
+# How often the main thread checks on a running export
+POLL_INTERVAL_MS = 50
+
+# Column name -> value of that column for a (key, task) pair
+COLUMNS = {
+    "Date": lambda key, task: split_key(key)[0],
+    "Day": lambda key, task: parse_date(split_key(key)[0]).strftime("%A"),
+    "Hour": lambda key, task: split_key(key)[1],
+    "Task": lambda key, task: task.get("name", ""),
+    "Priority": lambda key, task: task.get("priority", "medium"),
+    "Notes": lambda key, task: task.get("notes", ""),
+    "Completed": lambda key, task: "Yes" if task.get("completed", False) else "No",
+    "Repeat": lambda key, task: task.get("repeat", "None"),
+    "Created": lambda key, task: task.get("created", ""),
+    "Duration": lambda key, task: task.get("duration", DEFAULT_DURATION),
+}
+
+COLUMN_SETS = {
+    "Standard": ["Date", "Day", "Hour", "Task", "Priority", "Notes", "Completed"],
+    "Compact": ["Date", "Hour", "Task"],
+    "All fields": list(COLUMNS),
+}
+
+
+def task_order(key):
+    """Sort key putting tasks in date and then hour order"""
+    day_text, hour = split_key(key)
+    return day_text, int(hour.split(":")[0])
+
+
+def weeks_in_range(weeks, start=None, end=None):
+    """Ids of weeks overlapping the dates start..end (both optional)"""
+    first = week_id(start) if start is not None else None
+    last = week_id(end) if end is not None else None
+    # "YYYY-Www" ids sort chronologically as plain strings
+    return [week for week in sorted(weeks)
+            if (first is None or week >= first) and (last is None or week <= last)]
+
+
+def iter_tasks(storage, weeks, live_week=None, live_tasks=None, start=None, end=None, on_week=None,
+               recurrences=None):
+    """Yield (key, task) of every task in weeks dated start..end, in order.
+
+    Weeks are read from storage one shard at a time, except live_week whose
+    tasks are taken from live_tasks so edits that are not saved yet are
+    exported too. Occurrences of recurrences (a Recurrences object) are
+    expanded into each stored week. on_week(done, total) is called after
+    each week.
+    """
+    first = start.isoformat() if start is not None else None
+    last = end.isoformat() if end is not None else None
+    for done, week in enumerate(weeks, 1):
+        if week == live_week and live_tasks is not None:
+            tasks = live_tasks
+        elif recurrences is not None:
+            tasks = recurrences.expand_week(week_monday(week))
+            tasks.update(storage.read_week(week))
+        else:
+            tasks = storage.read_week(week)
+        for key in sorted(tasks, key=task_order):
+            day_text = split_key(key)[0]
+            if (first is None or day_text >= first) and (last is None or day_text <= last):
+                yield key, tasks[key]
+        if on_week is not None:
+            on_week(done, len(weeks))
+
+
+def csv_rows(tasks, columns):
+    """Yield the header and then one row per (key, task)"""
+    getters = [COLUMNS[column] for column in columns]
+    yield list(columns)
+    for key, task in tasks:
+        yield [getter(key, task) for getter in getters]
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def write_csv(path, rows, on_chunk=None, cancelled=None, chunk_size=CHUNK_SIZE):
+    """Write rows to path as RFC 4180 CSV, chunk by chunk.
+
+    The file is written under a temporary name and renamed into place at
+    the end, so a failed or cancelled export never leaves a partial file.
+    on_chunk(rows_written) reports progress and cancelled() is checked
+    between chunks. Returns the number of rows written, None if cancelled.
+    """
+    tmp_path = f"{path}.tmp"
+    written = 0
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            rows = iter(rows)
+            while True:
+                if cancelled is not None and cancelled():
+                    raise ExportCancelled()
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+                written += len(chunk)
+                if on_chunk is not None:
+                    on_chunk(written)
+            f.flush()
+            os.fsync(f.fileno())
+    except ExportCancelled:
+        os.remove(tmp_path)
+        return None
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return written
+
+
+class CsvExport:
+    """A CSV export running on a worker thread.
+
+    Reading the week shards and writing the file both happen on the worker,
+    and progress is handed back through a queue that the main thread polls,
+    so on_progress(weeks_done, weeks_total, tasks_written) and
+    on_done(tasks_written, error) are always called on the main thread.
+    tasks_written is None when the export was cancelled.
+
+    after is the scheduling function of the Tk root, the remaining
+    arguments are those of iter_tasks.
+    """
+
+    def __init__(self, after, path, columns, storage, weeks, live_week=None, live_tasks=None,
+                 start=None, end=None, on_progress=None, on_done=None, recurrences=None):
+        self.after = after
+        self.path = path
+        self.columns = columns
+        self.tasks = iter_tasks(storage, weeks, live_week, live_tasks, start, end, on_week=self._week_done,
+                                recurrences=recurrences)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.weeks_done = 0
+        self.weeks_total = len(weeks)
+        self._cancelled = threading.Event()
+        self._results = queue.Queue()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="autodo-export", daemon=True)
+        self._thread.start()
+        self.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _week_done(self, done, total):
+        # Runs on the worker, the main thread only ever reads this number
+        self.weeks_done = done
+
+    def _run(self):
+        try:
+            rows = write_csv(self.path, csv_rows(self.tasks, self.columns),
+                             on_chunk=self._chunk_written, cancelled=self._cancelled.is_set)
+        except Exception as e:
+            self._results.put(("done", None, e))
+        else:
+            # The header row is not a task
+            self._results.put(("done", None if rows is None else rows - 1, None))
+
+    def _chunk_written(self, rows):
+        self._results.put(("progress", rows - 1, None))
+
+    def _poll(self):
+        progress = None
+        while True:
+            try:
+                kind, tasks_written, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "done":
+                if self.on_done is not None:
+                    self.on_done(tasks_written, error)
+                return
+            progress = tasks_written
+        # Only the latest progress matters, older updates are skipped
+        if progress is not None and self.on_progress is not None:
+            self.on_progress(self.weeks_done, self.weeks_total, progress)
+        self.after(POLL_INTERVAL_MS, self._poll)
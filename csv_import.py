@@ -0,0 +1,229 @@
+import csv
+from datetime import timedelta
+
+from taskstore import DAYS, HOURS, PRIORITIES, DEFAULT_DURATION, MAX_DURATION, Repeat, date_key, key_week, new_task, parse_created, parse_date
+
+# What to do when an imported task lands on a slot that already has one
+CONFLICT_POLICIES = {
+    "skip": "Keep the existing task",
+    "replace": "Replace it with the imported task",
+    "merge": "Update the existing task with the imported fields"
+}
+# Errors kept for the import report, later ones are only counted
+MAX_REPORTED_ERRORS = 50
+
+TRUE_VALUES = {"yes", "y", "true", "1", "x"}
+FALSE_VALUES = {"no", "n", "false", "0", ""}
+
+
+# Task field -> CSV column it is read from
+FIELD_COLUMNS = {
+    "name": "Task",
+    "priority": "Priority",
+    "notes": "Notes",
+    "completed": "Completed",
+    "repeat": "Repeat",
+    "created": "Created",
+    "duration": "Duration"
+}
+
+
+class ImportReport:
+    """Counts and row errors of one import"""
+
+    def __init__(self):
+        self.added = 0
+        self.replaced = 0
+        self.merged = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.errors = []  # (line number, message), at most MAX_REPORTED_ERRORS
+
+    def error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        text = (f"{self.added} added, {self.replaced} replaced, {self.merged} merged, "
+                f"{self.skipped} skipped, {self.invalid} invalid")
+        if self.errors:
+            lines = [f"Line {line}: {message}" for line, message in self.errors[:10]]
+            if self.invalid > len(lines):
+                lines.append(f"... and {self.invalid - len(lines)} more")
+            text += "\n\n" + "\n".join(lines)
+        return text
+
+
+def normalize_hour(text):
+    """Accept "8", "8:00" or "08:00" and return the "8:00" form used in keys"""
+    hour = text.strip().split(":")[0]
+    if not hour.isdigit():
+        raise ValueError(f"invalid hour {text!r}")
+    hour = f"{int(hour)}:00"
+    if hour not in HOURS:
+        raise ValueError(f"hour {text!r} is outside the schedule")
+    return hour
+
+
+def check_duration(minutes):
+    """minutes if a task can last that long, raising ValueError otherwise"""
+    if not 0 < minutes <= MAX_DURATION:
+        raise ValueError(f"invalid duration {minutes}, expected 1 to {MAX_DURATION} minutes")
+    return minutes
+
+
+def parse_duration(text):
+    """Duration in minutes, a blank cell means the default"""
+    text = text.strip()
+    if not text:
+        return DEFAULT_DURATION
+    if not text.isdigit():
+        raise ValueError(f"invalid duration {text!r}")
+    return check_duration(int(text))
+
+
+def parse_bool(text):
+    value = text.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid completed value {text!r}")
+
+
+def parse_row(row, default_week=None):
+    """Turn one CSV row (a dict keyed by the export column names) into (key, task, fields).
+
+    fields are the task fields the row actually has a value for. Rows
+    without a Date but with a Day are placed on that weekday of the week
+    starting at default_week. Raises ValueError for invalid rows.
+    """
+    name = (row.get("Task") or "").strip()
+    if not name:
+        raise ValueError("missing task name")
+
+    date_text = (row.get("Date") or "").strip()
+    day_name = (row.get("Day") or "").strip().capitalize()
+    if date_text:
+        try:
+            day = parse_date(date_text)
+        except ValueError:
+            raise ValueError(f"invalid date {date_text!r}")
+    elif day_name in DAYS and default_week is not None:
+        day = default_week + timedelta(days=DAYS.index(day_name))
+    else:
+        raise ValueError("missing date")
+
+    hour = normalize_hour(row.get("Hour") or "")
+    priority = (row.get("Priority") or "medium").strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError(f"invalid priority {priority!r}")
+
+    repeat = (row.get("Repeat") or "None").strip()
+    try:
+        repeat = Repeat(repeat).value
+    except ValueError:
+        raise ValueError(f"invalid repeat {repeat!r}")
+    created = (row.get("Created") or "").strip() or None
+    if created is not None:
+        try:
+            parse_created(created)
+        except ValueError:
+            raise ValueError(f"invalid created time {created!r}")
+
+    task = new_task(
+        name,
+        priority=priority,
+        notes=row.get("Notes") or "",
+        completed=parse_bool(row.get("Completed") or ""),
+        repeat=repeat,
+        created=created,
+        duration=parse_duration(row.get("Duration") or "")
+    )
+    fields = {field for field, column in FIELD_COLUMNS.items() if row.get(column)}
+    return date_key(day, hour), task, fields
+
+
+def read_tasks(f, report, default_week=None):
+    """Stream (key, task, fields) from an open CSV file, recording bad rows in report"""
+    reader = csv.DictReader(f)
+    if reader.fieldnames is None or "Task" not in reader.fieldnames:
+        raise ValueError("The file has no Task column")
+    for row in reader:
+        try:
+            yield parse_row(row, default_week)
+        except ValueError as e:
+            report.error(reader.line_num, str(e))
+
+
+def resolve(existing, task, fields, policy):
+    """Return the task to store for a conflict, or None to keep existing"""
+    if existing is None or policy == "replace":
+        return task
+    if policy == "merge":
+        # Only the fields the file has a value for overwrite the existing task
+        merged = dict(existing)
+        for field in fields:
+            merged[field] = task[field]
+        return merged
+    return None
+
+
+def group_by_week(rows):
+    """Group parsed rows into week -> {key: (task, fields)}, the last row for a slot wins"""
+    grouped = {}
+    for key, task, fields in rows:
+        grouped.setdefault(key_week(key), {})[key] = task, fields
+    return grouped
+
+
+def merge_week(existing, incoming, policy, report):
+    """Changes (key -> task) that merging incoming into existing produces"""
+    changes = {}
+    for key, (task, fields) in incoming.items():
+        current = existing.get(key)
+        result = resolve(current, task, fields, policy)
+        if result is None:
+            report.skipped += 1
+            continue
+        changes[key] = result
+        if current is None:
+            report.added += 1
+        elif policy == "merge":
+            report.merged += 1
+        else:
+            report.replaced += 1
+    return changes
+
+
+def import_csv(path, store, storage, live_week, policy="skip", default_week=None):
+    """Import a CSV file, returning an ImportReport.
+
+    default_week is the Monday that rows with only a Day column belong to.
+    Tasks of live_week go into store inside a single batch, so listeners
+    (the grid, the search index, autosave) see one notification. Every other
+    week is merged straight into its shard with one journal append.
+    """
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy {policy!r}")
+    report = ImportReport()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        grouped = group_by_week(read_tasks(f, report, default_week))
+
+    for week, incoming in sorted(grouped.items()):
+        if week == live_week:
+            changes = merge_week(store, incoming, policy, report)
+            with store.batch():
+                for key, task in changes.items():
+                    store.add(key, task)
+        else:
+            existing = storage.load_week(week)
+            changes = merge_week(existing, incoming, policy, report)
+            if not changes:
+                continue
+            storage.append(changes)
+            if storage.needs_compaction(week):
+                existing.update(changes)
+                storage.compact(week, existing)
+    return report
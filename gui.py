@@ -1,25 +1,137 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import json
-import os
+from tkinter import ttk, messagebox
+import csv
 import re
-from datetime import datetime
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from taskstore import Task, TaskStore, DAYS, HOURS, PRIORITIES, DEFAULT_DURATION, split_key, new_task, date_key, parse_date, day_minutes, week_start, week_id, week_monday, key_week
+from storage import open_storage
+from autosave import AutoSaver
+from canvas_grid import CanvasGrid
+from searchindex import SearchIndex, matches, tokenize
+from virtual_list import VirtualList
+from animation import AnimationScheduler
+from render_queue import RenderQueue, Debouncer
+from recurrence import Recurrences, new_series, rule_from_repeat
+from instrumentation import Instrumentation, instrumented
+from week_cache import WeekCache
+from undo import UndoLog
+
+# Reference point for the startup timings, taken as early as this module gets
+START_TIME = time.perf_counter()
 
 # Constants
 SAVE_FILE = "weekly_schedule.json"
+RESULT_ROW_HEIGHT = 62
+# Approximate height of an entry grid row, to tell how many rows fit the window
+ENTRY_ROW_HEIGHT = 24
+# Entry grid rows built per event loop pass once the visible ones have painted
+DEFERRED_ROW_CHUNK = 2
+# Outline of tasks that overlap another task
+CONFLICT_COLOR = "#cc0000"
+# Operations timed by the instrumentation, as offered for profiling
+OPERATIONS = ["load", "week.change", "save.prepare", "save.write", "search", "grid.build", "grid.render", "dialog.add_task",
+              "dialog.details", "dialog.search", "dialog.export", "dialog.import", "dialog.help"]
+# Weeks on either side of the displayed one that are loaded ahead of time
+PREFETCH_WEEKS = 1
+# How often the schedule's files are checked for changes made by other instances
+WATCH_INTERVAL_MS = 2000
+# How often the Diagnostics window refreshes its numbers
+DIAGNOSTICS_REFRESH_MS = 1000
+# Choices for how long a task lasts, as shown -> minutes
+DURATIONS = {f"{minutes // 60}:{minutes % 60:02d}": minutes for minutes in (30, 60, 90, 120, 150, 180, 240, 300, 360, 480)}
+
+
+class SearchResultRow:
+    """Reusable widgets for one row of the search results list"""
+    
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent)
+        
+        # Priority indicator
+        self.indicator = tk.Frame(self.frame, width=10)
+        self.indicator.pack(side=tk.LEFT, fill=tk.Y, pady=5)
+        
+        # Task details
+        details_frame = ttk.Frame(self.frame)
+        details_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.name_label = ttk.Label(details_frame, font=("TkDefaultFont", 10, "bold"))
+        self.name_label.pack(anchor="w")
+        self.time_label = ttk.Label(details_frame)
+        self.time_label.pack(anchor="w")
+        self.status_label = ttk.Label(details_frame, foreground="green")
+        self.status_label.pack(anchor="w")
+        
+        # Go to button
+        self.goto_btn = ttk.Button(self.frame, text="Go to")
+        self.goto_btn.pack(side=tk.RIGHT, padx=5)
+
 
 class Autodo:
-    def __init__(self, title, geometry, SAVE_FILE):
+    def __init__(self, title, geometry, SAVE_FILE, render_mode="entries", fast_start=False, report_startup=False,
+                 diagnostics=False):
         self.root = tk.Tk()
         self.root.title(title)
         self.root.geometry(geometry)  # Fixed: Changed from assignment to method call
         self.SAVE_FILE = SAVE_FILE
-        self.DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        self.HOURS = [f"{h}:00" for h in range(5, 24)]
+        self.storage = open_storage(SAVE_FILE)  # Weekly JSON shards, or SQLite for a .db file
+        self.week_start = week_start(date.today())  # Monday of the displayed week
+        self.current_week = week_id(self.week_start)
+        self.DAYS = list(DAYS)
+        self.HOURS = list(HOURS)
+        self.render_mode = render_mode  # "entries" (one widget per cell) or "canvas"
+        # Fast start paints the rows that fit the window first and builds
+        # the other rows and the menus once that first paint is on screen
+        self.fast_start = fast_start
+        self.report_startup = report_startup  # Print the startup timings to stderr
+        self.startup_times = {}  # Phase -> seconds since START_TIME
+        # Latency of loads, saves, searches, grid repaints and dialogs; costs
+        # next to nothing until switched on in the Diagnostics window
+        self.instruments = Instrumentation(enabled=diagnostics)
+        match = re.match(r"\d+x(\d+)", geometry)
+        self.window_height = int(match.group(1)) if match else 800
         self.entries = {}
+        self.canvas_grid = None  # CanvasGrid used in "canvas" render mode
+        self.grid_canvas = None  # Canvas that scrolls the schedule grid
+        self._schedule_frame = None  # Frame holding the entry grid
+        self._pending_rows = []  # (row, hour) of entry grid rows not built yet
+        self._entry_width = 18  # Width of the entries, follows the window size
+        self._help_window = None  # Built on first use, hidden instead of closed
+        self._help_theme = None  # Theme the help window was built with
         self.task_frames = {}  # Store frames for tasks
-        self.task_details = {}  # Dictionary to store task details
-        self.saved_schedule = {}
+        self.store = TaskStore()  # Owns all task details, the grid only renders it
+        # Weeks other than the displayed one, decoded ahead of time for paging
+        self.week_cache = WeekCache(self.storage.read_week, stamp=self.storage.stamp)
+        # Stamps of the displayed week and the series as far as they are in
+        # the store, to pick up what other instances write to the schedule
+        self._week_stamp = None
+        self._series_stamp = None
+        # Changes of other weeks not written yet, as their save failed or
+        # they were undone after leaving the week, key -> task or None
+        self._retry_changes = {}
+        self._unsaved_weeks = set()  # Weeks of _retry_changes, pinned in the week cache until saved
+        self.api_server = None  # ApiServer while the JSON API is on, see start_api()
+        self._day_labels = []  # Column captions of the entry grid
+        self.store.subscribe(self._on_store_changed)
+        self.search_index = SearchIndex(self.store)  # Kept up to date by the store
+        self.recurrences = Recurrences()  # Recurring tasks, stored once as rules
+        # Edits, deletes and new series are undone by restoring the tasks
+        # and series they replaced
+        self.undo_log = UndoLog(self._apply_undo)
+        self.recurrences.subscribe(lambda series_id, old, new: self.undo_log.record("series", series_id, old, new))
+        self._occurrences = {}  # Store key -> series id of the occurrences in the store
+        self._spans = {}  # First cell of a task longer than an hour -> rows it covers
+        self._covered = {}  # Cell hidden under a longer task -> that task's first cell
+        self._conflicts = set()  # Cells whose task overlaps another task
+        # Grid repaints triggered by store changes, applied once per idle cycle
+        self.render_queue = RenderQueue(self.root.after_idle, self.root.after_cancel, self._render_cells)
+        self._editing_cell = None  # Cell whose entry currently has keyboard focus
+        
+        # Saves run debounced on a worker thread and report to the status bar
+        self.status_var = tk.StringVar(value="Ready")
+        self.autosaver = AutoSaver(self.root.after, self.root.after_cancel, self._prepare_save, on_status=self.status_var.set)
         
         # Apply theme
         self.style = ttk.Style()
@@ -34,6 +146,11 @@ class Autodo:
             "completed": "#e6e6e6"  # Light gray
         }
         
+        # Highlight animations run from the event loop; a click anywhere
+        # stops the "go to task" flash
+        self.animations = AnimationScheduler(self.root.after, self.root.after_cancel)
+        self.root.bind_all("<Button-1>", lambda e: self.animations.cancel_tag("goto"), add="+")
+        
         # Set up keyboard shortcuts
         self.setup_shortcuts()
 
@@ -68,109 +185,516 @@ class Autodo:
         self.root.bind("<F1>", lambda e: self.open_help_window())
         self.root.bind("<Control-f>", lambda e: self.open_search_window())
         self.root.bind("<Control-n>", lambda e: self.open_add_task_window())
+        self.root.bind("<Control-D>", lambda e: self.open_diagnostics_window())
+        self.root.bind("<Alt-Left>", lambda e: self.previous_week())
+        self.root.bind("<Alt-Right>", lambda e: self.next_week())
+        self.root.bind("<Alt-Home>", lambda e: self.this_week())
+        self.root.bind("<Control-z>", lambda e: self.undo())
+        self.root.bind("<Control-y>", lambda e: self.redo())
+        self.root.bind("<Control-Z>", lambda e: self.redo())
 
+    @instrumented("load")
     def load_schedule(self):
-        """Load schedule from JSON file with task details"""
-        if os.path.exists(self.SAVE_FILE):
-            try:
-                with open(self.SAVE_FILE, 'r') as f:
-                    data = json.load(f)
-                    
-                    # Load task details if available
-                    if "tasks" in data:
-                        self.task_details = data["tasks"]
-                        
-                        # Convert tasks to the schedule format
-                        schedule = {}
-                        for key, task_info in self.task_details.items():
-                            day, hour = key.split('|')
-                            schedule[(day, hour)] = task_info.get("name", "")
-                        return schedule
-                    else:
-                        # Legacy format support
-                        return {tuple(key.split('|')): task for key, task in data.items()}
-            except json.JSONDecodeError:
-                messagebox.showerror("Error", "Failed to load schedule. File may be corrupted.")
-                return {}
-        else:
-            return {}  # Default empty schedule
+        """Load the displayed week's shard: its JSON snapshot plus journal"""
+        try:
+            self._week_stamp = self.storage.stamp(self.current_week)
+            tasks = self.storage.load_week(self.current_week)
+            self._series_stamp = self.storage.series_stamp()
+            self.recurrences.load(self.storage.load_series())
+        except ValueError:  # Undecodable JSON or an unreadable database
+            messagebox.showerror("Error", "Failed to load schedule. File may be corrupted.")
+            return {}
+        
+        # Fold a long journal into a fresh snapshot so the next start is quick
+        if self.storage.needs_compaction(self.current_week):
+            self.storage.compact(self.current_week, tasks)
+        
+        self._show_tasks(tasks)
+        
+        # Convert tasks to the schedule format
+        return {self.cell_for_key(key): task_info.name for key, task_info in self.store.items()}
 
-    def save_schedule(self):
-        """Save schedule with task details to JSON file"""
-        # Collect current data from entries
-        data = {}
-        for (day, hour), entry in self.entries.items():
-            content = entry.get().strip()
-            priority = "medium"  # Default priority
-            
-            # Check if this task already has details
-            key = f"{day}|{hour}"
-            if key in self.task_details:
-                # Update name but keep other details
-                if content:
-                    self.task_details[key]["name"] = content
+    def _show_tasks(self, tasks):
+        """Fill the store with the displayed week: its stored tasks plus recurring occurrences"""
+        # Recurring tasks are expanded for the displayed week only; a task
+        # of its own in the same slot takes precedence over an occurrence
+        occurrences = self.recurrences.expand_week(self.week_start)
+        self._occurrences = {key: task["series"] for key, task in occurrences.items() if key not in tasks}
+        occurrences.update(tasks)
+        self.store.load(occurrences)
+
+    @instrumented("week.change")
+    def show_week(self, day):
+        """Display the week containing day, taking it from the week cache when possible"""
+        monday = week_start(day)
+        if monday == self.week_start:
+            return
+        if self._editing_cell is not None:
+            self.commit_entry(self._editing_cell)
+        # Edits go to the save worker now; until they are written the cache
+        # holds the week as edited, so coming back never reads stale data
+        self.autosaver.save_now()
+        self.week_cache.put(self.current_week, {key: task for key, task in self.store.items()
+                                                if key not in self._occurrences}, self._week_stamp)
+        self.week_start = monday
+        self.current_week = week_id(monday)
+        try:
+            tasks = self.week_cache.get(self.current_week)
+        except ValueError:  # Undecodable JSON or an unreadable database
+            messagebox.showerror("Error", f"Failed to load the week of {monday.strftime('%m/%d/%Y')}.")
+            tasks = {}
+        self._week_stamp = self.week_cache.stamp_of(self.current_week)
+        self._show_tasks(tasks)
+        
+        # Every cell shows another day now
+        for day_label, day in zip(self._day_labels, self.DAYS):
+            day_label.configure(text=self.day_label(day))
+        if self.canvas_grid is not None:
+            self.canvas_grid.column_labels = [self.day_label(day) for day in self.DAYS]
+            self.canvas_grid.schedule_redraw()
+        self.render_queue.add((day, hour) for day in self.DAYS for hour in self.HOURS)
+        self.animations.cancel_tag("goto")
+        self._prefetch_neighbours()
+
+    def _prefetch_neighbours(self):
+        """Have the weeks around the displayed one decoded in the background"""
+        self.week_cache.prefetch(week_id(self.week_start + timedelta(weeks=offset))
+                                 for offset in range(-PREFETCH_WEEKS, PREFETCH_WEEKS + 1) if offset)
+
+    def previous_week(self):
+        self.show_week(self.week_start - timedelta(weeks=1))
+
+    def next_week(self):
+        self.show_week(self.week_start + timedelta(weeks=1))
+
+    def this_week(self):
+        self.show_week(date.today())
+
+    def _watch(self):
+        """Merge what other instances wrote to the schedule, then check again later"""
+        self.root.after(WATCH_INTERVAL_MS, self._watch)
+        # Tasks being written are neither dirty nor in the files yet
+        if self.autosaver.busy:
+            return
+        try:
+            self.merge_external_changes()
+        except (OSError, ValueError):
+            pass  # E.g. a file being replaced, the next check reads it again
+
+    def merge_external_changes(self):
+        """Bring the store and the week cache up to date with the files, return the keys updated.
+
+        Only what changed is read: the new journal lines of the displayed
+        week, or the week itself if its snapshot was replaced. Just the
+        changed tasks are updated, which repaints only their cells.
+        """
+        stamp, changes = self.storage.changes_since(self.current_week, self._week_stamp)
+        if changes is None:
+            tasks = self.storage.read_week(self.current_week)
+            changes = {key: None for key in self.store.query(week=self.current_week)
+                       if key not in self._occurrences and key not in tasks}
+            changes.update(tasks)
+        self._week_stamp = stamp
+        merged = self._merge_external(changes)
+        
+        series_stamp = self.storage.series_stamp()
+        if series_stamp != self._series_stamp and not self.recurrences.is_dirty:
+            self._fold_occurrence_changes()
+            if not self.recurrences.is_dirty:
+                self._series_stamp = series_stamp
+                self.recurrences.load(self.storage.load_series())
+                self.expand_recurrences()
+        
+        # Weeks with unwritten changes are cached as edited until they are written
+        if self.week_cache.drop_changed(keep={key_week(key) for key in self._retry_changes}):
+            self._prefetch_neighbours()
+        if merged:
+            self.status_var.set(f"Updated {len(merged)} task(s) changed by another instance")
+        return merged
+
+    def _merge_external(self, changes):
+        """Apply changes (key -> task or None) made elsewhere to the displayed week, return the keys applied"""
+        # Unsaved edits win, the next save writes them over the other change
+        local = self.store.dirty_keys()
+        if self._editing_cell is not None:
+            local.add(self.task_key(self._editing_cell))
+        applied = []
+        with self.store.batch():
+            for key, task in changes.items():
+                if key in local or key_week(key) != self.current_week:
+                    continue
+                if task is None:
+                    if key in self._occurrences or self.store.delete(key) is None:
+                        continue
                 else:
-                    # If content is now empty, remove this task
-                    if key in self.task_details:
-                        del self.task_details[key]
-            elif content:
-                # Create new task details
-                self.task_details[key] = {
-                    "name": content,
-                    "priority": priority,
-                    "notes": "",
-                    "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                    "completed": False
-                }
-        
-        # Save to file
-        with open(self.SAVE_FILE, 'w') as f:
-            json.dump({"tasks": self.task_details}, f, indent=2)
-        
-        # Update saved state
-        self.saved_schedule = {
-            (day, hour): entry.get().strip()
-            for (day, hour), entry in self.entries.items()
-            if entry.get().strip()
+                    task = Task.coerce(task)
+                    if self.store.get(key) == task:
+                        continue  # E.g. this instance's own save
+                    self.store.add(key, task)
+                    self._occurrences.pop(key, None)
+                applied.append(key)
+        self.store.mark_clean(applied)
+        if any(changes[key] is None for key in applied):
+            self.expand_recurrences()  # An occurrence shows again where a task was deleted
+        return applied
+
+    def task_key(self, cell_key):
+        """Store key of a (day, hour) grid cell in the displayed week"""
+        day, hour = cell_key
+        return date_key(self.day_date(day), hour)
+
+    def cell_for_key(self, key):
+        """Grid cell showing a store key, or None if it is outside the displayed week"""
+        day_text, hour = split_key(key)
+        minutes = day_minutes(day_text)  # Cached, unlike parsing the date
+        if minutes is None:
+            return None
+        offset = minutes // 1440 - self.week_start.toordinal()
+        if 0 <= offset < len(self.DAYS):
+            return self.DAYS[offset], hour
+        return None
+
+    def day_date(self, day):
+        """Date of a weekday in the displayed week"""
+        return self.week_start + timedelta(days=self.DAYS.index(day))
+
+    def day_label(self, day):
+        """Column caption for a weekday of the displayed week"""
+        return f"{day} {self.day_date(day).strftime('%m/%d')}"
+
+    def save_schedule(self):
+        """Save schedule right away, the write itself happens in the background"""
+        # Other cells are committed when they lose focus, only the one
+        # being edited may still hold text the store hasn't seen
+        if self._editing_cell is not None:
+            self.commit_entry(self._editing_cell)
+        
+        if not self.autosaver.save_now() and not self.autosaver.busy:
+            self.status_var.set("No unsaved changes")
+
+    @instrumented("save.prepare")
+    def _prepare_save(self):
+        """Hand the changes made since the last save to the autosave worker"""
+        self._fold_occurrence_changes()
+        if not self.store.is_dirty and not self.recurrences.is_dirty and not self._retry_changes:
+            return None
+        # Only the tasks and series changed since the last save are written
+        changes, self._retry_changes = self._retry_changes, {}
+        changes.update(self.store.take_changes())
+        series_changes = self.recurrences.take_changes()
+        # The cache keeps the weeks being written, see show_week()
+        weeks = {key_week(key) for key in changes}
+        self.week_cache.pin(weeks)
+        self.week_cache.unpin(self._unsaved_weeks)
+        self._unsaved_weeks = set()
+        
+        # Fold a week's journal into a new snapshot once it gets long; the
+        # shallow copy is cheap and serialising it happens on the worker thread.
+        # The stamp the copy was read at lets storage tell if it is stale
+        snapshots = {}
+        for week in self.storage.due_for_compaction(changes):
+            if week == self.current_week:
+                snapshots[week] = ({key: self.store[key] for key in self.store.query(week=week)
+                                    if key not in self._occurrences}, self._week_stamp)
+            elif self.week_cache.peek(week) is not None:
+                snapshots[week] = (dict(self.week_cache.peek(week)), self.week_cache.stamp_of(week))
+        series_snapshot = None
+        if self.storage.series_due_for_compaction(series_changes):
+            series_snapshot = self.recurrences.to_dict()
+        
+        def write():
+            # Append only the tasks changed since the last save to the journal
+            with self.instruments.timed("save.write"):
+                self.storage.append(changes)
+                self.storage.append_series(series_changes)
+                for week, (tasks, stamp) in snapshots.items():
+                    self.storage.compact(week, tasks, stamp)
+                if series_snapshot is not None:
+                    self.storage.compact_series(series_snapshot)
+        
+        def on_done(error):
+            if error is not None:
+                # Flag the tasks again so the next save retries them
+                self._retry_save(changes)
+                self.recurrences.mark_dirty(series_changes)
+            self.week_cache.unpin(weeks)
+        
+        return write, on_done
+
+    def _retry_save(self, changes):
+        """Have the next save write the tasks of changes again, as they are by then"""
+        for key, task in changes.items():
+            week = key_week(key)
+            if week == self.current_week:
+                self.store.mark_dirty([key])
+            else:
+                # Another week is shown now, its latest content is in the cache
+                cached = self.week_cache.peek(week)
+                self._queue_other_week(key, cached.get(key) if cached is not None else task)
+
+    def _queue_other_week(self, key, task):
+        """Have the next save write task (None to delete) at key of a week that isn't displayed"""
+        week = key_week(key)
+        if week not in self._unsaved_weeks:
+            # Until then its cached copy is the only one with the change
+            self.week_cache.pin([week])
+            self._unsaved_weeks.add(week)
+        self._retry_changes[key] = task
+
+    def _fold_occurrence_changes(self):
+        """Turn edits of recurring task occurrences into changes of their series"""
+        for key, task in self.store.take_changes(self._occurrences).items():
+            series_id = self._occurrences[key]
+            day_text = split_key(key)[0]
+            if series_id not in self.recurrences:
+                del self._occurrences[key]
+            elif task is not None and task.series == series_id:
+                # Edited occurrence, e.g. marked completed on this date only
+                self.recurrences.set_override(series_id, day_text, task)
+            else:
+                # Deleted, or replaced by a task of its own that is saved normally
+                self.recurrences.skip(series_id, day_text)
+                del self._occurrences[key]
+                if task is not None:
+                    self.store.mark_dirty([key])
+
+    def expand_recurrences(self):
+        """Bring the displayed week's occurrences in line with the series"""
+        # Edits of occurrences must reach their series before they're redrawn
+        self._fold_occurrence_changes()
+        occurrences = self.recurrences.expand_week(self.week_start)
+        removed = [key for key in self._occurrences if key not in occurrences]
+        with self.store.batch():
+            for key in removed:
+                self.store.delete(key)
+                del self._occurrences[key]
+            for key, task in occurrences.items():
+                if key in self.store and key not in self._occurrences:
+                    continue  # A task of its own hides the occurrence
+                if self.store.get(key) != task:
+                    self.store.add(key, task)
+                self._occurrences[key] = task["series"]
+        # Occurrences are saved as part of their series, not as tasks
+        self.store.mark_clean(removed)
+        self.store.mark_clean(self._occurrences)
+        self.autosaver.schedule()
+
+    @instrumented("dialog.export")
+    def export_to_csv(self):
+        """Open the export window: column set, date range and progress"""
+        # Imported on first use, they are not needed to start up
+        from tkinter import filedialog
+        from csv_export import CsvExport, COLUMN_SETS, weeks_in_range
+        
+        window = tk.Toplevel(self.root)
+        window.title("Export Schedule to CSV")
+        window.geometry("420x260")
+        
+        # Apply current theme
+        if self.current_theme == "dark":
+            window.configure(bg="#333333")
+        else:
+            window.configure(bg="#f0f0f0")
+        
+        form = ttk.Frame(window)
+        form.pack(padx=20, pady=10, fill=tk.X)
+        
+        ttk.Label(form, text="Columns:").grid(row=0, column=0, sticky="w", pady=5)
+        columns_combo = ttk.Combobox(form, values=list(COLUMN_SETS), state="readonly", width=15)
+        columns_combo.current(0)
+        columns_combo.grid(row=0, column=1, sticky="w", pady=5)
+        
+        # Presets fill in the date fields, which can then be edited freely
+        today = date.today()
+        ranges = {
+            "All dates": ("", ""),
+            "Displayed week": (self.week_start.isoformat(), (self.week_start + timedelta(days=6)).isoformat()),
+            "Last 30 days": ((today - timedelta(days=30)).isoformat(), today.isoformat()),
+            "Last year": ((today - timedelta(days=365)).isoformat(), today.isoformat())
         }
+        ttk.Label(form, text="Range:").grid(row=1, column=0, sticky="w", pady=5)
+        range_combo = ttk.Combobox(form, values=list(ranges), state="readonly", width=15)
+        range_combo.current(0)
+        range_combo.grid(row=1, column=1, sticky="w", pady=5)
+        
+        ttk.Label(form, text="From (YYYY-MM-DD):").grid(row=2, column=0, sticky="w", pady=5)
+        start_entry = ttk.Entry(form, width=15)
+        start_entry.grid(row=2, column=1, sticky="w", pady=5)
+        ttk.Label(form, text="To (YYYY-MM-DD):").grid(row=3, column=0, sticky="w", pady=5)
+        end_entry = ttk.Entry(form, width=15)
+        end_entry.grid(row=3, column=1, sticky="w", pady=5)
+        
+        def apply_range(event=None):
+            start_text, end_text = ranges[range_combo.get()]
+            for entry, text in ((start_entry, start_text), (end_entry, end_text)):
+                entry.delete(0, tk.END)
+                entry.insert(0, text)
+        
+        range_combo.bind("<<ComboboxSelected>>", apply_range)
+        
+        progress = ttk.Progressbar(window, mode="determinate", maximum=1)
+        progress.pack(padx=20, pady=5, fill=tk.X)
+        progress_label = ttk.Label(window, text="")
+        progress_label.pack(padx=20, anchor="w")
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(pady=10)
+        export_button = ttk.Button(button_frame, text="Export...")
+        export_button.pack(side=tk.LEFT, padx=5)
+        cancel_button = ttk.Button(button_frame, text="Close", command=window.destroy)
+        cancel_button.pack(side=tk.LEFT, padx=5)
+        
+        job = None
+        
+        def read_date(entry):
+            text = entry.get().strip()
+            return parse_date(text) if text else None
+        
+        def show_progress(weeks_done, weeks_total, tasks_written):
+            progress.configure(maximum=max(weeks_total, 1), value=weeks_done)
+            progress_label.configure(text=f"{tasks_written} task(s) written")
+        
+        def finished(tasks_written, error):
+            nonlocal job
+            job = None
+            if not window.winfo_exists():
+                return
+            export_button.configure(state="normal")
+            cancel_button.configure(text="Close", command=window.destroy)
+            if error is not None:
+                progress_label.configure(text="")
+                messagebox.showerror("Export Failed", f"An error occurred: {str(error)}", parent=window)
+            elif tasks_written is None:
+                progress_label.configure(text="Export cancelled")
+            else:
+                progress.configure(value=progress.cget("maximum"))
+                progress_label.configure(text=f"{tasks_written} task(s) exported")
+                messagebox.showinfo("Export Successful", f"Schedule exported to {filename}", parent=window)
         
-        messagebox.showinfo("Success", "Schedule saved successfully!")
+        def start_export():
+            nonlocal job, filename
+            try:
+                start, end = read_date(start_entry), read_date(end_entry)
+            except ValueError:
+                messagebox.showerror("Invalid Date", "Dates must look like 2025-05-19", parent=window)
+                return
+            if start is not None and end is not None and start > end:
+                messagebox.showerror("Invalid Range", "The start date is after the end date", parent=window)
+                return
+            
+            filename = filedialog.asksaveasfilename(
+                parent=window,
+                defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                title="Export Schedule to CSV"
+            )
+            if not filename:
+                return  # User cancelled
+            
+            # The displayed week comes from the store so unsaved edits are
+            # included, every other week is read from its shard on the worker
+            if self._editing_cell is not None:
+                self.commit_entry(self._editing_cell)
+            weeks = set(self.storage.weeks()) | {self.current_week}
+            if start is not None and end is not None and len(self.recurrences):
+                # Recurring tasks can fall on weeks nothing else is stored for
+                weeks.update(week_id(start + timedelta(days=offset)) for offset in range(0, (end - start).days + 1, 7))
+                weeks.add(week_id(end))
+            weeks = weeks_in_range(weeks, start, end)
+            job = CsvExport(self.root.after, filename, COLUMN_SETS[columns_combo.get()], self.storage, weeks,
+                            live_week=self.current_week, live_tasks=self.store.snapshot(),
+                            recurrences=self.recurrences.snapshot(),
+                            start=start, end=end, on_progress=show_progress, on_done=finished)
+            export_button.configure(state="disabled")
+            cancel_button.configure(text="Cancel", command=job.cancel)
+            show_progress(0, len(weeks), 0)
+            job.start()
+        
+        filename = None
+        export_button.configure(command=start_export)
+        
+        def on_window_close():
+            if job is not None:
+                job.cancel()
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", on_window_close)
 
-    def export_to_csv(self):
-        """Export the schedule to a CSV file"""
-        filename = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
-            title="Export Schedule to CSV"
-        )
+    @instrumented("dialog.import")
+    def import_from_csv(self):
+        """Open the import window to bulk load tasks from a CSV file"""
+        from tkinter import filedialog
+        from csv_import import CONFLICT_POLICIES, import_csv
+        
+        window = tk.Toplevel(self.root)
+        window.title("Import Tasks from CSV")
+        window.geometry("420x200")
         
-        if not filename:
-            return  # User cancelled
+        # Apply current theme
+        if self.current_theme == "dark":
+            window.configure(bg="#333333")
+        else:
+            window.configure(bg="#f0f0f0")
+        
+        form = ttk.Frame(window)
+        form.pack(padx=20, pady=10, fill=tk.X)
+        
+        ttk.Label(form, text="Columns: Date (or Day), Hour, Task, and optionally\n"
+                             "Priority, Notes, Completed, Repeat, Created, Duration").pack(anchor="w", pady=5)
+        
+        ttk.Label(form, text="When a time slot already has a task:").pack(anchor="w", pady=5)
+        policies = list(CONFLICT_POLICIES)
+        policy_combo = ttk.Combobox(form, values=list(CONFLICT_POLICIES.values()), state="readonly", width=45)
+        policy_combo.current(0)
+        policy_combo.pack(anchor="w")
+        
+        def start_import():
+            filename = filedialog.askopenfilename(
+                parent=window,
+                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                title="Import Tasks from CSV"
+            )
+            if not filename:
+                return  # User cancelled
             
-        try:
-            with open(filename, 'w') as f:
-                # Write header
-                f.write("Day,Hour,Task,Priority,Notes,Completed\n")
-                
-                # Write tasks
-                for key, task_info in self.task_details.items():
-                    day, hour = key.split('|')
-                    name = task_info.get("name", "")
-                    priority = task_info.get("priority", "medium")
-                    notes = task_info.get("notes", "").replace(",", ";")  # Avoid CSV confusion
-                    completed = "Yes" if task_info.get("completed", False) else "No"
-                    
-                    f.write(f"{day},{hour},{name},{priority},{notes},{completed}\n")
-                    
-            messagebox.showinfo("Export Successful", f"Schedule exported to {filename}")
-        except Exception as e:
-            messagebox.showerror("Export Failed", f"An error occurred: {str(e)}")
+            # The cell being edited must not overwrite imported tasks later
+            if self._editing_cell is not None:
+                self.commit_entry(self._editing_cell)
+            # Other weeks are merged on disk, so earlier edits must be there
+            # first and cached weeks are stale afterwards
+            self.autosaver.flush()
+            self.week_cache.clear()
+            
+            policy = policies[policy_combo.current()]
+            window.configure(cursor="watch")
+            window.update_idletasks()
+            try:
+                report = import_csv(filename, self.store, self.storage, self.current_week,
+                                    policy=policy, default_week=self.week_start)
+            except (OSError, ValueError, csv.Error) as e:
+                messagebox.showerror("Import Failed", f"An error occurred: {str(e)}", parent=window)
+                return
+            finally:
+                window.configure(cursor="")
+            
+            # The import itself can't be undone, and undoing what came before
+            # would write over imported tasks
+            self.undo_log.clear()
+            self.status_var.set(f"Imported {report.added + report.replaced + report.merged} task(s)")
+            messagebox.showinfo("Import Finished", report.summary(), parent=window)
+            window.destroy()
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Import...", command=start_import).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=window.destroy).pack(side=tk.LEFT, padx=5)
 
+    @instrumented("dialog.add_task")
     def open_add_task_window(self):
         """Open window to add a new task with more details"""
         window = tk.Toplevel(self.root)
         window.title("Add New Task")
-        window.geometry("400x350")
+        window.geometry("400x390")
         
         # Apply current theme
         if self.current_theme == "dark":
@@ -210,10 +734,15 @@ class Autodo:
         notes_text = tk.Text(form_frame, width=30, height=5)
         notes_text.grid(row=4, column=1, sticky="we", pady=5)
         
+        ttk.Label(form_frame, text="Duration:").grid(row=5, column=0, sticky="w", pady=5)
+        duration_combo = ttk.Combobox(form_frame, values=list(DURATIONS), state="readonly")
+        duration_combo.grid(row=5, column=1, sticky="we", pady=5)
+        duration_combo.set("1:00")
+        
         # Recurrence option
-        ttk.Label(form_frame, text="Repeat:").grid(row=5, column=0, sticky="w", pady=5)
+        ttk.Label(form_frame, text="Repeat:").grid(row=6, column=0, sticky="w", pady=5)
         repeat_combo = ttk.Combobox(form_frame, values=["None", "Daily", "Weekly", "Weekdays"], state="readonly")
-        repeat_combo.grid(row=5, column=1, sticky="we", pady=5)
+        repeat_combo.grid(row=6, column=1, sticky="we", pady=5)
         repeat_combo.current(0)  # Default to no recurrence
         
         # Submit button
@@ -228,108 +757,63 @@ class Autodo:
             priority = priority_combo.get()
             notes = notes_text.get("1.0", tk.END).strip()
             repeat = repeat_combo.get()
+            duration = DURATIONS[duration_combo.get()]
             
-            # Add task to the selected time slot
-            key = f"{day}|{hour}"
-            self.task_details[key] = {
-                "name": name,
-                "priority": priority,
-                "notes": notes,
-                "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "completed": False,
-                "repeat": repeat
-            }
-            
-            # Update the entry in the grid
-            if (day, hour) in self.entries:
-                self.entries[(day, hour)].delete(0, tk.END)
-                self.entries[(day, hour)].insert(0, name)
-                self.update_task_color((day, hour))
+            key = self.task_key((day, hour))
+            task = new_task(name, priority, notes, duration=duration)
+            if not self.confirm_no_conflict(key, task, parent=window):
+                return
             
-            # Handle recurrence
-            if repeat != "None":
-                self.add_recurring_tasks(day, hour, name, priority, notes, repeat)
+            # Add task to the selected time slot, the grid follows the store
+            if repeat == "None":
+                with self.undoable("add task"):
+                    self.store.add(key, task)
+            else:
+                # Handle recurrence
+                self.add_recurring_tasks(day, hour, name, priority, notes, repeat, duration)
             
             window.destroy()
             messagebox.showinfo("Success", "Task added successfully!")
         
-        ttk.Button(form_frame, text="Add Task", command=submit).grid(row=6, column=0, columnspan=2, pady=10)
+        ttk.Button(form_frame, text="Add Task", command=submit).grid(row=7, column=0, columnspan=2, pady=10)
         
         # Make columns expandable
         form_frame.columnconfigure(1, weight=1)
 
-    def add_recurring_tasks(self, start_day, hour, name, priority, notes, repeat_type):
-        """Add recurring tasks based on the pattern"""
-        if repeat_type == "Daily":
-            # Add to all days
-            for day in self.DAYS:
-                if day != start_day:  # Skip the original day
-                    key = f"{day}|{hour}"
-                    self.task_details[key] = {
-                        "name": name,
-                        "priority": priority,
-                        "notes": notes,
-                        "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "completed": False,
-                        "repeat": repeat_type
-                    }
-                    
-                    # Update entry in grid
-                    if (day, hour) in self.entries:
-                        self.entries[(day, hour)].delete(0, tk.END)
-                        self.entries[(day, hour)].insert(0, name)
-                        self.update_task_color((day, hour))
-        
-        elif repeat_type == "Weekly":
-            # Already added for current week in the main function
-            pass
+    def add_recurring_tasks(self, start_day, hour, name, priority, notes, repeat_type, duration=DEFAULT_DURATION):
+        """Add a recurring task series starting on start_day of the displayed week"""
+        start = self.day_date(start_day)
+        rule = rule_from_repeat(repeat_type, start)
+        task = new_task(name, priority, notes, repeat=repeat_type, duration=duration)
+        with self.undoable("add recurring task"):
+            # A single series record, its occurrences are only expanded for
+            # the week on screen, and undone as one change
+            series_id = self.recurrences.add(new_series(task, hour, rule))
             
-        elif repeat_type == "Weekdays":
-            # Add to Monday-Friday only
-            weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-            for day in weekdays:
-                if day != start_day:  # Skip the original day
-                    key = f"{day}|{hour}"
-                    self.task_details[key] = {
-                        "name": name,
-                        "priority": priority,
-                        "notes": notes,
-                        "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        "completed": False,
-                        "repeat": repeat_type
-                    }
-                    
-                    # Update entry in grid
-                    if (day, hour) in self.entries:
-                        self.entries[(day, hour)].delete(0, tk.END)
-                        self.entries[(day, hour)].insert(0, name)
-                        self.update_task_color((day, hour))
+            # The new series starts on the chosen slot even if another task was there
+            key = self.task_key((start_day, hour))
+            if key in self.store and key not in self._occurrences:
+                self.store.delete(key)
+            self.expand_recurrences()
+        return series_id
 
+    @instrumented("dialog.details")
     def open_task_details(self, day, hour):
         """Open a window to show and edit task details"""
-        key = f"{day}|{hour}"
+        key = self.task_key((day, hour))
+        
+        # Make sure text typed directly into the cell has reached the store
+        self.commit_entry((day, hour))
         
         # Check if task exists at this location
-        if key not in self.task_details and not self.entries[(day, hour)].get().strip():
+        if key not in self.store:
             messagebox.showinfo("No Task", "No task exists at this time slot.")
             return
-            
-        # Create or update task details if entry has content but no details
-        if key not in self.task_details and self.entries[(day, hour)].get().strip():
-            content = self.entries[(day, hour)].get().strip()
-            self.task_details[key] = {
-                "name": content,
-                "priority": "medium",
-                "notes": "",
-                "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "completed": False,
-                "repeat": "None"
-            }
         
         # Create task details window
         window = tk.Toplevel(self.root)
         window.title(f"Task Details: {day} {hour}")
-        window.geometry("400x350")
+        window.geometry("400x420")
         
         # Apply current theme
         if self.current_theme == "dark":
@@ -341,34 +825,46 @@ class Autodo:
         form_frame = ttk.Frame(window)
         form_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
         
-        task_info = self.task_details.get(key, {})
+        task_info = self.store[key]
         
         ttk.Label(form_frame, text="Task Name:").grid(row=0, column=0, sticky="w", pady=5)
         name_entry = ttk.Entry(form_frame, width=30)
-        name_entry.insert(0, task_info.get("name", ""))
+        name_entry.insert(0, task_info.name)
         name_entry.grid(row=0, column=1, sticky="we", pady=5)
         
         ttk.Label(form_frame, text="Priority:").grid(row=1, column=0, sticky="w", pady=5)
         priority_combo = ttk.Combobox(form_frame, values=["high", "medium", "low"], state="readonly")
         priority_combo.grid(row=1, column=1, sticky="we", pady=5)
-        priority_current = task_info.get("priority", "medium")
-        priority_options = ["high", "medium", "low"]
-        priority_combo.current(priority_options.index(priority_current))
+        priority_combo.current(PRIORITIES.index(task_info.priority.value))
         
         ttk.Label(form_frame, text="Notes:").grid(row=2, column=0, sticky="nw", pady=5)
         notes_text = tk.Text(form_frame, width=30, height=5)
-        notes_text.insert("1.0", task_info.get("notes", ""))
+        notes_text.insert("1.0", task_info.notes)
         notes_text.grid(row=2, column=1, sticky="we", pady=5)
         
         # Show creation date
         ttk.Label(form_frame, text="Created:").grid(row=3, column=0, sticky="w", pady=5)
-        created_label = ttk.Label(form_frame, text=task_info.get("created", ""))
+        created_label = ttk.Label(form_frame, text=task_info["created"])
         created_label.grid(row=3, column=1, sticky="w", pady=5)
         
+        ttk.Label(form_frame, text="Duration:").grid(row=4, column=0, sticky="w", pady=5)
+        duration_combo = ttk.Combobox(form_frame, values=list(DURATIONS), state="readonly")
+        duration_combo.grid(row=4, column=1, sticky="we", pady=5)
+        duration = task_info.duration
+        duration_combo.set(f"{duration // 60}:{duration % 60:02d}")
+        
         # Completed checkbox
-        completed_var = tk.BooleanVar(value=task_info.get("completed", False))
+        completed_var = tk.BooleanVar(value=task_info.completed)
         completed_check = ttk.Checkbutton(form_frame, text="Completed", variable=completed_var)
-        completed_check.grid(row=4, column=0, columnspan=2, sticky="w", pady=5)
+        completed_check.grid(row=5, column=0, columnspan=2, sticky="w", pady=5)
+        
+        # Occurrences of a recurring task can be edited alone or as a series
+        series_id = self._occurrences.get(key)
+        series_var = tk.BooleanVar(value=False)
+        if series_id is not None:
+            series_check = ttk.Checkbutton(form_frame, text=f"Apply to all occurrences ({task_info.repeat.value})",
+                                           variable=series_var)
+            series_check.grid(row=6, column=0, columnspan=2, sticky="w", pady=5)
         
         # Save and delete buttons
         def save_details():
@@ -376,40 +872,53 @@ class Autodo:
             if not name:
                 messagebox.showerror("Error", "Task name cannot be empty")
                 return
-                
-            # Update task details
-            self.task_details[key] = {
+            
+            fields = {
                 "name": name,
                 "priority": priority_combo.get(),
                 "notes": notes_text.get("1.0", tk.END).strip(),
-                "created": task_info.get("created", datetime.now().strftime("%Y-%m-%d %H:%M")),
-                "completed": completed_var.get(),
-                "repeat": task_info.get("repeat", "None")
+                "duration": DURATIONS.get(duration_combo.get(), duration)
             }
+            if not self.confirm_no_conflict(key, task_info.replace(**fields), parent=window):
+                return
             
-            # Update the entry in the grid
-            self.entries[(day, hour)].delete(0, tk.END)
-            self.entries[(day, hour)].insert(0, name)
-            self.update_task_color((day, hour))
+            with self.undoable("edit task"):
+                if series_var.get() and series_id in self.recurrences:
+                    # One change to the series record updates every occurrence;
+                    # completion always stays per occurrence
+                    self.recurrences.update(series_id, **fields)
+                    self.store.update(key, completed=completed_var.get())
+                    self.expand_recurrences()
+                else:
+                    # Update task details, the grid cell is refreshed by the store listener
+                    self.store.update(key, completed=completed_var.get(), **fields)
             
             window.destroy()
         
         def delete_task():
-            if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this task?"):
-                # Remove task from details
-                if key in self.task_details:
-                    del self.task_details[key]
-                
-                # Clear entry in grid
-                self.entries[(day, hour)].delete(0, tk.END)
-                
-                # Reset background color
-                self.entries[(day, hour)].configure(bg="white")
+            if series_id is not None:
+                answer = messagebox.askyesnocancel(
+                    "Confirm Delete",
+                    "This task repeats. Delete all of its occurrences?\n\nYes = Delete all\nNo = Delete only this one\nCancel = Keep it"
+                )
+                if answer is None:
+                    return
+                with self.undoable("delete task"):
+                    if answer:
+                        self.recurrences.delete(series_id)
+                        self.expand_recurrences()
+                    else:
+                        self.store.delete(key)
+                window.destroy()
+            elif messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this task?"):
+                # Remove task from the store, which also clears the grid cell
+                with self.undoable("delete task"):
+                    self.store.delete(key)
                 
                 window.destroy()
         
         button_frame = ttk.Frame(form_frame)
-        button_frame.grid(row=5, column=0, columnspan=2, pady=10)
+        button_frame.grid(row=7, column=0, columnspan=2, pady=10)
         
         ttk.Button(button_frame, text="Save", command=save_details).pack(side=tk.LEFT, padx=10)
         ttk.Button(button_frame, text="Delete", command=delete_task).pack(side=tk.LEFT, padx=10)
@@ -417,26 +926,326 @@ class Autodo:
         # Make columns expandable
         form_frame.columnconfigure(1, weight=1)
 
+    def cell_color(self, cell_key):
+        """Background color of a cell based on priority and completion status"""
+        task_info = self.store.get(self.task_key(cell_key))
+        if task_info is None:
+            return "white"
+        if task_info.completed:
+            return self.priority_colors["completed"]
+        return self.priority_colors[task_info.priority]
+
     def update_task_color(self, cell_key):
         """Update the color of a task cell based on priority and completion status"""
-        day, hour = cell_key
-        key = f"{day}|{hour}"
-        
-        if key in self.task_details:
-            task_info = self.task_details[key]
-            priority = task_info.get("priority", "medium")
-            completed = task_info.get("completed", False)
-            
-            if completed:
-                color = self.priority_colors["completed"]
+        if self.canvas_grid is not None:
+            self.canvas_grid.refresh(cell_key)
+        elif cell_key in self.entries:
+            self.entries[cell_key].configure(bg=self.cell_color(cell_key))
+
+    def highlight_cell(self, cell_key, color=None):
+        """Temporarily paint a cell in color, None restores its normal color"""
+        if self.canvas_grid is not None:
+            self.canvas_grid.set_highlight(cell_key, color)
+        elif cell_key in self.entries:
+            self.entries[cell_key].configure(bg=color or self.cell_color(cell_key))
+
+    def refresh_cell(self, cell_key):
+        """Redraw one grid cell from the task store"""
+        if self.canvas_grid is not None:
+            self.canvas_grid.refresh(cell_key)
+            return
+        entry = self.entries.get(cell_key)
+        if entry is None:
+            return
+        task_info = self.store.get(self.task_key(cell_key))
+        name = task_info.name if task_info is not None else ""
+        if entry.get() != name:
+            entry.delete(0, tk.END)
+            entry.insert(0, name)
+        self.update_task_color(cell_key)
+        conflict = cell_key in self._conflicts
+        entry.configure(highlightthickness=2 if conflict else 1,
+                        highlightbackground=CONFLICT_COLOR if conflict else self._entry_highlight)
+
+    def _cell_info(self, cell_key):
+        """Text, background and outline of a cell, as drawn by the canvas grid"""
+        task_info = self.store.get(self.task_key(cell_key))
+        name = task_info.name if task_info is not None else ""
+        outline = CONFLICT_COLOR if cell_key in self._conflicts else None
+        return name, self.cell_color(cell_key), outline
+
+    def _cell_block(self, cell_key):
+        """First cell and row count of the block a cell is drawn in"""
+        owner = self._covered.get(cell_key, cell_key)
+        return owner, self._spans.get(owner, 1)
+
+    def _layout_day(self, day):
+        """Recompute which cells of a day are covered by tasks longer than an hour.
+
+        A long task is cut short where the next task starts, the overlap then
+        shows up as a conflict instead. Returns True if the layout changed.
+        """
+        spans, covered = {}, {}
+        owner, rows_left = None, 0
+        for hour in self.HOURS:
+            cell_key = (day, hour)
+            task_info = self.store.get(self.task_key(cell_key))
+            if task_info is not None:
+                owner = cell_key
+                rows_left = -(-task_info.duration // 60) - 1
+            elif owner is not None and rows_left > 0:
+                covered[cell_key] = owner
+                spans[owner] = spans.get(owner, 1) + 1
+                rows_left -= 1
             else:
-                color = self.priority_colors[priority]
-                
-            self.entries[cell_key].configure(bg=color)
+                owner = None
+        
+        old_spans = {cell: rows for cell, rows in self._spans.items() if cell[0] == day}
+        old_covered = {cell: first for cell, first in self._covered.items() if cell[0] == day}
+        if spans == old_spans and covered == old_covered:
+            return False
+        for cell in old_spans:
+            del self._spans[cell]
+        for cell in old_covered:
+            del self._covered[cell]
+        self._spans.update(spans)
+        self._covered.update(covered)
+        
+        # Entry grid: the first entry of a block grows over the rows it
+        # covers, the entries underneath are hidden until uncovered. Rows
+        # that are still being built pick up the layout when they are
+        for cell in old_covered:
+            if cell not in covered and cell in self.entries:
+                self.entries[cell].grid()
+        for cell in covered:
+            if cell in self.entries:
+                self.entries[cell].grid_remove()
+        for cell in set(old_spans) | set(spans):
+            if cell in self.entries:
+                self.entries[cell].grid_configure(rowspan=spans.get(cell, 1))
+        return True
+
+    def _find_conflicts(self):
+        """Cells of the displayed week whose task overlaps another task"""
+        conflicts = set()
+        for key in self.store.query(week=self.current_week):
+            if self.store.conflicts(key):
+                cell_key = self.cell_for_key(key)
+                if cell_key is not None:
+                    conflicts.add(cell_key)
+        return conflicts
+
+    def confirm_no_conflict(self, key, task, parent=None):
+        """Ask before adding or changing a task so that it overlaps others"""
+        # Overlaps the task already had were accepted before
+        accepted = set(self.store.conflicts(key))
+        conflicts = [other for other in self.store.conflicts(key, task) if other not in accepted]
+        if not conflicts:
+            return True
+        names = [f"{self.store[other].get('name', '')} ({split_key(other)[1]})" for other in conflicts[:5]]
+        return messagebox.askyesno(
+            "Time Conflict",
+            "This task overlaps:\n" + "\n".join(names) + "\n\nSave it anyway?",
+            parent=parent
+        )
+
+    def _typed_text(self, cell_key):
+        """Text currently typed into a cell's editor, or None"""
+        if self.canvas_grid is not None:
+            return self.canvas_grid.editor_text(cell_key)
+        entry = self.entries.get(cell_key)
+        return entry.get() if entry is not None else None
+
+    def _start_editing(self, cell_key):
+        self._editing_cell = cell_key
+
+    def commit_entry(self, cell_key):
+        """Copy the text typed into a grid cell into the task store"""
+        content = self._typed_text(cell_key)
+        if content is None:
+            if cell_key == self._editing_cell:
+                self._editing_cell = None
+            return
+        self.commit_text(cell_key, content)
+
+    def commit_text(self, cell_key, content):
+        """Store content as the task name of a cell, clearing it removes the task"""
+        if cell_key == self._editing_cell:
+            self._editing_cell = None
+        content = content.strip()
+        key = self.task_key(cell_key)
+        task_info = self.store.get(key)
+        with self.undoable("edit"):
+            if content:
+                if task_info is None:
+                    self.store.add(key, new_task(content))
+                elif task_info.name != content:
+                    self.store.update(key, name=content)
+            elif task_info is not None:
+                # Clearing a cell removes its task
+                self.store.delete(key)
+
+    def _on_store_changed(self, changes):
+        """Keep the grid in sync with mutations of the task store"""
+        # Cells are repainted together once the event loop is idle, so a
+        # burst of changes touching a cell many times redraws it only once
+        self.render_queue.add(self.cell_for_key(key) for key, old, new in changes)
+        self.autosaver.schedule()
+        if self.undo_log.recording:
+            # Occurrences come and go with their series, whose changes are
+            # recorded instead; to undo, a slot they fill counts as empty
+            for key, old, new in changes:
+                old = old if old is not None and old.series is None else None
+                new = new if new is not None and new.series is None else None
+                if old is not None or new is not None:
+                    self.undo_log.record("task", key, old, new)
+
+    @contextmanager
+    def undoable(self, label):
+        """Record the changes of a user action as one undo step"""
+        with self.undo_log.group(label):
+            yield
+            # Edits of occurrences become changes of their series, which
+            # belong to the same step
+            self._fold_occurrence_changes()
+
+    def undo(self):
+        if self._editing_cell is not None:
+            self.commit_entry(self._editing_cell)
+        label = self.undo_log.undo()
+        self.status_var.set(f"Undid {label}" if label else "Nothing to undo")
+
+    def redo(self):
+        if self._editing_cell is not None:
+            self.commit_entry(self._editing_cell)
+        label = self.undo_log.redo()
+        self.status_var.set(f"Redid {label}" if label else "Nothing to redo")
+
+    def _apply_undo(self, changes):
+        """Set tasks and series to the values of changes, (kind, key, value) from the undo log"""
+        self._fold_occurrence_changes()
+        with self.store.batch():
+            for kind, key, value in changes:
+                if kind == "series":
+                    if value is None:
+                        self.recurrences.delete(key)
+                    else:
+                        self.recurrences.add(value, key)
+                else:
+                    self.set_task(key, value)
+        # Occurrences follow the restored series
+        self.expand_recurrences()
+
+    def get_task(self, key):
+        """The task at key in any week, None if there is none; occurrences only in the displayed week"""
+        week = key_week(key)
+        if week == self.current_week:
+            return self.store.get(key)
+        task = self.week_cache.get(week).get(key)
+        return Task.coerce(task) if task is not None else None
+
+    def set_task(self, key, task):
+        """Add, replace or (task None) delete the task at key, in any week"""
+        week = key_week(key)
+        if week is None:
+            raise ValueError(f"Task key {key!r} has no date")
+        if week != self.current_week:
+            self._set_other_week(key, task)
+        elif task is not None:
+            self.store.add(key, task)
+            self._occurrences.pop(key, None)
+        elif key not in self._occurrences:
+            self.store.delete(key)
+
+    def _set_other_week(self, key, task):
+        """Change a task of a week that isn't displayed, the next save writes it"""
+        week = key_week(key)
+        tasks = dict(self.week_cache.get(week))
+        if task is None:
+            tasks.pop(key, None)
         else:
-            # Reset to default if no task
-            self.entries[cell_key].configure(bg="white")
+            tasks[key] = task
+        # Cached as changed until it's written, see show_week()
+        self.week_cache.put(week, tasks, self.week_cache.stamp_of(week))
+        self._queue_other_week(key, task)
+        self.autosaver.schedule()
+
+    def read_view(self):
+        """(week -> tasks, series) of what's in memory, to read the schedule off the Tk thread.
+
+        The displayed and the cached weeks are the latest version of their
+        tasks, other weeks can be read from storage as they are saved.
+        """
+        weeks = self.week_cache.snapshot()
+        weeks[self.current_week] = {key: task for key, task in self.store.items() if key not in self._occurrences}
+        return weeks, self.recurrences.snapshot()
+
+    def search_all_weeks(self, query, priority=None, completed=None, weekday=None):
+        """Yield (key, task) of the tasks of every week matching query and the filters, in date order.
 
+        The displayed week is looked up in the search index, other weeks are
+        read one at a time, from memory if they are cached and else from
+        storage, and checked with searchindex.matches(). Occurrences of
+        recurring tasks are included in the weeks that have stored tasks.
+        weekday (0 is Monday) keeps only the tasks of that day of each week.
+        """
+        from csv_export import task_order  # In the order of an export
+        words = tokenize(query)
+        weeks, recurrences = self.read_view()
+        for week in sorted(set(self.storage.weeks()) | set(weeks)):
+            monday = week_monday(week)
+            day = (monday + timedelta(days=weekday)).isoformat() if weekday is not None else None
+            if week == self.current_week:
+                keys = self.search_index.search(query, priority=priority, completed=completed, day=day)
+                found = {key: self.store[key] for key in keys}
+            else:
+                tasks = recurrences.expand_week(monday)
+                tasks.update(weeks[week] if week in weeks else self.storage.read_week(week))
+                found = {}
+                for key, task in tasks.items():
+                    task = Task.coerce(task)
+                    if ((day is None or split_key(key)[0] == day)
+                            and (priority is None or task.priority.value == priority)
+                            and (completed is None or task.completed == completed)
+                            and matches(task, words)):
+                        found[key] = task
+            for key in sorted(found, key=task_order):
+                yield key, found[key]
+
+    def goto_key(self, key, search_window=None):
+        """Display the week of a task key and go to its cell"""
+        self.show_week(parse_date(split_key(key)[0]))
+        day, hour = self.cell_for_key(key)
+        self.goto_task(day, hour, search_window)
+
+    def start_api(self, port=None):
+        """Serve the tasks as a JSON API on 127.0.0.1, see api.ApiServer"""
+        # Imported on first use, most sessions don't need it
+        from api import ApiServer, API_PORT
+        self.api_server = ApiServer(self, API_PORT if port is None else port)
+        self.api_server.start()
+        self.status_var.set(f"API listening on 127.0.0.1:{self.api_server.port}")
+        return self.api_server
+
+    @instrumented("grid.render")
+    def _render_cells(self, cells):
+        """Repaint changed cells, the single update pass of the render queue"""
+        cells.discard(None)
+        
+        # Long tasks change which cells they cover, and overlaps may come or go
+        layout_changed = False
+        for day in {cell_key[0] for cell_key in cells}:
+            layout_changed |= self._layout_day(day)
+        conflicts = self._find_conflicts()
+        cells |= conflicts ^ self._conflicts
+        self._conflicts = conflicts
+        
+        if layout_changed and self.canvas_grid is not None:
+            self.canvas_grid.schedule_redraw()
+        for cell_key in cells:
+            self.refresh_cell(cell_key)
+
+    @instrumented("dialog.search")
     def open_search_window(self):
         """Open window to search for tasks"""
         window = tk.Toplevel(self.root)
@@ -461,100 +1270,130 @@ class Autodo:
         search_entry = ttk.Entry(search_frame, width=30)
         search_entry.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
         
-        # Create results frame
-        results_frame = ttk.Frame(window)
-        results_frame.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
+        # Filters applied through the store's indexes
+        filter_frame = ttk.Frame(window)
+        filter_frame.pack(padx=20, fill=tk.X)
+        
+        ttk.Label(filter_frame, text="Priority:").pack(side=tk.LEFT, padx=5)
+        priority_combo = ttk.Combobox(filter_frame, values=["Any"] + PRIORITIES, state="readonly", width=8)
+        priority_combo.current(0)
+        priority_combo.pack(side=tk.LEFT)
+        
+        ttk.Label(filter_frame, text="Status:").pack(side=tk.LEFT, padx=5)
+        status_combo = ttk.Combobox(filter_frame, values=["Any", "Open", "Completed"], state="readonly", width=10)
+        status_combo.current(0)
+        status_combo.pack(side=tk.LEFT)
+        
+        ttk.Label(filter_frame, text="Day:").pack(side=tk.LEFT, padx=5)
+        day_combo = ttk.Combobox(filter_frame, values=["Any"] + self.DAYS, state="readonly", width=10)
+        day_combo.current(0)
+        day_combo.pack(side=tk.LEFT)
+        
+        # The displayed week is searched as you type, all weeks on Enter as
+        # they are read from storage
+        scope_frame = ttk.Frame(window)
+        scope_frame.pack(padx=20, pady=(5, 0), fill=tk.X)
+        ttk.Label(scope_frame, text="Search in:").pack(side=tk.LEFT, padx=5)
+        scope_combo = ttk.Combobox(scope_frame, values=["This week", "All weeks"], state="readonly", width=10)
+        scope_combo.current(0)
+        scope_combo.pack(side=tk.LEFT)
+        scope_hint = ttk.Label(scope_frame)
+        scope_hint.pack(side=tk.LEFT, padx=5)
+        
+        # Results list: only visible rows have widgets, and those are reused
+        def fill_result_row(row, item):
+            key, task_info = item
+            day_text, hour = split_key(key)
+            cell_key = self.cell_for_key(key)
+            if cell_key is not None:
+                # Shown in the grid, so it may have been edited since
+                task_info = self.store.get(key)
+                if task_info is None:
+                    return
+                when = f"{cell_key[0]} at {hour}"
+            else:
+                when = f"{parse_date(day_text).strftime('%A %m/%d/%Y')} at {hour}"
+            row.indicator.configure(bg=self.priority_colors[task_info.priority])
+            row.name_label.configure(text=task_info.name)
+            row.time_label.configure(text=when)
+            row.status_label.configure(text="Completed" if task_info.completed else "")
+            row.goto_btn.configure(command=lambda: self.goto_key(key, window))
+        
+        def make_result_row(parent):
+            row = SearchResultRow(parent)
+            for widget in (row.frame, row.name_label, row.time_label, row.status_label):
+                results.bind_scroll(widget)
+            return row
         
-        # Create scrollable results
-        results_canvas = tk.Canvas(results_frame, bg=bg_color)
-        scrollbar = ttk.Scrollbar(results_frame, orient="vertical", command=results_canvas.yview)
-        scrollable_frame = ttk.Frame(results_canvas)
+        results = VirtualList(window, RESULT_ROW_HEIGHT, make_result_row, fill_result_row, bg=bg_color)
+        results.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: results_canvas.configure(scrollregion=results_canvas.bbox("all"))
-        )
+        count_label = ttk.Label(window)
+        count_label.pack(padx=20, anchor="w")
         
-        results_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        results_canvas.configure(yscrollcommand=scrollbar.set)
+        def show_count(count):
+            count_label.configure(text=f"{count} task(s) found" if count else "")
+            if not count:
+                results.show_message("No tasks found")
         
-        results_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        results.on_complete = show_count
+        
+        def all_weeks():
+            return scope_combo.get() == "All weeks"
         
         # Function to perform search
         def perform_search():
-            # Clear previous results
-            for widget in scrollable_frame.winfo_children():
-                widget.destroy()
-                
-            query = search_entry.get().lower().strip()
-            if not query:
-                ttk.Label(scrollable_frame, text="Enter a search term").pack(pady=10)
+            query = search_entry.get().strip()
+            filters = {
+                "priority": None if priority_combo.get() == "Any" else priority_combo.get(),
+                "completed": {"Open": False, "Completed": True}.get(status_combo.get()),
+            }
+            day = None if day_combo.get() == "Any" else day_combo.get()
+            if not query and not any(value is not None for value in filters.values()) and day is None:
+                count_label.configure(text="")
+                results.show_message("Enter a search term")
                 return
-                
-            # Search in tasks
-            results = []
-            for key, task_info in self.task_details.items():
-                name = task_info.get("name", "").lower()
-                notes = task_info.get("notes", "").lower()
-                
-                if query in name or query in notes:
-                    day, hour = key.split('|')
-                    results.append((day, hour, task_info))
             
-            # Display results
-            if not results:
-                ttk.Label(scrollable_frame, text="No tasks found").pack(pady=10)
-            else:
-                for day, hour, task_info in results:
-                    result_frame = ttk.Frame(scrollable_frame)
-                    result_frame.pack(fill=tk.X, pady=5, padx=5)
-                    
-                    # Priority indicator
-                    priority = task_info.get("priority", "medium")
-                    priority_color = self.priority_colors[priority]
-                    
-                    indicator = tk.Frame(result_frame, width=10, bg=priority_color)
-                    indicator.pack(side=tk.LEFT, fill=tk.Y)
-                    
-                    # Task details
-                    details_frame = ttk.Frame(result_frame)
-                    details_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-                    
-                    name_label = ttk.Label(
-                        details_frame, 
-                        text=task_info.get("name", ""),
-                        font=("TkDefaultFont", 10, "bold")
-                    )
-                    name_label.pack(anchor="w")
-                    
-                    time_label = ttk.Label(details_frame, text=f"{day} at {hour}")
-                    time_label.pack(anchor="w")
-                    
-                    if task_info.get("completed", False):
-                        status_label = ttk.Label(details_frame, text="Completed", foreground="green")
-                        status_label.pack(anchor="w")
-                    
-                    # Go to button
-                    def make_goto_function(d, h):
-                        return lambda: self.goto_task(d, h, window)
-                    
-                    goto_btn = ttk.Button(
-                        result_frame, 
-                        text="Go to", 
-                        command=make_goto_function(day, hour)
-                    )
-                    goto_btn.pack(side=tk.RIGHT, padx=5)
+            # Stream the matches into the list page by page
+            if all_weeks():
+                weekday = self.DAYS.index(day) if day is not None else None
+                results.set_items(self.search_all_weeks(query, weekday=weekday, **filters))
+                return
+            if day is not None:
+                filters["day"] = self.day_date(day).isoformat()
+            with self.instruments.timed("search"):
+                keys = self.search_index.search(query, **filters)
+            results.set_items((key, self.store[key]) for key in keys)
+        
+        def on_key(event):
+            if not all_weeks():
+                perform_search()
+        
+        def on_scope(event):
+            scope_hint.configure(text="Press Enter to search" if all_weeks() else "")
+            perform_search()
         
         # Search button
         search_button = ttk.Button(search_frame, text="Search", command=perform_search)
         search_button.pack(side=tk.LEFT, padx=5)
         
-        # Bind Enter key
+        # Flash every match in the grid without leaving the search window
+        def highlight_matches():
+            cell_keys = [self.cell_for_key(key) for key, task in results.items]
+            self.highlight_cells([cell_key for cell_key in cell_keys if cell_key is not None])
+        
+        highlight_button = ttk.Button(filter_frame, text="Highlight All", command=highlight_matches)
+        highlight_button.pack(side=tk.RIGHT, padx=5)
+        
+        # Update the results as the user types or changes a filter
         search_entry.bind("<Return>", lambda e: perform_search())
+        search_entry.bind("<KeyRelease>", on_key)
+        for combo in (priority_combo, status_combo, day_combo):
+            combo.bind("<<ComboboxSelected>>", lambda e: perform_search())
+        scope_combo.bind("<<ComboboxSelected>>", on_scope)
         
         # Initial search results placeholder
-        ttk.Label(scrollable_frame, text="Enter a search term and press Search").pack(pady=10)
+        results.show_message("Start typing to search")
 
 
 
@@ -563,28 +1402,71 @@ class Autodo:
         # Close search window if provided
         if search_window:
             search_window.destroy()
-            
-        # Get row and column of the task
-        row = self.HOURS.index(hour) + 1
-        col = self.DAYS.index(day) + 1
-        
-        # Flash the cell to highlight it
-        for i in range(5):  # Flash 5 times
-            self.entries[(day, hour)].configure(bg="lightblue")
-            self.root.update()
-            self.root.after(200)  # Wait for 200ms
-            self.update_task_color((day, hour))
-            self.root.update()
-            self.root.after(200)
-            
-        # Open task details
-        self.open_task_details(day, hour)
+        
+        # Only one "go to" flash at a time, the newest wins; pending repaints
+        # go first so they can't paint over the flash
+        self.animations.cancel_tag("goto")
+        self.render_queue.flush()
+        self.scroll_to_cell((day, hour))
+        self.animations.start(self._goto_animation((day, hour)), tag="goto")
+
+    def _goto_animation(self, cell_key):
+        """Flash the cell, then open its details unless cancelled"""
+        yield from self.flash_cell(cell_key)
+        self.open_task_details(*cell_key)
+
+    def flash_cell(self, cell_key, times=5, interval_ms=200):
+        """Animation blinking a cell; its normal color is restored even if cancelled"""
+        try:
+            for i in range(times):
+                self.highlight_cell(cell_key, "lightblue")
+                yield interval_ms
+                self.highlight_cell(cell_key)
+                yield interval_ms
+        finally:
+            self.highlight_cell(cell_key)
+
+    def highlight_cells(self, cell_keys):
+        """Flash several cells at once, e.g. all search matches"""
+        self.animations.cancel_tag("matches")
+        self.render_queue.flush()
+        for cell_key in cell_keys:
+            self.animations.start(self.flash_cell(cell_key), tag="matches")
 
+    def scroll_to_cell(self, cell_key):
+        """Scroll the grid so that a cell is in view"""
+        if self.canvas_grid is not None:
+            self.canvas_grid.scroll_to(cell_key)
+            return
+        if cell_key not in self.entries and self._pending_rows:
+            self._build_pending_rows(len(self._pending_rows))
+            self.grid_canvas.update_idletasks()
+        if cell_key in self.entries and self.grid_canvas is not None:
+            bbox = self.grid_canvas.bbox("all")
+            if bbox:
+                entry = self.entries[cell_key]
+                top = max(entry.winfo_y() - entry.winfo_height(), 0)
+                self.grid_canvas.yview_moveto(top / max(bbox[3] - bbox[1], 1))
+
+    @instrumented("dialog.help")
     def open_help_window(self):
         """Open window with help information"""
+        # The window is built once and only hidden when closed, unless the
+        # theme changed since
+        window = self._help_window
+        if window is not None and window.winfo_exists():
+            if self._help_theme == self.current_theme:
+                window.deiconify()
+                window.lift()
+                return
+            window.destroy()
+        
         window = tk.Toplevel(self.root)
         window.title("Help")
         window.geometry("600x500")
+        self._help_theme = self.current_theme
+        window.protocol("WM_DELETE_WINDOW", window.withdraw)
+        self._help_window = window
         
         # Apply current theme
         if self.current_theme == "dark":
@@ -615,15 +1497,23 @@ How to Use Autodo:
    - Add Task (Ctrl+N): Open form to add detailed tasks
    - Click on existing tasks to view/edit details
    - Set priorities and mark tasks as completed
+   - Undo (Ctrl+Z) and Redo (Ctrl+Y) edits, deletes and new recurring tasks
 
 3. Save & Export:
    - Save Schedule (Ctrl+S): Save your current plan
    - Data is automatically loaded next time
    - Export to CSV: Share or print your schedule
+   - Import CSV: Load many tasks at once from a spreadsheet
 
 4. Search:
    - Search Tasks (Ctrl+F): Find tasks by name or content
+   - Results update as you type, words match by prefix
+   - Narrow results by priority, status or day
    - Click "Go to" to navigate to the task in schedule
+
+5. Weeks:
+   - Previous Week / Next Week page through your schedule
+   - This Week returns to the current week
 """
         basic_help = tk.Text(basic_frame, wrap="word", width=70, height=20, bg=text_bg, fg=text_fg)
         basic_help.insert("1.0", basic_text)
@@ -641,7 +1531,13 @@ Ctrl+S - Save schedule
 Ctrl+Q - Quit application
 Ctrl+F - Search tasks
 Ctrl+N - Add new task
+Ctrl+Z - Undo
+Ctrl+Y - Redo (also Ctrl+Shift+Z)
 F1     - Open this help window
+Ctrl+Shift+D - Open the diagnostics window
+Alt+Left  - Previous week
+Alt+Right - Next week
+Alt+Home  - This week
 """
         shortcut_help = tk.Text(shortcut_frame, wrap="word", width=70, height=20, bg=text_bg, fg=text_fg)
         shortcut_help.insert("1.0", shortcuts_text)
@@ -675,6 +1571,7 @@ Key Features:
 4. Data Management:
    - Automatic saving
    - Export to CSV
+   - Bulk import from CSV
    - Unsaved changes detection
 """
         features_help = tk.Text(features_frame, wrap="word", width=70, height=20, bg=text_bg, fg=text_fg)
@@ -682,39 +1579,140 @@ Key Features:
         features_help.configure(state="disabled")
         features_help.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
 
-    def has_unsaved_changes(self):
-        """Comprehensive check for unsaved changes, including tasks added via the Add Task window"""
-        
-        # 1. 检查条目内容与保存状态的差异
-        current_entries = {}
-        for (day, hour), entry in self.entries.items():
-            content = entry.get().strip()
-            if content:  # 只考虑非空条目
-                current_entries[(day, hour)] = content
-        
-        # 条目集比较 - 检查是否有新增或删除的任务
-        if set(current_entries.keys()) != set(self.saved_schedule.keys()):
-            return True
+    def open_diagnostics_window(self):
+        """Open window with operation timings and profiles"""
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("700x560")
         
-        # 条目内容比较 - 检查任务名称是否已更改
-        for (day, hour), content in current_entries.items():
-            if content != self.saved_schedule.get((day, hour), ""):
-                return True
+        # Apply current theme
+        if self.current_theme == "dark":
+            window.configure(bg="#333333")
+            text_bg = "#444444"
+            text_fg = "white"
+        else:
+            window.configure(bg="#f0f0f0")
+            text_bg = "white"
+            text_fg = "black"
         
-        # 2. 检查任务详情变化
-        # 将当前task_details的键从"day|hour"格式转换为(day, hour)元组以便比较
-        current_task_keys = {tuple(k.split('|')): k for k in self.task_details.keys()}
+        # Timing is off by default, it can be switched on while the app runs
+        top_frame = ttk.Frame(window)
+        top_frame.pack(padx=10, pady=5, fill=tk.X)
+        enabled_var = tk.BooleanVar(value=self.instruments.enabled)
+        
+        def toggle_recording():
+            self.instruments.enabled = enabled_var.get()
+        
+        ttk.Checkbutton(top_frame, text="Record timings", variable=enabled_var,
+                        command=toggle_recording).pack(side=tk.LEFT)
+        
+        # One row per operation that has run
+        columns = ("count", "mean", "p50", "p95", "max")
+        table = ttk.Treeview(window, columns=columns, height=10)
+        table.heading("#0", text="Operation")
+        table.column("#0", width=160)
+        for column, heading in zip(columns, ("Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)")):
+            table.heading(column, text=heading)
+            table.column(column, width=90, anchor="e")
+        table.pack(padx=10, pady=5, fill=tk.X)
+        
+        # Profile the next run of an operation under cProfile and tracemalloc
+        profile_frame = ttk.Frame(window)
+        profile_frame.pack(padx=10, pady=5, fill=tk.X)
+        ttk.Label(profile_frame, text="Profile next:").pack(side=tk.LEFT)
+        operation_combo = ttk.Combobox(profile_frame, values=OPERATIONS, state="readonly", width=18)
+        operation_combo.current(0)
+        operation_combo.pack(side=tk.LEFT, padx=5)
+        profile_status = ttk.Label(profile_frame)
+        
+        def request_profile():
+            self.instruments.profile_next(operation_combo.get())
+            profile_status.configure(text=f"Waiting for the next {operation_combo.get()}")
+        
+        ttk.Button(profile_frame, text="Profile", command=request_profile).pack(side=tk.LEFT)
+        profile_status.pack(side=tk.LEFT, padx=10)
+        
+        report_text = tk.Text(window, wrap="none", height=14, bg=text_bg, fg=text_fg, font=("Courier", 9))
+        report_text.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+        
+        def show_report(event=None):
+            profile = self.instruments.profiles.get(operation_combo.get())
+            if profile is None:
+                text = f"No profile of {operation_combo.get()} yet"
+            else:
+                text = (f"{operation_combo.get()} at {profile['when']}: {profile['elapsed_ms']:.1f} ms, "
+                        f"peak memory {profile['peak_memory_kb']:.0f} KB\n\n"
+                        + profile["functions"] + "\nLargest allocations:\n" + "\n".join(profile["allocations"]))
+            report_text.configure(state="normal")
+            report_text.delete("1.0", tk.END)
+            report_text.insert("1.0", text)
+            report_text.configure(state="disabled")
+        
+        operation_combo.bind("<<ComboboxSelected>>", show_report)
+        
+        refresh_job = None
+        
+        def refresh():
+            nonlocal refresh_job
+            table.delete(*table.get_children())
+            for name, stats in self.instruments.to_dict()["operations"].items():
+                table.insert("", tk.END, text=name, values=(stats["count"], f"{stats['mean_ms']:.1f}", f"{stats['p50_ms']:.1f}",
+                                                            f"{stats['p95_ms']:.1f}", f"{stats['max_ms']:.1f}"))
+            if operation_combo.get() in self.instruments.profiles:
+                profile_status.configure(text="")
+                show_report()
+            refresh_job = window.after(DIAGNOSTICS_REFRESH_MS, refresh)
+        
+        def reset():
+            self.instruments.reset()
+            refresh_now()
+        
+        def refresh_now():
+            if refresh_job is not None:
+                window.after_cancel(refresh_job)
+            refresh()
+        
+        def save_json():
+            from tkinter import filedialog
+            filename = filedialog.asksaveasfilename(
+                parent=window,
+                defaultextension=".json",
+                filetypes=[("JSON files", "*.json")],
+                title="Save Diagnostics"
+            )
+            if filename:
+                try:
+                    self.instruments.dump(filename)
+                except OSError as e:
+                    messagebox.showerror("Error", f"Failed to save diagnostics: {e}", parent=window)
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(padx=10, pady=5, fill=tk.X)
+        ttk.Button(button_frame, text="Refresh", command=refresh_now).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Reset", command=reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save JSON...", command=save_json).pack(side=tk.RIGHT, padx=5)
+        
+        def on_window_close():
+            if refresh_job is not None:
+                window.after_cancel(refresh_job)
+            window.destroy()
         
-        # 通过Add Task窗口添加的新任务会出现在self.task_details中但不在self.saved_schedule中
-        for (day, hour) in current_task_keys:
-            if (day, hour) not in self.saved_schedule:
-                return True
+        window.protocol("WM_DELETE_WINDOW", on_window_close)
+        show_report()
+        refresh()
+
+    def has_unsaved_changes(self):
+        """Check for unsaved changes without scanning the grid or the tasks"""
+        # Every add, edit, detail change and delete marks its task dirty
+        if self.store.is_dirty or self.recurrences.is_dirty or self._retry_changes:
+            return True
         
-        # 3. 检查任务详情属性变化 (如果需要)
-        # 这部分可以添加更详细的属性比较，如优先级、备注等
-        # 但是对于基本的"添加任务检测"，上面的检查应该足够了
+        # Text typed into the focused cell hasn't reached the store yet
+        content = self._typed_text(self._editing_cell) if self._editing_cell else None
+        if content is not None:
+            task_info = self.store.get(self.task_key(self._editing_cell))
+            return content.strip() != (task_info.name if task_info is not None else "")
         
-        # 如果上述所有检查都通过，说明没有未保存的更改
         return False
 
     def on_close(self):
@@ -726,32 +1724,24 @@ Key Features:
                 )
                 if result is True:
                     self.save_schedule()
-                    self.root.destroy()
+                    self.autosaver.wait()
+                    self._quit()
                 elif result is False:
-                    self.root.destroy()
+                    self.autosaver.wait()
+                    self._quit()
                 else:
                     pass  # Cancelled, do nothing
             else:
-                self.root.destroy()
+                self.autosaver.wait()  # Let a running background save finish
+                self._quit()
 
-    def create_week_schedule(self):
-        """Create the weekly schedule grid with all enhancements"""
-        root = self.root
-        SCHEDULE = self.load_schedule()
-        self.saved_schedule = SCHEDULE
-        
-        # Configure root to expand properly
-        root.columnconfigure(0, weight=1)
-        root.rowconfigure(0, weight=1)
-        
-        # Main container frame with scrolling support
-        main_frame = ttk.Frame(root)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        # Configure main_frame to expand
-        main_frame.columnconfigure(0, weight=1)
-        main_frame.rowconfigure(0, weight=1)
-        
+    def _quit(self):
+        if self.api_server is not None:
+            self.api_server.stop()
+        self.root.destroy()
+
+    def _build_entry_grid(self, main_frame):
+        """Build the schedule as a grid of Entry widgets inside a scrolling canvas"""
         # Create canvas for scrolling
         canvas = tk.Canvas(main_frame)
         scrollbar_y = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
@@ -780,46 +1770,26 @@ Key Features:
         
         # Create weekday headers
         for col, day in enumerate([''] + self.DAYS):
-            label = ttk.Label(schedule_frame, text=day, borderwidth=1, relief="ridge", width=15, anchor='center')
+            label = ttk.Label(schedule_frame, text=self.day_label(day) if day else day, borderwidth=1, relief="ridge", width=15, anchor='center')
             label.grid(row=0, column=col, sticky='nsew')
-        
-        # Create hourly rows and task cells
-        for row, hour in enumerate(self.HOURS, start=1):
-            # Hour label
-            label = ttk.Label(schedule_frame, text=hour, borderwidth=1, relief="ridge", width=10)
-            label.grid(row=row, column=0, sticky='nsew')
-            
-            # Day entries
-            for col, day in enumerate(self.DAYS, start=1):
-                cell_key = (day, hour)
-                
-                # Create entry widget with adjusted size
-                entry = tk.Entry(schedule_frame, width=18, justify='center')
-                
-                # Get task content
-                task = ""
-                key = f"{day}|{hour}"
-                if key in self.task_details:
-                    task = self.task_details[key].get("name", "")
-                elif cell_key in SCHEDULE:
-                    task = SCHEDULE[cell_key]
-                    
-                entry.insert(0, task)
-                entry.grid(row=row, column=col, sticky='nsew', padx=1, pady=1)
-                self.entries[cell_key] = entry
-                
-                # Set background color based on priority
-                if key in self.task_details:
-                    priority = self.task_details[key].get("priority", "medium")
-                    completed = self.task_details[key].get("completed", False)
-                    
-                    if completed:
-                        entry.configure(bg=self.priority_colors["completed"])
-                    else:
-                        entry.configure(bg=self.priority_colors[priority])
-                
-                # Bind double-click to open task details
-                entry.bind("<Double-Button-1>", lambda e, d=day, h=hour: self.open_task_details(d, h))
+            if day:
+                self._day_labels.append(label)
+        
+        # Create hourly rows and task cells. Fast start only builds the rows
+        # that fit the window, the rest follow after the first paint
+        rows = list(enumerate(self.HOURS, start=1))
+        if self.fast_start:
+            visible = self.window_height // ENTRY_ROW_HEIGHT + 1
+            rows, self._pending_rows = rows[:visible], rows[visible:]
+        self._schedule_frame = schedule_frame
+        for row, hour in rows:
+            self._build_entry_row(row, hour)
+        
+        # Let tasks longer than an hour span their rows
+        self._spans.clear()
+        self._covered.clear()
+        for day in self.DAYS:
+            self._layout_day(day)
         
         # Make columns and rows auto-resize
         for i in range(len(self.DAYS) + 1):
@@ -827,18 +1797,115 @@ Key Features:
         for i in range(len(self.HOURS) + 1):
             schedule_frame.grid_rowconfigure(i, weight=1)
         
-        # Make the entries expand with the grid
-        def update_entry_widths(event):
-            cell_width = event.width // (len(self.DAYS) + 1) - 2  # Account for padding
+        # Make the entries expand with the grid; a drag produces a stream of
+        # Configure events, the entries are only resized once it settles
+        def update_entry_widths(width):
+            cell_width = width // (len(self.DAYS) + 1) - 2  # Account for padding
+            new_width = max(cell_width // 8, 10)  # Approximate character width
+            if new_width == self._entry_width:
+                return
+            self._entry_width = new_width
             for entry in self.entries.values():
-                entry.config(width=max(cell_width // 8, 10))  # Approximate character width
-                
-        schedule_frame.bind("<Configure>", update_entry_widths)
+                entry.config(width=new_width)
+        
+        resize = Debouncer(self.root.after, self.root.after_cancel, update_entry_widths)
+        schedule_frame.bind("<Configure>", lambda e: resize(e.width))
         
         # Update canvas scroll region
         schedule_frame.update_idletasks()
         canvas.config(scrollregion=canvas.bbox("all"))
         
+        return canvas
+
+    def _build_entry_row(self, row, hour):
+        """Create the hour label and the day entries of one entry grid row"""
+        label = ttk.Label(self._schedule_frame, text=hour, borderwidth=1, relief="ridge", width=10)
+        label.grid(row=row, column=0, sticky='nsew')
+        
+        for col, day in enumerate(self.DAYS, start=1):
+            cell_key = (day, hour)
+            
+            # Create entry widget with adjusted size
+            entry = tk.Entry(self._schedule_frame, width=self._entry_width, justify='center')
+            entry.grid(row=row, column=col, rowspan=self._spans.get(cell_key, 1), sticky='nsew', padx=1, pady=1)
+            if cell_key in self._covered:
+                entry.grid_remove()
+            self.entries[cell_key] = entry
+            self._entry_highlight = entry.cget("highlightbackground")
+            
+            # Fill in the task name and priority color from the store
+            self.refresh_cell(cell_key)
+            
+            # Bind double-click to open task details
+            entry.bind("<Double-Button-1>", lambda e, d=day, h=hour: self.open_task_details(d, h))
+            
+            # Push text typed directly into the cell to the store
+            entry.bind("<FocusIn>", lambda e, c=cell_key: self._start_editing(c))
+            entry.bind("<FocusOut>", lambda e, c=cell_key: self.commit_entry(c))
+            entry.bind("<Return>", lambda e, c=cell_key: self.commit_entry(c))
+
+    def _build_pending_rows(self, count=DEFERRED_ROW_CHUNK):
+        """Build up to count of the entry grid rows left out at startup"""
+        rows, self._pending_rows = self._pending_rows[:count], self._pending_rows[count:]
+        for row, hour in rows:
+            self._build_entry_row(row, hour)
+        if self._pending_rows:
+            return
+        self.grid_canvas.configure(scrollregion=self.grid_canvas.bbox("all"))
+        self.startup_times["grid_built"] = time.perf_counter() - START_TIME
+
+    def _build_rest_of_grid(self):
+        """Build the pending rows a few at a time, keeping the window responsive"""
+        if self._pending_rows:
+            self._build_pending_rows()
+            self.root.after(1, self._build_rest_of_grid)
+
+    def _build_canvas_grid(self, main_frame):
+        """Build the schedule as a virtualized grid drawn on a single canvas"""
+        self.canvas_grid = CanvasGrid(
+            main_frame, self.DAYS, self.HOURS,
+            column_labels=[self.day_label(day) for day in self.DAYS],
+            cell_info=self._cell_info,
+            cell_block=self._cell_block,
+            on_commit=self.commit_text,
+            on_open=lambda cell_key: self.open_task_details(*cell_key),
+            on_edit_start=self._start_editing
+        )
+        scrollbar_y = ttk.Scrollbar(main_frame, orient="vertical")
+        scrollbar_x = ttk.Scrollbar(main_frame, orient="horizontal")
+        self.canvas_grid.attach_scrollbars(scrollbar_x, scrollbar_y)
+        
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas_grid.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        return self.canvas_grid.canvas
+
+    def create_week_schedule(self):
+        """Create the weekly schedule grid with all enhancements"""
+        root = self.root
+        self.load_schedule()
+        self.startup_times["loaded"] = time.perf_counter() - START_TIME
+        
+        # Configure root to expand properly
+        root.columnconfigure(0, weight=1)
+        root.rowconfigure(0, weight=1)
+        
+        # Main container frame with scrolling support
+        main_frame = ttk.Frame(root)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Configure main_frame to expand
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(0, weight=1)
+        
+        # Build the grid, either as one widget per cell or drawn on a canvas
+        with self.instruments.timed("grid.build"):
+            if self.render_mode == "canvas":
+                canvas = self._build_canvas_grid(main_frame)
+            else:
+                canvas = self._build_entry_grid(main_frame)
+        self.grid_canvas = canvas
+        
         # Create bottom button bar
         button_bar = ttk.Frame(root)
         button_bar.pack(fill=tk.X, padx=10, pady=5)
@@ -856,20 +1923,51 @@ Key Features:
         export_btn = ttk.Button(button_bar, text="Export to CSV", command=self.export_to_csv)
         export_btn.pack(side=tk.LEFT, padx=5)
         
-        # Theme toggle button
-        def toggle_theme():
-            if self.current_theme == "light":
-                self.apply_theme("dark")
-            else:
-                self.apply_theme("light")
+        import_btn = ttk.Button(button_bar, text="Import CSV", command=self.import_from_csv)
+        import_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Week navigation
+        next_btn = ttk.Button(button_bar, text="Next Week ▶", command=self.next_week)
+        next_btn.pack(side=tk.RIGHT, padx=5)
+        today_btn = ttk.Button(button_bar, text="This Week", command=self.this_week)
+        today_btn.pack(side=tk.RIGHT, padx=5)
+        prev_btn = ttk.Button(button_bar, text="◀ Previous Week", command=self.previous_week)
+        prev_btn.pack(side=tk.RIGHT, padx=5)
         
-        theme_btn = ttk.Button(button_bar, text="Toggle Theme", command=toggle_theme)
+        # Theme toggle button
+        theme_btn = ttk.Button(button_bar, text="Toggle Theme", command=self.toggle_theme)
         theme_btn.pack(side=tk.RIGHT, padx=5)
         
         help_btn = ttk.Button(button_bar, text="Help", command=self.open_help_window)
         help_btn.pack(side=tk.RIGHT, padx=5)
         
-        # Create top menu bar
+        # Non-modal status bar for save progress
+        status_bar = ttk.Label(root, textvariable=self.status_var, anchor="w", relief="sunken")
+        status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        
+        # The menus are not needed for the first paint, fast start adds
+        # them right after it
+        if not self.fast_start:
+            self._build_menus()
+        
+        # Bind mousewheel to scroll
+        def _on_mousewheel(event):
+            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        
+        canvas.bind_all("<MouseWheel>", _on_mousewheel)  # Windows and MacOS
+        canvas.bind_all("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))  # Linux
+        canvas.bind_all("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))  # Linux
+        
+        # Intercept close button to check for unsaved changes
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # The grid exposing means the window is on screen
+        self.startup_times["built"] = time.perf_counter() - START_TIME
+        canvas.bind("<Expose>", self._on_first_paint, add="+")
+
+    def _build_menus(self):
+        """Create the top menu bar"""
+        root = self.root
         menubar = tk.Menu(root)
         root.config(menu=menubar)
         
@@ -878,9 +1976,16 @@ Key Features:
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Save Schedule (Ctrl+S)", command=self.save_schedule)
         file_menu.add_command(label="Export to CSV", command=self.export_to_csv)
+        file_menu.add_command(label="Import from CSV", command=self.import_from_csv)
         file_menu.add_separator()
         file_menu.add_command(label="Exit (Ctrl+Q)", command=self.on_close)
         
+        # Add 'Edit' menu
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Edit", menu=edit_menu)
+        edit_menu.add_command(label="Undo (Ctrl+Z)", command=self.undo)
+        edit_menu.add_command(label="Redo (Ctrl+Y)", command=self.redo)
+        
         # Add 'Tasks' menu
         task_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Tasks", menu=task_menu)
@@ -890,26 +1995,53 @@ Key Features:
         # Add 'View' menu
         view_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="View", menu=view_menu)
-        view_menu.add_command(label="Toggle Theme", command=toggle_theme)
+        view_menu.add_command(label="Previous Week (Alt+Left)", command=self.previous_week)
+        view_menu.add_command(label="Next Week (Alt+Right)", command=self.next_week)
+        view_menu.add_command(label="This Week (Alt+Home)", command=self.this_week)
+        view_menu.add_separator()
+        view_menu.add_command(label="Toggle Theme", command=self.toggle_theme)
+        view_menu.add_command(label="Diagnostics (Ctrl+Shift+D)", command=self.open_diagnostics_window)
         
         # Add 'Help' menu
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="Help (F1)", command=self.open_help_window)
-        
-        # Bind mousewheel to scroll
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)  # Windows and MacOS
-        canvas.bind_all("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))  # Linux
-        canvas.bind_all("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))  # Linux
-        
-        # Intercept close button to check for unsaved changes
-        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def toggle_theme(self):
+        """Switch between the light and the dark theme"""
+        if self.current_theme == "light":
+            self.apply_theme("dark")
+        else:
+            self.apply_theme("light")
+
+    def _on_first_paint(self, event=None):
+        """Record the time to first paint, then build what fast start left out"""
+        if "first_paint" in self.startup_times:
+            return
+        self.root.update_idletasks()  # Let the exposed widgets draw themselves
+        elapsed = time.perf_counter() - START_TIME
+        self.startup_times["first_paint"] = elapsed
+        self.status_var.set(f"Ready (started in {elapsed * 1000:.0f} ms)")
+        if self.report_startup:
+            print("Startup: " + ", ".join(f"{phase} {seconds * 1000:.0f} ms"
+                                          for phase, seconds in self.startup_times.items()), file=sys.stderr)
+        if self.fast_start:
+            self.root.after(1, self._build_menus)
+            self.root.after(1, self._build_rest_of_grid)
+        self._prefetch_neighbours()
+        self.root.after(WATCH_INTERVAL_MS, self._watch)
 
 
 if __name__ == "__main__":
-    autodo = Autodo(title="Autodo - Weekly Schedule", geometry="1200x800", SAVE_FILE="weekly_schedule.json")
+    render_mode = "canvas" if "--canvas" in sys.argv else "entries"
+    # The schedule file may be given on the command line, a .db file is opened with SQLite
+    files = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    autodo = Autodo(title="Autodo - Weekly Schedule", geometry="1200x800", SAVE_FILE=files[0] if files else SAVE_FILE, render_mode=render_mode,
+                    fast_start="--fast-start" in sys.argv, report_startup="--startup-time" in sys.argv,
+                    diagnostics="--diagnostics" in sys.argv)
+    # --api serves the tasks to local scripts, --api=PORT on another port
+    api_ports = [arg.partition("=")[2] for arg in sys.argv[1:] if arg.split("=")[0] == "--api"]
+    if api_ports:
+        autodo.start_api(int(api_ports[0]) if api_ports[0] else None)
     autodo.create_week_schedule()
     autodo.root.mainloop()
\ No newline at end of file
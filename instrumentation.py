@@ -0,0 +1,189 @@
+import cProfile
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds of the histogram buckets in milliseconds, the last one is open ended
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Latest samples kept per operation for percentiles
+RECENT_SAMPLES = 1000
+# Functions listed in a profile report
+PROFILE_LINES = 25
+# Allocation sites listed in a memory report
+MEMORY_LINES = 10
+
+
+class Histogram:
+    """Latency distribution of one operation.
+
+    Counts per bucket cover every sample ever recorded, percentiles are
+    taken from the latest RECENT_SAMPLES so they follow the current
+    behaviour without growing without bound.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        index = 0
+        while index < len(BUCKET_BOUNDS_MS) and ms > BUCKET_BOUNDS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.recent.append(ms)
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in BUCKET_BOUNDS_MS] + [f">{BUCKET_BOUNDS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean, 3),
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max, 3),
+            "buckets": dict(zip(labels, self.buckets))
+        }
+
+
+class Instrumentation:
+    """Latency histograms per named operation, plus on-demand profiling.
+
+    Code wraps its operations in timed(name) (or methods in the
+    instrumented decorator). While disabled that costs one attribute check,
+    so it can stay in place permanently and be switched on when someone
+    reports lag. profile_next(name) runs the next occurrence of an
+    operation under cProfile and tracemalloc and keeps the reports.
+
+    Timings may be recorded from worker threads.
+    """
+
+    def __init__(self, enabled=False, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.histograms = {}  # Operation name -> Histogram
+        self.profiles = {}  # Operation name -> latest profile report
+        self._profile_requests = set()
+        self._profiling = False
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].record(seconds)
+
+    def profile_next(self, name):
+        """Profile the next run of operation name, even while timing is disabled"""
+        self._profile_requests.add(name)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.profiles.clear()
+
+    @contextmanager
+    def timed(self, name):
+        if name in self._profile_requests and not self._profiling:
+            with self._profiled(name):
+                yield
+            return
+        if not self.enabled:
+            yield
+            return
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, self.clock() - start)
+
+    @contextmanager
+    def _profiled(self, name):
+        self._profile_requests.discard(name)
+        self._profiling = True
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        start = self.clock()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = self.clock() - start
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            if not tracing:
+                tracemalloc.stop()
+            self._profiling = False
+            self.record(name, elapsed)
+            self.profiles[name] = {
+                "when": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "peak_memory_kb": round(peak / 1024, 1),
+                "functions": profile_report(profiler),
+                "allocations": allocation_report(before, after)
+            }
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "operations": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+                "profiles": dict(self.profiles)
+            }
+
+    def dump(self, path):
+        """Write the histograms and profiles as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def profile_report(profiler, lines=PROFILE_LINES):
+    """The functions with the most cumulative time, as pstats prints them"""
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(lines)
+    return out.getvalue()
+
+
+def allocation_report(before, after, lines=MEMORY_LINES):
+    """Source lines that allocated the most memory between two snapshots"""
+    # Leave out what profiling itself allocated
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    return [str(stat) for stat in stats[:lines]]
+
+
+def instrumented(name):
+    """Method decorator timing calls as operation name in self.instruments"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.instruments.timed(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
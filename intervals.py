@@ -0,0 +1,75 @@
+from bisect import bisect_left, insort
+
+
+class IntervalIndex:
+    """Half-open [start, end) intervals by key, answering overlap queries.
+
+    Intervals are kept in a list sorted by start, along with the length of
+    the longest one. Anything overlapping [start, end) has to begin before
+    end and, being at most that long, after start - longest; two binary
+    searches bound that slice, so a query costs O(log n + matches) as long
+    as intervals are of bounded length (tasks last hours, not months).
+    """
+
+    def __init__(self):
+        self._starts = []  # Sorted (start, key)
+        self._spans = {}  # Key -> (start, end)
+        self._lengths = {}  # Interval length -> number of intervals that long
+        self._longest = 0
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __contains__(self, key):
+        return key in self._spans
+
+    def span(self, key):
+        return self._spans.get(key)
+
+    def add(self, key, start, end):
+        """Add or move the interval of key"""
+        if end <= start:
+            raise ValueError("An interval must end after it starts")
+        if key in self._spans:
+            self.remove(key)
+        self._spans[key] = (start, end)
+        insort(self._starts, (start, key))
+        self._count_length(end - start, 1)
+
+    def remove(self, key):
+        span = self._spans.pop(key, None)
+        if span is None:
+            return
+        i = bisect_left(self._starts, (span[0], key))
+        del self._starts[i]
+        self._count_length(span[1] - span[0], -1)
+
+    def rebuild(self, spans):
+        """Replace every interval with spans (key -> (start, end)), sorting only once"""
+        self._spans = dict(spans)
+        self._starts = sorted((start, key) for key, (start, end) in self._spans.items())
+        self._lengths = {}
+        for start, end in self._spans.values():
+            self._lengths[end - start] = self._lengths.get(end - start, 0) + 1
+        self._longest = max(self._lengths, default=0)
+
+    def overlapping(self, start, end):
+        """Keys of intervals overlapping [start, end), in order of their start"""
+        first = bisect_left(self._starts, (start - self._longest + 1,))
+        last = bisect_left(self._starts, (end,))
+        return [key for begin, key in self._starts[first:last] if self._spans[key][1] > start]
+
+    def at(self, moment):
+        """Keys of intervals containing moment"""
+        return self.overlapping(moment, moment + 1)
+
+    def _count_length(self, length, delta):
+        count = self._lengths.get(length, 0) + delta
+        if count:
+            self._lengths[length] = count
+        else:
+            del self._lengths[length]
+        if delta > 0:
+            self._longest = max(self._longest, length)
+        elif not count and length == self._longest:
+            self._longest = max(self._lengths, default=0)
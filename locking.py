@@ -0,0 +1,85 @@
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Seconds a writer waits for another instance to finish its write
+LOCK_TIMEOUT = 10
+# Seconds between attempts to take a lock that another instance holds
+LOCK_RETRY_INTERVAL = 0.02
+
+
+class FileLock:
+    """Advisory lock on a lock file, held while a schedule's files are written.
+
+    Every instance of the app using the same SAVE_FILE locks the same lock
+    file, so writes of different instances (and of the threads of one
+    instance) never interleave. The lock is re-entrant within a thread.
+    Readers don't lock: journals are appended to and snapshots replaced
+    atomically, so a read sees a consistent state without it.
+
+    Raises TimeoutError if the lock cannot be taken within timeout seconds.
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    def _lock_file(self):
+        f = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return f
+            except OSError:
+                if time.monotonic() > deadline:
+                    f.close()
+                    raise TimeoutError(f"{self.path} is locked by another instance")
+                time.sleep(LOCK_RETRY_INTERVAL)
+
+    @staticmethod
+    def _unlock(f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
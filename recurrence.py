@@ -0,0 +1,275 @@
+import itertools
+import time
+from datetime import timedelta
+
+from taskstore import date_key, parse_date, week_start
+
+FREQUENCIES = ("daily", "weekly")
+# Fields of an occurrence that come from its series, not from the template
+OCCURRENCE_FIELDS = ("series",)
+
+_ids = itertools.count()
+
+
+def make_rule(freq, start, interval=1, by_day=None, until=None, count=None):
+    """Build a recurrence rule dict.
+
+    freq is "daily" or "weekly", repeating every interval days or weeks from
+    the date start. by_day is a list of weekday numbers (0 is Monday): the
+    days a weekly rule falls on, or the only days a daily rule keeps. The
+    series ends after the date until or after count occurrences, whichever
+    comes first. Dates are stored as "YYYY-MM-DD" strings.
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency {freq!r}")
+    if interval < 1:
+        raise ValueError("interval must be at least 1")
+    if by_day is None and freq == "weekly":
+        by_day = [start.weekday()]
+    if by_day is not None and not by_day:
+        raise ValueError("by_day must name at least one weekday")
+    return {
+        "freq": freq,
+        "interval": interval,
+        "by_day": sorted(set(by_day)) if by_day is not None else None,
+        "start": start.isoformat(),
+        "until": until.isoformat() if until is not None else None,
+        "count": count,
+        "exceptions": []
+    }
+
+
+def rule_from_repeat(repeat, start):
+    """Rule for one of the Repeat choices of the add task window, or None"""
+    if repeat == "Daily":
+        return make_rule("daily", start)
+    if repeat == "Weekdays":
+        return make_rule("weekly", start, by_day=[0, 1, 2, 3, 4])
+    if repeat == "Weekly":
+        return make_rule("weekly", start)
+    return None
+
+
+def _pattern(rule, first, last):
+    """Dates from first to last on which the rule falls: its start and the dates
+    after it that fit its frequency, interval and by_day.
+
+    Like iCalendar's DTSTART, the start is an occurrence even if it doesn't
+    fit, e.g. a weekdays rule started on a Saturday, so the slot a series is
+    created in always has its first task.
+    """
+    start = parse_date(rule["start"])
+    if first <= start <= last:
+        yield start
+    for day in _repeats(rule, max(first, start), last):
+        if day != start:
+            yield day
+
+
+def _repeats(rule, first, last):
+    """Dates from first (not before the start) to last that fit the rule's frequency, interval and by_day"""
+    start = parse_date(rule["start"])
+    interval = rule["interval"]
+    by_day = rule["by_day"]
+    if rule["freq"] == "daily":
+        # Jump straight to the first step on or after first
+        steps = -(-(first - start).days // interval)
+        day = start + timedelta(days=steps * interval)
+        while day <= last:
+            if by_day is None or day.weekday() in by_day:
+                yield day
+            day += timedelta(days=interval)
+    else:
+        origin = week_start(start)
+        weeks = -(-(week_start(first) - origin).days // 7 // interval) * interval
+        monday = origin + timedelta(weeks=weeks)
+        while monday <= last:
+            for weekday in by_day:
+                day = monday + timedelta(days=weekday)
+                if first <= day <= last:
+                    yield day
+            monday += timedelta(weeks=interval)
+
+
+def last_date(rule):
+    """Last date the rule can fall on, or None if it repeats forever"""
+    last = parse_date(rule["until"]) if rule.get("until") else None
+    count = rule.get("count")
+    if count:
+        start = parse_date(rule["start"])
+        # Every occurrence is at most interval weeks after the previous one
+        bound = start + timedelta(weeks=count * rule["interval"] + 1)
+        if last is not None:
+            bound = min(bound, last)
+        days = list(itertools.islice(_pattern(rule, start, bound), count))
+        if days:
+            last = days[-1]
+    return last
+
+
+def occurrences(rule, first, last):
+    """Yield the dates from first to last (inclusive) on which rule occurs.
+
+    Only the requested window is generated, a rule without an end is never
+    expanded further than that. Exception dates are skipped; like in
+    iCalendar they still count towards count.
+    """
+    end = last_date(rule)
+    if end is not None:
+        last = min(last, end)
+    exceptions = set(rule.get("exceptions", ()))
+    for day in _pattern(rule, first, last):
+        if day.isoformat() not in exceptions:
+            yield day
+
+
+def new_series(task, hour, rule):
+    """A recurring task: the task template, its hour and its rule"""
+    return {
+        "task": dict(task),
+        "hour": hour,
+        "rule": rule,
+        "overrides": {}  # "YYYY-MM-DD" -> fields that differ on that date
+    }
+
+
+def new_series_id():
+    return f"{int(time.time() * 1000):x}-{next(_ids)}"
+
+
+class Recurrences:
+    """Recurring tasks stored once as rules and expanded on demand.
+
+    Each series is kept as a single record: a task template, the hour it
+    takes place and its rule, plus per-date overrides (e.g. one occurrence
+    marked completed) and exception dates (deleted occurrences). expand()
+    turns the series into ordinary "YYYY-MM-DD|hour" tasks for a date range,
+    each tagged with a "series" field naming the series it came from.
+
+    Like TaskStore, series dicts are replaced rather than modified, so a
+    shallow copy from snapshot() can be used on another thread. Changes are
+    tracked per series id for saving, and callbacks registered with
+    subscribe() get (series_id, old_series, new_series) after each change.
+    """
+
+    def __init__(self, series=None):
+        self._series = dict(series or {})
+        self._dirty = set()
+        self._listeners = []
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, series_id):
+        return series_id in self._series
+
+    def __getitem__(self, series_id):
+        return self._series[series_id]
+
+    def get(self, series_id, default=None):
+        return self._series.get(series_id, default)
+
+    def items(self):
+        return self._series.items()
+
+    def snapshot(self):
+        return Recurrences(self._series)
+
+    def to_dict(self):
+        return dict(self._series)
+
+    def load(self, series):
+        self._series = dict(series)
+        self._dirty.clear()
+
+    # Dirty tracking
+
+    @property
+    def is_dirty(self):
+        return bool(self._dirty)
+
+    def take_changes(self):
+        """Return series id -> series (None if deleted) for changed series"""
+        changes = {series_id: self._series.get(series_id) for series_id in self._dirty}
+        self._dirty.clear()
+        return changes
+
+    def mark_dirty(self, series_ids):
+        self._dirty.update(series_ids)
+
+    # Mutation
+
+    def subscribe(self, callback):
+        """Call callback(series_id, old, new) after every change"""
+        self._listeners.append(callback)
+
+    def add(self, series, series_id=None):
+        """Add a series, returning its id"""
+        series_id = series_id or new_series_id()
+        self._replace(series_id, series)
+        return series_id
+
+    def update(self, series_id, **fields):
+        """Change template fields, affecting every occurrence at once"""
+        series = dict(self._series[series_id])
+        series["task"] = dict(series["task"], **fields)
+        self._replace(series_id, series)
+
+    def delete(self, series_id):
+        series = self._series.pop(series_id, None)
+        if series is not None:
+            self._dirty.add(series_id)
+            self._notify(series_id, series, None)
+        return series
+
+    def set_override(self, series_id, day_text, task):
+        """Remember how the occurrence on day_text differs from the template"""
+        series = dict(self._series[series_id])
+        template = series["task"]
+        diff = {field: value for field, value in task.items()
+                if field not in OCCURRENCE_FIELDS and template.get(field) != value}
+        overrides = dict(series["overrides"])
+        if diff:
+            overrides[day_text] = diff
+        elif overrides.pop(day_text, None) is None:
+            return
+        series["overrides"] = overrides
+        self._replace(series_id, series)
+
+    def skip(self, series_id, day_text):
+        """Drop the occurrence on day_text from the series"""
+        series = dict(self._series[series_id])
+        rule = dict(series["rule"])
+        rule["exceptions"] = sorted(set(rule["exceptions"]) | {day_text})
+        series["rule"] = rule
+        overrides = dict(series["overrides"])
+        overrides.pop(day_text, None)
+        series["overrides"] = overrides
+        self._replace(series_id, series)
+
+    def _replace(self, series_id, series):
+        old = self._series.get(series_id)
+        self._series[series_id] = series
+        self._dirty.add(series_id)
+        self._notify(series_id, old, series)
+
+    def _notify(self, series_id, old, new):
+        for callback in self._listeners:
+            callback(series_id, old, new)
+
+    # Expansion
+
+    def expand(self, first, last):
+        """Return key -> task for every occurrence from first to last"""
+        tasks = {}
+        for series_id, series in self._series.items():
+            for day in occurrences(series["rule"], first, last):
+                day_text = day.isoformat()
+                task = dict(series["task"])
+                task.update(series["overrides"].get(day_text, {}))
+                task["series"] = series_id
+                tasks[date_key(day, series["hour"])] = task
+        return tasks
+
+    def expand_week(self, monday):
+        return self.expand(monday, monday + timedelta(days=6))
@@ -0,0 +1,61 @@
+# Quiet period after the last resize event before widgets are resized
+RESIZE_DELAY_MS = 100
+
+
+class RenderQueue:
+    """Collects grid cells that need repainting and repaints them once per idle cycle.
+
+    Any number of add() calls between two trips through the event loop end
+    up in a single render(cells) call with every distinct cell, so a bulk
+    edit of hundreds of tasks costs one repaint pass. flush() renders
+    pending cells right away, for code that needs the widgets up to date.
+
+    after_idle and after_cancel are the scheduling functions of the Tk root.
+    """
+
+    def __init__(self, after_idle, after_cancel, render):
+        self.after_idle = after_idle
+        self.after_cancel = after_cancel
+        self.render = render
+        self._cells = set()
+        self._job = None
+
+    @property
+    def pending(self):
+        return bool(self._cells)
+
+    def add(self, cells):
+        self._cells.update(cells)
+        if self._cells and self._job is None:
+            self._job = self.after_idle(self._run)
+
+    def flush(self):
+        if self._job is not None:
+            self.after_cancel(self._job)
+        self._run()
+
+    def _run(self):
+        self._job = None
+        cells, self._cells = self._cells, set()
+        if cells:
+            self.render(cells)
+
+
+class Debouncer:
+    """Calls callback with the latest arguments once calls stop for delay_ms"""
+
+    def __init__(self, after, after_cancel, callback, delay_ms=RESIZE_DELAY_MS):
+        self.after = after
+        self.after_cancel = after_cancel
+        self.callback = callback
+        self.delay_ms = delay_ms
+        self._job = None
+
+    def __call__(self, *args):
+        if self._job is not None:
+            self.after_cancel(self._job)
+        self._job = self.after(self.delay_ms, lambda: self._fire(args))
+
+    def _fire(self, args):
+        self._job = None
+        self.callback(*args)
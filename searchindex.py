@@ -0,0 +1,118 @@
+import re
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r"\w+")
+SEARCH_FIELDS = ("name", "notes")
+
+
+def tokenize(text):
+    """Lowercase word tokens of text"""
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+def matches(task, words):
+    """Whether every word is a prefix of some word of the task, as in SearchIndex.search()"""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        tokens |= tokenize(task.get(field) or "")
+    return all(any(token.startswith(word) for token in tokens) for word in words)
+
+
+class SearchIndex:
+    """Inverted index over task names and notes with prefix matching.
+
+    Each token maps to the set of task keys containing it, and a sorted list
+    of all tokens answers prefix lookups with a binary search. A query
+    matches a task when every query word is a prefix of some word in the
+    task, so "stu py" finds "Study Python". The index subscribes to the
+    TaskStore and is updated per changed task, never rebuilt per query.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._postings = {}  # Token -> set of task keys
+        self._tokens = []  # All tokens, sorted, for prefix lookups
+        self._task_tokens = {}  # Task key -> tokens, to unindex on change
+        self.rebuild()
+        store.subscribe(self.on_changes)
+
+    def rebuild(self):
+        self._postings.clear()
+        self._task_tokens.clear()
+        for key, task in self.store.items():
+            tokens = self._tokens_of(task)
+            self._task_tokens[key] = tokens
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(key)
+        self._tokens = sorted(self._postings)
+
+    def on_changes(self, changes):
+        """TaskStore listener keeping the index in sync"""
+        if len(changes) > 1000 and len(changes) * 2 >= len(self.store):
+            # A bulk load replaces most tasks, starting over is cheaper
+            self.rebuild()
+            return
+        for key, old, new in changes:
+            tokens = self._tokens_of(new) if new is not None else set()
+            previous = self._task_tokens.pop(key, set())
+            for token in previous - tokens:
+                self._remove_posting(token, key)
+            for token in tokens - previous:
+                self._add_posting(token, key)
+            if tokens:
+                self._task_tokens[key] = tokens
+
+    def search(self, query, **filters):
+        """Return the sorted keys of tasks matching query and the store filters.
+
+        filters are passed to TaskStore.query (day, week, hour, priority,
+        completed). An empty query matches every task that passes them.
+        """
+        words = sorted(tokenize(query), key=len, reverse=True)
+        matches = None
+        # Longer prefixes are more selective, so they narrow the set first
+        for word in words:
+            keys = self._prefix_keys(word)
+            matches = keys if matches is None else matches & keys
+            if not matches:
+                return []
+
+        if any(value is not None for value in filters.values()):
+            filtered = set(self.store.query(**filters))
+            matches = filtered if matches is None else matches & filtered
+        elif matches is None:
+            matches = set(self.store.keys())
+        return sorted(matches)
+
+    def _prefix_keys(self, prefix):
+        keys = set()
+        i = bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            keys |= self._postings[self._tokens[i]]
+            i += 1
+        return keys
+
+    @staticmethod
+    def _tokens_of(task):
+        tokens = set()
+        for field in SEARCH_FIELDS:
+            tokens |= tokenize(getattr(task, field))
+        return tokens
+
+    def _add_posting(self, token, key):
+        keys = self._postings.get(token)
+        if keys is None:
+            keys = self._postings[token] = set()
+            insort(self._tokens, token)
+        keys.add(key)
+
+    def _remove_posting(self, token, key):
+        keys = self._postings.get(token)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._postings[token]
+            i = bisect_left(self._tokens, token)
+            if i < len(self._tokens) and self._tokens[i] == token:
+                del self._tokens[i]
@@ -0,0 +1,457 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import Counter
+
+from locking import FileLock
+from storage import JournalStorage, COMPACT_AFTER
+from taskstore import Task, Priority, Repeat, key_week
+
+MAGIC = b"AUTODOSN"
+VERSION = 1
+# Magic, version, string/task/week counts and the offsets of the three indexes
+HEADER = struct.Struct("<8sIIIIQQQ")
+# A task record after its length prefix: string ids of key, name, notes and
+# series (-1 for none), created (NO_CREATED if unknown), duration, and the
+# positions of priority and repeat in their enums plus the completed flag
+TASK = struct.Struct("<IIIiqIBBB")
+TASK_LENGTH = struct.Struct("<H")
+STRING_LENGTH = struct.Struct("<I")
+OFFSET = struct.Struct("<Q")
+# Two neighbouring entries of the string index, the start of a string and of the next one
+STRING_SPAN = struct.Struct("<QQ")
+# Week index entry: string id of the week, index of its first task, task count
+WEEK = struct.Struct("<III")
+NO_CREATED = -2 ** 63
+PRIORITY_CODES = list(Priority)
+REPEAT_CODES = list(Repeat)
+
+
+def write_snapshot(path, weeks):
+    """Write (week, tasks) pairs as a binary snapshot at path, atomically.
+
+    The file holds length-prefixed task records, then a table of every
+    distinct string they refer to and the offset indexes of strings, tasks
+    and weeks, so a reader can find one week or one task without decoding
+    anything else. Weeks are written as they are produced and only the
+    string table is kept in memory. Returns the number of tasks written.
+    """
+    strings = {}  # String -> id
+    task_offsets = []
+    week_entries = []
+
+    def string_id(text):
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(bytes(HEADER.size))
+        for week, tasks in weeks:
+            if not tasks:
+                continue
+            week_entries.append((week, string_id(week), len(task_offsets), len(tasks)))
+            # Sorted by key, so a single task can be found by bisection
+            for key in sorted(tasks):
+                if key_week(key) != week:
+                    raise ValueError(f"Task key {key!r} is not in week {week}")
+                task = Task.coerce(tasks[key])
+                task_offsets.append(f.tell())
+                f.write(TASK_LENGTH.pack(TASK.size))
+                f.write(TASK.pack(
+                    string_id(key), string_id(task.name), string_id(task.notes),
+                    string_id(task.series) if task.series is not None else -1,
+                    task.created if task.created is not None else NO_CREATED, task.duration,
+                    PRIORITY_CODES.index(task.priority), REPEAT_CODES.index(task.repeat), task.completed))
+
+        string_offsets = []
+        for text in strings:
+            data = text.encode("utf-8")
+            string_offsets.append(f.tell())
+            f.write(STRING_LENGTH.pack(len(data)))
+            f.write(data)
+        # A final entry marks the end of the last string
+        string_offsets.append(f.tell())
+        strings_at = f.tell()
+        f.write(b"".join(OFFSET.pack(offset) for offset in string_offsets))
+        tasks_at = f.tell()
+        f.write(b"".join(OFFSET.pack(offset) for offset in task_offsets))
+        weeks_at = f.tell()
+        week_entries.sort()
+        f.write(b"".join(WEEK.pack(week_id, first, count) for week, week_id, first, count in week_entries))
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(strings), len(task_offsets), len(week_entries),
+                            strings_at, tasks_at, weeks_at))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(task_offsets)
+
+
+class SnapshotReader:
+    """Memory-mapped, lazily decoded view of a snapshot file.
+
+    Opening reads only the header. Weeks are found by bisecting the week
+    index, tasks are decoded when their week or key is asked for and
+    strings when a task uses them, so the cost of a lookup barely depends
+    on the size of the file.
+    A missing or empty file reads as a snapshot without tasks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+        self._strings = {}  # String id -> decoded string
+        self._weeks = {}  # Week id -> (index of first task, task count), as looked up
+        self.task_count = self.week_count = 0
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise ValueError(f"{path} is not a schedule snapshot: {e}") from e
+
+    def _read_header(self):
+        magic, version, self.string_count, self.task_count, self.week_count, \
+            self._strings_at, self._tasks_at, self._weeks_at = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("bad magic number")
+        if version != VERSION:
+            raise ValueError(f"unsupported version {version}")
+        if self._weeks_at + self.week_count * WEEK.size > len(self._map):
+            raise ValueError("truncated file")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def weeks(self):
+        """Sorted ids of all weeks in the snapshot"""
+        return [self._string(self._week_entry(index)[0]) for index in range(self.week_count)]
+
+    def week(self, week):
+        """Return key -> Task for every task of week"""
+        first, count = self._find_week(week)
+        if not count:
+            return {}
+        offsets = struct.unpack_from(f"<{count}Q", self._map, self._tasks_at + first * OFFSET.size)
+        return dict(self._task(offset) for offset in offsets)
+
+    def get(self, key):
+        """The Task stored under key, or None"""
+        first, count = self._find_week(key_week(key))
+        low, high = first, first + count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(self._offset(middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < first + count and self._key(self._offset(low)) == key:
+            return self._task(self._offset(low))[1]
+        return None
+
+    def _find_week(self, week):
+        """(index of first task, task count) of week, by bisecting the sorted week index"""
+        if week not in self._weeks:
+            low, high = 0, self.week_count
+            while low < high:
+                middle = (low + high) // 2
+                if self._string(self._week_entry(middle)[0]) < week:
+                    low = middle + 1
+                else:
+                    high = middle
+            found = (0, 0)
+            if low < self.week_count:
+                week_id, first, count = self._week_entry(low)
+                if self._string(week_id) == week:
+                    found = (first, count)
+            self._weeks[week] = found
+        return self._weeks[week]
+
+    def _week_entry(self, index):
+        return WEEK.unpack_from(self._map, self._weeks_at + index * WEEK.size)
+
+    def _offset(self, index):
+        return OFFSET.unpack_from(self._map, self._tasks_at + index * OFFSET.size)[0]
+
+    def _key(self, offset):
+        return self._string(TASK.unpack_from(self._map, offset + TASK_LENGTH.size)[0])
+
+    def _task(self, offset):
+        key, name, notes, series, created, duration, priority, repeat, completed = \
+            TASK.unpack_from(self._map, offset + TASK_LENGTH.size)
+        return self._string(key), Task(
+            self._string(name), PRIORITY_CODES[priority], self._string(notes),
+            created if created != NO_CREATED else None, completed, REPEAT_CODES[repeat], duration,
+            self._string(series) if series >= 0 else None)
+
+    def _string(self, string_id):
+        text = self._strings.get(string_id)
+        if text is None:
+            start, end = STRING_SPAN.unpack_from(self._map, self._strings_at + string_id * OFFSET.size)
+            text = self._strings[string_id] = self._map[start + STRING_LENGTH.size:end].decode("utf-8")
+        return text
+
+
+class SnapshotStorage:
+    """Date keyed tasks in one binary snapshot file plus a journal.
+
+    The snapshot (SAVE_FILE itself, see write_snapshot) is memory-mapped
+    and decoded one week at a time, so opening even a large archive only
+    costs what the displayed week needs. Saves append to a JSON journal
+    next to it, like JournalStorage, which is replayed over the snapshot.
+    Compaction rewrites the whole snapshot, so it is left to the save
+    worker once the journal gets long. Series are kept in the same
+    journaled JSON file as with WeeklyStorage.
+
+    Like WeeklyStorage it may be shared by several instances: writes hold
+    the lock on "<name>.lock", every read first applies what others
+    appended to the journal since (or reopens a snapshot they compacted),
+    and a compaction folds the files rather than the caller's copy of a
+    week that another instance wrote meanwhile.
+
+    Weeks may be read from the save and export workers while the main
+    thread loads. A compaction running on the save worker holds up readers
+    only while the new file is swapped in.
+    """
+
+    def __init__(self, path, compact_after=COMPACT_AFTER):
+        self.path = path
+        self.compact_after = compact_after
+        self.series = JournalStorage(f"{os.path.splitext(path)[0]}.series.json", compact_after)
+        self.lock = FileLock(f"{os.path.splitext(path)[0]}.lock")
+        self._lock = threading.Lock()  # Guards the reader and the journal overlay
+        self._reader = SnapshotReader(path)
+        self._journal = JournalStorage(path, compact_after)
+        self._stamp = None  # Stamp of the files as far as they are applied
+        self._changes = {}  # Week id -> key -> task or None, the journal since the snapshot
+        self._epoch = 0  # Bumped whenever the snapshot is reopened
+        self._versions = Counter()  # Week id -> bumped whenever the journal changes the week
+        self._records = 0  # Journal records since the snapshot, of every instance
+        self._seen = {}  # Week id (None for the series) -> stamp when this instance last read it
+        with self._lock:
+            self._catch_up()
+
+    def close(self):
+        with self._lock:
+            self._reader.close()
+
+    def weeks(self):
+        """Sorted ids of all weeks that have stored tasks"""
+        with self._lock:
+            self._catch_up()
+            weeks = set(self._reader.weeks())
+            weeks.update(week for week, changes in self._changes.items() if any(changes.values()))
+            return sorted(weeks)
+
+    def load_week(self, week):
+        """Return key -> task for a single week"""
+        with self._lock:
+            self._catch_up()
+            self._seen[week] = self._week_stamp(week)
+            return self._read_week(week)
+
+    def read_week(self, week):
+        """Same as load_week(), which is safe off the main thread, but doesn't note what was read"""
+        with self._lock:
+            self._catch_up()
+            return self._read_week(week)
+
+    def _read_week(self, week):
+        tasks = self._reader.week(week)
+        for key, task in self._changes.get(week, {}).items():
+            if task is None:
+                tasks.pop(key, None)
+            else:
+                tasks[key] = task
+        return tasks
+
+    def iter_weeks(self):
+        """Yield (week, tasks) for every stored week, one week at a time"""
+        for week in self.weeks():
+            yield week, self.load_week(week)
+
+    def get(self, key):
+        """The task stored under key, or None, without decoding the rest of its week"""
+        with self._lock:
+            self._catch_up()
+            changes = self._changes.get(key_week(key), {})
+            if key in changes:
+                return changes[key]
+            return self._reader.get(key)
+
+    def stamp(self, week):
+        """Token that changes whenever week is written, by any instance"""
+        with self._lock:
+            self._catch_up()
+            return self._week_stamp(week)
+
+    def changes_since(self, week, stamp):
+        """(stamp, None) if week changed since stamp, as weeks are cheap to read again"""
+        current = self.stamp(week)
+        return current, {} if current == stamp else None
+
+    def series_stamp(self):
+        return self.series.stamp()
+
+    def append(self, changes):
+        """Journal changes (key -> task, or None for a delete)"""
+        if not changes:
+            return
+        for key in changes:
+            if key_week(key) is None:
+                raise ValueError(f"Task key {key!r} has no date")
+        with self.lock, self._lock:
+            self._catch_up()
+            before = {week: self._week_stamp(week) for week in map(key_week, changes)}
+            self._journal.append(changes)
+            # Reading our own lines back keeps the overlay in journal order
+            self._catch_up()
+            for week, stamp in before.items():
+                if self._seen.get(week) == stamp:
+                    self._seen[week] = self._week_stamp(week)
+
+    def due_for_compaction(self, changes):
+        """One week of changes if the journal will be long enough to compact after them.
+
+        Compacting any week folds in the whole journal, so one is enough.
+        """
+        if changes and self._records + len(changes) >= self.compact_after:
+            return {min(key_week(key) for key in changes)}
+        return set()
+
+    def needs_compaction(self, week):
+        return self._records >= self.compact_after
+
+    def compact(self, week, tasks, stamp=None):
+        """Write a new snapshot with tasks as the content of week and empty the journal.
+
+        stamp is as for WeeklyStorage.compact().
+        """
+        with self.lock:
+            with self._lock:
+                self._catch_up()
+                seen = self._seen.get(week, stamp)
+                changed = seen is not None and seen != self._week_stamp(week)
+            if changed:
+                # Another instance wrote the week since it was read, and the
+                # caller's changes are journaled already
+                tasks = self.load_week(week)
+
+            def weeks():
+                for other in sorted(set(self.weeks()) | {week}):
+                    yield other, tasks if other == week else self.read_week(other)
+            self._rewrite(weeks())
+            self._seen[week] = self._week_stamp(week)
+
+    def replace_all(self, weeks):
+        """Write (week, tasks) pairs as the whole content of the snapshot and return the task count"""
+        with self.lock:
+            return self._rewrite(weeks)
+
+    def _rewrite(self, weeks):
+        # Readers keep using the old file until the new one is complete
+        count = write_snapshot(self.path, weeks)
+        with self._lock:
+            # Replaying the old journal over the new snapshot is harmless, so a
+            # crash between these two steps loses nothing
+            if os.path.exists(self._journal.journal_path):
+                os.remove(self._journal.journal_path)
+            self._catch_up()
+        return count
+
+    def _catch_up(self):
+        """Apply what was written to the files since they were last read, by any instance"""
+        stamp, records = self._journal.records_since(self._stamp)
+        while records is None:
+            # First read, or the snapshot was replaced: start over from it
+            self._reader.close()
+            self._reader = SnapshotReader(self.path)
+            self._changes = {}
+            self._epoch += 1
+            self._records = 0
+            stamp, records = self._journal.records_since((stamp[0], None))
+        self._stamp = stamp
+        for record in records:
+            week = key_week(record.get("key", ""))
+            if week is not None:
+                task = record["task"] if record.get("op") == "put" else None
+                self._changes.setdefault(week, {})[record["key"]] = Task.coerce(task) if task is not None else None
+                self._versions[week] += 1
+        self._records += len(records)
+
+    def _week_stamp(self, week):
+        return self._epoch, self._versions[week]
+
+    def load_series(self):
+        """Return series id -> recurring task series"""
+        self._seen[None] = self.series.stamp()
+        return self.series.load()
+
+    def append_series(self, changes):
+        """Journal changed series (series id -> series or None)"""
+        if not changes:
+            return
+        with self.lock:
+            before = self.series.stamp()
+            self.series.append(changes)
+            if self._seen.get(None) == before:
+                self._seen[None] = self.series.stamp()
+
+    def series_due_for_compaction(self, changes):
+        return self.series.journal_records + len(changes) >= self.series.compact_after
+
+    def compact_series(self, series):
+        """Write series as the new snapshot of the recurring tasks"""
+        with self.lock:
+            if None in self._seen and self._seen[None] != self.series.stamp():
+                series = self.series.read()
+            self.series.compact(series)
+            self._seen[None] = self.series.stamp()
+
+
+def convert(source, target):
+    """Copy every task and series of a schedule (JSON, SQLite or snapshot) into a new snapshot.
+
+    Returns the number of tasks copied. The source is read one week at a
+    time and left unchanged.
+    """
+    from storage import open_storage
+    source = open_storage(source)
+    target = SnapshotStorage(target)
+    try:
+        count = target.replace_all(source.iter_weeks())
+        target.compact_series(source.load_series())
+    finally:
+        target.close()
+        if hasattr(source, "close"):
+            source.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a schedule as a binary snapshot for fast loading")
+    parser.add_argument("source", help="the schedule, e.g. weekly_schedule.json or weekly_schedule.db")
+    parser.add_argument("target", help="the snapshot to write, e.g. weekly_schedule.snap")
+    args = parser.parse_args(argv)
+    try:
+        count = convert(args.source, args.target)
+    except (OSError, ValueError) as e:
+        print(f"Conversion failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {count} task(s) to {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
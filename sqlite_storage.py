@@ -0,0 +1,223 @@
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+
+from taskstore import key_week, split_key, to_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    key TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    week TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    completed INTEGER NOT NULL,
+    task TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_slot ON tasks (day, hour);
+CREATE INDEX IF NOT EXISTS tasks_by_week ON tasks (week);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (completed, priority, day);
+CREATE TABLE IF NOT EXISTS series (
+    id TEXT PRIMARY KEY,
+    series TEXT NOT NULL
+);
+"""
+
+
+def task_row(key, task):
+    """Column values of a task: the indexed fields plus the whole task as JSON"""
+    week = key_week(key)
+    if week is None:
+        raise ValueError(f"Task key {key!r} has no date")
+    day_text, hour = split_key(key)
+    return (key, day_text, int(hour.split(":")[0]), week, task.get("priority", "medium"),
+            int(bool(task.get("completed", False))), json.dumps(task, separators=(',', ':'), default=to_json))
+
+
+class SqliteStorage:
+    """Date keyed tasks in a SQLite database, with the interface of WeeklyStorage.
+
+    Each task is a row holding the task as JSON next to the columns it is
+    looked up by, so loading a week, a date range or e.g. every open
+    high-priority task of a month is an index lookup. A save writes only
+    the changed rows, all of them in one transaction. There is nothing to
+    compact, the compaction hooks exist for compatibility only.
+
+    SQLite serialises the writes of several instances sharing a database
+    by itself. stamp() is SQLite's data version, which changes whenever
+    another connection commits, so a week is read again then.
+
+    One connection is shared by the main thread and the save and export
+    workers, a lock keeps their statements apart.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        try:
+            with self._db:
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.executescript(SCHEMA)
+        except sqlite3.DatabaseError as e:
+            self._db.close()
+            raise ValueError(f"{path} is not a schedule database: {e}") from e
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def weeks(self):
+        """Sorted ids of all weeks that have stored tasks"""
+        return [week for week, in self._fetch("SELECT DISTINCT week FROM tasks ORDER BY week")]
+
+    def load_week(self, week):
+        """Return key -> task for a single week"""
+        return self._tasks("SELECT key, task FROM tasks WHERE week = ?", (week,))
+
+    def read_week(self, week):
+        """Same as load_week(), which is safe off the main thread"""
+        return self.load_week(week)
+
+    def stamp(self, week=None):
+        """Token that changes whenever another instance writes to the database"""
+        return self._fetch("PRAGMA data_version")[0][0]
+
+    def changes_since(self, week, stamp):
+        """(stamp, None) if anything changed since stamp, as weeks are cheap to read again"""
+        current = self.stamp()
+        return current, {} if current == stamp else None
+
+    def series_stamp(self):
+        return self.stamp()
+
+    def iter_weeks(self):
+        """Yield (week, tasks) for every stored week, one week at a time"""
+        for week in self.weeks():
+            yield week, self.load_week(week)
+
+    def query(self, start=None, end=None, priority=None, completed=None):
+        """Return key -> task for tasks dated start..end (both optional) matching the filters"""
+        conditions, params = [], []
+        if completed is not None:
+            conditions.append("completed = ?")
+            params.append(int(completed))
+        if priority is not None:
+            conditions.append("priority = ?")
+            params.append(priority)
+        if start is not None:
+            conditions.append("day >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("day <= ?")
+            params.append(end.isoformat())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._tasks(f"SELECT key, task FROM tasks{where} ORDER BY day, hour", params)
+
+    def append(self, changes):
+        """Write changes (key -> task, or None for a delete) in one transaction"""
+        if not changes:
+            return
+        puts = [task_row(key, task) for key, task in changes.items() if task is not None]
+        deletes = [(key,) for key, task in changes.items() if task is None]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)", puts)
+            self._db.executemany("DELETE FROM tasks WHERE key = ?", deletes)
+
+    def due_for_compaction(self, changes):
+        return set()
+
+    def needs_compaction(self, week):
+        return False
+
+    def compact(self, week, tasks, stamp=None):
+        """Replace every task of week with tasks, stamp is for compatibility only"""
+        rows = [task_row(key, task) for key, task in tasks.items()]
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM tasks WHERE week = ?", (week,))
+            self._db.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def load_series(self):
+        """Return series id -> recurring task series"""
+        return {series_id: json.loads(series)
+                for series_id, series in self._fetch("SELECT id, series FROM series")}
+
+    def append_series(self, changes):
+        """Write changed series (series id -> series or None) in one transaction"""
+        if not changes:
+            return
+        with self._lock, self._db:
+            for series_id, series in changes.items():
+                if series is None:
+                    self._db.execute("DELETE FROM series WHERE id = ?", (series_id,))
+                else:
+                    self._db.execute("INSERT OR REPLACE INTO series VALUES (?, ?)",
+                                     (series_id, json.dumps(series, separators=(',', ':'))))
+
+    def series_due_for_compaction(self, changes):
+        return False
+
+    def compact_series(self, series):
+        """Replace every series with series"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM series")
+            self._db.executemany("INSERT INTO series VALUES (?, ?)",
+                                 [(series_id, json.dumps(item, separators=(',', ':')))
+                                  for series_id, item in series.items()])
+
+    def explain(self, sql, params=()):
+        """SQLite's query plan for sql, to check that a query uses an index"""
+        return " ".join(row[-1] for row in self._fetch(f"EXPLAIN QUERY PLAN {sql}", params))
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            try:
+                return self._db.execute(sql, params).fetchall()
+            except sqlite3.DatabaseError as e:
+                raise ValueError(f"Failed to read {self.path}: {e}") from e
+
+    def _tasks(self, sql, params=()):
+        return {key: json.loads(task) for key, task in self._fetch(sql, params)}
+
+
+def migrate(source, target):
+    """Copy every task and series of a JSON schedule into a SQLite database.
+
+    A single-file schedule is split into weekly shards first, just like
+    opening it in the app would. The copy is done week by week and can be
+    repeated, tasks already in the database are overwritten. Returns the
+    number of tasks copied.
+    """
+    from storage import WeeklyStorage
+    source = WeeklyStorage(source)
+    target = SqliteStorage(target)
+    count = 0
+    try:
+        for week in source.weeks():
+            tasks = source.read_week(week)
+            target.append(tasks)
+            count += len(tasks)
+        target.append_series(source.series.read())
+    finally:
+        target.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy a JSON schedule into a SQLite database")
+    parser.add_argument("source", help="the JSON schedule, e.g. weekly_schedule.json")
+    parser.add_argument("target", help="the database to create or update, e.g. weekly_schedule.db")
+    args = parser.parse_args(argv)
+    try:
+        count = migrate(args.source, args.target)
+    except (OSError, ValueError) as e:
+        print(f"Migration failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Copied {count} task(s) to {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
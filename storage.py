@@ -0,0 +1,447 @@
+import json
+import os
+from datetime import date
+
+from locking import FileLock
+from taskstore import new_task, key_week, week_start, migrate_legacy_tasks, to_json
+
+# Number of journal records after which the journal is folded into the snapshot
+COMPACT_AFTER = 500
+# Marker written to SAVE_FILE once the schedule is split into weekly shards
+SHARDED_FORMAT = "weekly-shards"
+# SAVE_FILE extensions that select the SQLite backend
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+# SAVE_FILE extension that selects the binary snapshot backend
+SNAPSHOT_EXTENSION = ".snap"
+
+
+def open_storage(path, compact_after=COMPACT_AFTER):
+    """Storage for SAVE_FILE: SqliteStorage for a database file, SnapshotStorage for
+    a binary snapshot, WeeklyStorage otherwise"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        from sqlite_storage import SqliteStorage
+        return SqliteStorage(path)
+    if extension == SNAPSHOT_EXTENSION:
+        from snapshot import SnapshotStorage
+        return SnapshotStorage(path, compact_after)
+    return WeeklyStorage(path, compact_after)
+
+
+def file_stamp(path):
+    """(inode, size, mtime) of path, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def journal_stamp(path):
+    """Token that changes whenever the snapshot at path is replaced or its journal appended to"""
+    return file_stamp(path), file_stamp(f"{path}.journal")
+
+
+def atomic_write_json(path, data, indent=None):
+    """Write data as JSON to a temp file and rename it over path.
+
+    Readers see either the old or the new file, never a half written one.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent, default=to_json)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JournalStorage:
+    """Schedule persistence as a JSON snapshot plus an append-only journal.
+
+    The snapshot (the SAVE_FILE itself) keeps the familiar {"tasks": {...}}
+    layout. Every save only appends one small JSON record per changed task
+    to "<SAVE_FILE>.journal", so its cost depends on the number of edits and
+    not on the size of the schedule. load() replays the journal over the
+    snapshot; compact() folds everything back into a fresh snapshot.
+
+    A crash can at worst leave a truncated last journal line, which is
+    ignored on replay and cut off by the next append, and the snapshot is
+    only ever replaced atomically. Several instances may share the files
+    as long as their writes are serialised (see WeeklyStorage), readers
+    never modify them.
+    """
+
+    def __init__(self, path, compact_after=COMPACT_AFTER):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_after = compact_after
+        self.journal_records = 0  # Records in the journal since the last compaction
+
+    def load(self):
+        """Return the saved tasks as a dict of key -> task"""
+        tasks = self._read_snapshot()
+        self.journal_records = 0
+        for record in self.read_journal():
+            self._apply(tasks, record)
+            self.journal_records += 1
+        return tasks
+
+    def read(self):
+        """Like load(), but never modifies this object.
+
+        Safe to call from another thread while the shard is being written:
+        a journal line that is only half written yet is simply skipped.
+        """
+        tasks = self._read_snapshot()
+        for record in self.read_journal():
+            self._apply(tasks, record)
+        return tasks
+
+    def stamp(self):
+        return journal_stamp(self.path)
+
+    def changes_since(self, stamp):
+        """(stamp, changes) with what was journaled since stamp was taken.
+
+        changes maps key -> task (None if deleted) and only the journal
+        lines added since are read. It is None if the snapshot was replaced
+        meanwhile, e.g. compacted by another instance, then everything has
+        to be read again.
+        """
+        stamp, records = self.records_since(stamp)
+        if records is None:
+            return stamp, None
+        changes = {}
+        for record in records:
+            if record.get("op") == "put":
+                changes[record["key"]] = record["task"]
+            elif record.get("op") == "delete":
+                changes[record["key"]] = None
+        return stamp, changes
+
+    def records_since(self, stamp):
+        """(stamp, records) like changes_since(), with the journal records themselves"""
+        current = self.stamp()
+        if current == stamp:
+            return stamp, []
+        if stamp is None or current[0] != stamp[0]:
+            return current, None
+        seen, journal = stamp[1], current[1]
+        if journal is None or (seen is not None and (seen[0] != journal[0] or seen[1] > journal[1])):
+            return current, None
+        records = []
+        offset = seen[1] if seen is not None else 0
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            for record, offset in self._scan(f, offset):
+                records.append(record)
+        # A line still being written is read on the next call
+        return (current[0], (journal[0], offset, journal[2])), records
+
+    def append(self, changes):
+        """Append changes (key -> task, or None for a delete) to the journal"""
+        if not changes:
+            return
+        self._drop_torn_tail()
+        lines = []
+        for key, task in changes.items():
+            if task is None:
+                record = {"op": "delete", "key": key}
+            else:
+                record = {"op": "put", "key": key, "task": task}
+            lines.append(json.dumps(record, separators=(',', ':'), default=to_json) + "\n")
+        with open(self.journal_path, 'a') as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_records += len(lines)
+
+    def needs_compaction(self):
+        return self.journal_records >= self.compact_after
+
+    def compact(self, tasks):
+        """Write tasks as the new snapshot and empty the journal"""
+        atomic_write_json(self.path, {"tasks": tasks}, indent=2)
+        # Replaying the old journal over the new snapshot is harmless, so a
+        # crash between these two steps loses nothing
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_records = 0
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            content = f.read()
+        if not content.strip():
+            return {}
+        data = json.loads(content)
+        if "tasks" in data:
+            return data["tasks"]
+        # Legacy format support: plain task names
+        return {key: new_task(name) for key, name in data.items()}
+
+    def read_journal(self):
+        """Yield the journal records up to the first incomplete or damaged line"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb') as f:
+            for record, end in self._scan(f, 0):
+                yield record
+
+    @staticmethod
+    def _scan(f, offset):
+        """Yield (record, offset after its line) for the good lines from f's position at offset"""
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Torn write from a crash, or one still in progress
+            try:
+                record = json.loads(line.decode("utf-8"))
+            except ValueError:
+                break
+            offset += len(line)
+            yield record, offset
+
+    def _drop_torn_tail(self):
+        """Cut off a damaged journal tail so appends start on a clean line.
+
+        Only writers call this, with the lock held, as a half written line
+        may just as well belong to a write in progress.
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) == b"\n":
+                    return
+                f.seek(0)
+                good_end = 0
+                for record, good_end in self._scan(f, 0):
+                    pass
+        except OSError:
+            return  # Missing or empty
+        with open(self.journal_path, 'r+b') as f:
+            f.truncate(good_end)
+
+    @staticmethod
+    def _apply(tasks, record):
+        if record.get("op") == "put":
+            tasks[record["key"]] = record["task"]
+        elif record.get("op") == "delete":
+            tasks.pop(record["key"], None)
+
+
+class WeeklyStorage:
+    """Date keyed tasks stored as one JournalStorage shard per ISO week.
+
+    SAVE_FILE becomes a small manifest and the shards live next to it in
+    "<name>.weeks/<YYYY-Www>.json" (each with its own journal), so opening
+    a week only reads that week's files no matter how much history exists.
+
+    A SAVE_FILE in the older single-file format is migrated on first use:
+    its "Weekday|hour" keys are placed on the dates of the current week.
+
+    Several instances of the app may share a schedule. Writes hold an
+    advisory lock on "<name>.lock", and a compaction folds the files as
+    they are if another instance wrote the week since this one read it,
+    rather than the caller's copy, so nobody's changes are lost. Callers
+    journal their changes before compacting, which makes the files hold
+    them too. stamp() and changes_since() let callers notice and pick up
+    the changes of other instances.
+    """
+
+    def __init__(self, path, compact_after=COMPACT_AFTER):
+        self.path = path
+        self.shard_dir = f"{os.path.splitext(path)[0]}.weeks"
+        self.compact_after = compact_after
+        # Recurring task series live in one journaled file of their own
+        self.series = JournalStorage(f"{os.path.splitext(path)[0]}.series.json", compact_after)
+        self.lock = FileLock(f"{os.path.splitext(path)[0]}.lock")
+        self._shards = {}
+        # Week (None for the series) -> stamp of its files when this
+        # instance last read them, kept up to date with its own writes
+        self._seen = {}
+        self._checked_layout = False
+        self._has_manifest = False
+
+    def shard(self, week):
+        """Return the JournalStorage holding the tasks of week"""
+        if week not in self._shards:
+            self._shards[week] = JournalStorage(self.shard_path(week), self.compact_after)
+        return self._shards[week]
+
+    def shard_path(self, week):
+        return os.path.join(self.shard_dir, f"{week}.json")
+
+    def weeks(self):
+        """Sorted ids of all weeks that have stored tasks"""
+        self._ensure_layout()
+        if not os.path.isdir(self.shard_dir):
+            return []
+        weeks = set()
+        for name in os.listdir(self.shard_dir):
+            if name.endswith(".json") or name.endswith(".json.journal"):
+                weeks.add(name.split(".", 1)[0])
+        return sorted(weeks)
+
+    def load_week(self, week):
+        """Return key -> task for a single week"""
+        self._ensure_layout()
+        self._seen[week] = self.stamp(week)
+        return self.shard(week).load()
+
+    def read_week(self, week):
+        """Read-only load_week() for use off the main thread.
+
+        Unlike load_week() it doesn't note what was read, pass the stamp
+        taken before reading to compact() instead.
+        """
+        return JournalStorage(self.shard_path(week)).read()
+
+    def stamp(self, week):
+        """Token that changes whenever the files of week are written, by any instance"""
+        return journal_stamp(self.shard_path(week))
+
+    def changes_since(self, week, stamp):
+        """(stamp, changes) for the tasks of week written since stamp, see JournalStorage.changes_since()"""
+        return JournalStorage(self.shard_path(week)).changes_since(stamp)
+
+    def series_stamp(self):
+        return self.series.stamp()
+
+    def iter_weeks(self):
+        """Yield (week, tasks) for every stored week, one shard at a time"""
+        for week in self.weeks():
+            yield week, self.load_week(week)
+
+    def append(self, changes):
+        """Journal changes (key -> task or None) in the shards of their weeks"""
+        if not changes:
+            return
+        self._ensure_layout()
+        with self.lock:
+            self._write_manifest()
+            for week, group in self.group_by_week(changes).items():
+                before = self.stamp(week)
+                self.shard(week).append(group)
+                self._saw_own_write(week, before, self.stamp(week))
+
+    def due_for_compaction(self, changes):
+        """Weeks whose journal will be long enough to compact after changes"""
+        due = set()
+        for week, group in self.group_by_week(changes).items():
+            shard = self.shard(week)
+            if shard.journal_records + len(group) >= self.compact_after:
+                due.add(week)
+        return due
+
+    def needs_compaction(self, week):
+        return self.shard(week).needs_compaction()
+
+    def compact(self, week, tasks, stamp=None):
+        """Write tasks as the new snapshot of week.
+
+        stamp is that of the files when tasks were read, for a copy this
+        instance didn't get from load_week(), e.g. one from read_week().
+        """
+        with self.lock:
+            self._write_manifest()
+            shard = self.shard(week)
+            if self._changed_elsewhere(week, shard, stamp):
+                tasks = shard.read()
+            shard.compact(tasks)
+            self._seen[week] = shard.stamp()
+
+    def load_series(self):
+        """Return series id -> recurring task series"""
+        self._seen[None] = self.series.stamp()
+        return self.series.load()
+
+    def append_series(self, changes):
+        """Journal changed series (series id -> series or None)"""
+        if not changes:
+            return
+        with self.lock:
+            before = self.series.stamp()
+            self.series.append(changes)
+            self._saw_own_write(None, before, self.series.stamp())
+
+    def series_due_for_compaction(self, changes):
+        return self.series.journal_records + len(changes) >= self.series.compact_after
+
+    def compact_series(self, series):
+        """Write series as the new snapshot of the recurring tasks"""
+        with self.lock:
+            if self._changed_elsewhere(None, self.series):
+                series = self.series.read()
+            self.series.compact(series)
+            self._seen[None] = self.series.stamp()
+
+    def _changed_elsewhere(self, week, journal, stamp=None):
+        """Whether another instance wrote journal since this one last read it, or since stamp.
+
+        Content for a week this instance never read, e.g. an import, is
+        the caller's to decide.
+        """
+        seen = self._seen.get(week, stamp)
+        return seen is not None and seen != journal.stamp()
+
+    def _saw_own_write(self, week, before, after):
+        # Only if nobody else wrote in between is the new state known
+        if self._seen.get(week) == before:
+            self._seen[week] = after
+
+    @staticmethod
+    def group_by_week(changes):
+        grouped = {}
+        for key, task in changes.items():
+            week = key_week(key)
+            if week is None:
+                raise ValueError(f"Task key {key!r} has no date")
+            grouped.setdefault(week, {})[key] = task
+        return grouped
+
+    def _write_manifest(self):
+        if self._has_manifest:
+            return
+        os.makedirs(self.shard_dir, exist_ok=True)
+        if not self._is_sharded():
+            atomic_write_json(self.path, self._manifest(), indent=2)
+        self._has_manifest = True
+
+    def _manifest(self):
+        return {"format": SHARDED_FORMAT, "shards": os.path.basename(self.shard_dir)}
+
+    def _is_sharded(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r') as f:
+            content = f.read()
+        if not content.strip():
+            return False
+        data = json.loads(content)
+        return data.get("format") == SHARDED_FORMAT
+
+    def _ensure_layout(self):
+        """Split a single-file schedule into weekly shards, once"""
+        if self._checked_layout:
+            return
+        if os.path.exists(self.path) and not self._is_sharded():
+            with self.lock:
+                self._migrate_single_file()
+        self._checked_layout = True
+
+    def _migrate_single_file(self):
+        if self._is_sharded():
+            return  # Another instance was quicker
+        legacy = JournalStorage(self.path)
+        tasks = migrate_legacy_tasks(legacy.load(), week_start(date.today()))
+        if tasks:
+            os.makedirs(self.shard_dir, exist_ok=True)
+            for week, group in self.group_by_week(tasks).items():
+                self.shard(week).compact(group)
+            # Only now replace the old file, a crash before this point
+            # simply repeats the migration
+            atomic_write_json(self.path, self._manifest(), indent=2)
+            self._has_manifest = True
+            if os.path.exists(legacy.journal_path):
+                os.remove(legacy.journal_path)
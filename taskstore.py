@@ -0,0 +1,560 @@
+import sys
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from enum import Enum
+from functools import lru_cache
+
+from intervals import IntervalIndex
+
+# Constants shared by the GUI and headless tools
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+HOURS = [f"{h}:00" for h in range(5, 24)]
+PRIORITIES = ["high", "medium", "low"]
+DEFAULT_DURATION = 60  # Minutes a task lasts unless it says otherwise
+MAX_DURATION = 24 * 60  # Longest a task may last, a whole day
+CREATED_FORMAT = "%Y-%m-%d %H:%M"
+_EPOCH = datetime(1970, 1, 1)
+
+
+def make_key(day, hour):
+    """Build the "day|hour" key used to address a task"""
+    return f"{day}|{hour}"
+
+
+def split_key(key):
+    """Split a "day|hour" key back into its (day, hour) parts"""
+    day, hour = key.split('|', 1)
+    return day, hour
+
+
+def date_key(day, hour):
+    """Build the "YYYY-MM-DD|hour" key of a task on a given date"""
+    return make_key(day.isoformat(), hour)
+
+
+def parse_date(text):
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+def week_start(day):
+    """Return the Monday of the week containing day"""
+    return day - timedelta(days=day.weekday())
+
+
+def week_id(day):
+    """Return the ISO week of day as a "YYYY-Www" string"""
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def week_monday(week):
+    """Return the Monday of a "YYYY-Www" ISO week"""
+    return datetime.strptime(f"{week}-1", "%G-W%V-%u").date()
+
+
+@lru_cache(maxsize=4096)
+def week_of(day_text):
+    """ISO week id of the day part of a key, or None if it isn't a date"""
+    try:
+        return week_id(parse_date(day_text))
+    except ValueError:
+        return None
+
+
+def key_week(key):
+    return week_of(split_key(key)[0])
+
+
+@lru_cache(maxsize=4096)
+def day_minutes(day_text):
+    """Minutes from 0001-01-01 to the start of a "YYYY-MM-DD" day, or None"""
+    try:
+        return parse_date(day_text).toordinal() * 1440
+    except ValueError:
+        return None
+
+
+def moment(day, minute_of_day):
+    """A point in time, in the minutes task_span() uses, for a date and minute of that day"""
+    return day.toordinal() * 1440 + minute_of_day
+
+
+def task_span(key, task):
+    """(start, end) of a task in minutes, or None if its key has no date"""
+    day_text, hour = split_key(key)
+    base = day_minutes(day_text)
+    if base is None:
+        return None
+    start = base + int(hour.split(":")[0]) * 60
+    return start, start + task.duration
+
+
+def migrate_legacy_tasks(tasks, start):
+    """Move tasks keyed by weekday name onto the dates of the week beginning at start"""
+    migrated = {}
+    for key, task in tasks.items():
+        day, hour = split_key(key)
+        if day in DAYS:
+            key = date_key(start + timedelta(days=DAYS.index(day)), hour)
+        migrated[key] = task
+    return migrated
+
+
+def new_task(name, priority="medium", notes="", completed=False, repeat="None", created=None,
+             duration=DEFAULT_DURATION):
+    """Create a task dictionary with the default fields filled in.
+
+    This is the form tasks are saved, exported and imported in; TaskStore
+    turns it into a Task.
+    """
+    return {
+        "name": name,
+        "priority": priority,
+        "notes": notes,
+        "created": created or datetime.now().strftime(CREATED_FORMAT),
+        "completed": completed,
+        "repeat": repeat,
+        "duration": duration
+    }
+
+
+class Priority(str, Enum):
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+
+class Repeat(str, Enum):
+    NONE = "None"
+    DAILY = "Daily"
+    WEEKDAYS = "Weekdays"
+    WEEKLY = "Weekly"
+
+    @classmethod
+    def _missing_(cls, value):
+        # Accept any capitalisation, e.g. from a CSV file
+        if isinstance(value, str):
+            for member in cls:
+                if member.value.lower() == value.strip().lower():
+                    return member
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_created(text):
+    """Seconds from 1970-01-01 00:00 to a "YYYY-MM-DD HH:MM" creation time.
+
+    Like the text, the number counts local wall clock time without a time
+    zone, so format_created() always gives back the same text.
+    """
+    created = datetime.fromisoformat(text.strip()).replace(tzinfo=None)
+    return int((created - _EPOCH).total_seconds())
+
+
+@lru_cache(maxsize=4096)
+def format_created(seconds):
+    return (_EPOCH + timedelta(seconds=seconds)).strftime(CREATED_FORMAT)
+
+
+class Task(Mapping):
+    """A task as held in memory by TaskStore.
+
+    Slots instead of a per-task dict, priority and repeat as enum members,
+    the creation time as an integer (see parse_created) and interned names
+    make a task a fraction of the size of its dict form, which matters for
+    large schedules. Code reads the attributes; the read-only mapping view
+    (task["name"], task.get("created"), dict(task)) gives the dict form that
+    new_task() creates and storage saves, so both kinds of task can be
+    handled alike. Tasks are not modified once created, replace() makes an
+    edited copy.
+    """
+
+    __slots__ = ("name", "priority", "notes", "created", "completed", "repeat", "duration", "series")
+
+    def __init__(self, name, priority=Priority.MEDIUM, notes="", created=None, completed=False,
+                 repeat=Repeat.NONE, duration=DEFAULT_DURATION, series=None):
+        self.name = sys.intern(name)
+        # Members are passed through as is, the lookup by value is comparatively slow
+        self.priority = priority if type(priority) is Priority else Priority(priority)
+        self.notes = notes
+        self.created = created  # Seconds, see parse_created(), or None if unknown
+        self.completed = bool(completed)
+        self.repeat = repeat if type(repeat) is Repeat else Repeat(repeat)
+        self.duration = int(duration)
+        self.series = sys.intern(series) if series is not None else None  # Id of a recurring series
+
+    @classmethod
+    def from_dict(cls, data):
+        """Task from its dict form; an unreadable creation time is dropped"""
+        try:
+            created = parse_created(data["created"]) if data.get("created") else None
+        except (AttributeError, TypeError, ValueError):
+            created = None
+        return cls(data.get("name", ""), data.get("priority", "medium"), data.get("notes", ""), created,
+                   data.get("completed", False), data.get("repeat", "None"), data.get("duration", DEFAULT_DURATION),
+                   data.get("series"))
+
+    @classmethod
+    def coerce(cls, task):
+        """task as a Task, converting a dict"""
+        return task if isinstance(task, cls) else cls.from_dict(task)
+
+    def to_dict(self):
+        data = {
+            "name": self.name,
+            "priority": self.priority.value,
+            "notes": self.notes,
+            "created": format_created(self.created) if self.created is not None else "",
+            "completed": self.completed,
+            "repeat": self.repeat.value,
+            "duration": self.duration
+        }
+        if self.series is not None:
+            data["series"] = self.series
+        return data
+
+    def replace(self, **fields):
+        """Copy of the task with fields (in dict form) changed"""
+        data = self.to_dict()
+        data.update(fields)
+        return Task.from_dict(data)
+
+    # Read-only mapping view of the dict form
+
+    def __getitem__(self, field):
+        getter = _FIELD_GETTERS.get(field)
+        value = getter(self) if getter is not None else None
+        if value is None and field != "created":
+            raise KeyError(field)
+        return value
+
+    def __iter__(self):
+        yield from ("name", "priority", "notes", "created", "completed", "repeat", "duration")
+        if self.series is not None:
+            yield "series"
+
+    def __len__(self):
+        return 7 if self.series is None else 8
+
+    def __eq__(self, other):
+        if isinstance(other, Task):
+            return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Task({self.to_dict()!r})"
+
+
+_FIELD_GETTERS = {
+    "name": lambda task: task.name,
+    "priority": lambda task: task.priority.value,
+    "notes": lambda task: task.notes,
+    "created": lambda task: format_created(task.created) if task.created is not None else "",
+    "completed": lambda task: task.completed,
+    "repeat": lambda task: task.repeat.value,
+    "duration": lambda task: task.duration,
+    "series": lambda task: task.series
+}
+
+
+def to_json(value):
+    """json default= hook, writes Task objects in their dict form"""
+    if isinstance(value, Task):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class TaskStore:
+    """In-memory owner of all tasks, independent of any Tk widgets.
+
+    Tasks are addressed by their "YYYY-MM-DD|hour" key (plain "day|hour"
+    keys work too, they just don't belong to any week). Besides the primary
+    dict the store keeps secondary indexes by day, ISO week, hour, priority
+    and completion so queries never have to scan every task, and an
+    IntervalIndex of each dated task's start/end time for overlap and
+    "what is happening at" queries. Listeners registered with
+    subscribe() receive a list of (key, old_task, new_task) tuples after each
+    mutation; old_task is None for additions and new_task is None for deletes.
+
+    Every mutation also bumps version and records the key in a dirty set,
+    so "is anything unsaved" and "which tasks changed" are answered without
+    comparing against the saved file. load() resets the dirty set since the
+    loaded tasks are by definition the saved ones.
+
+    Tasks can be added as dicts or Task objects and are kept as Task
+    objects. They are immutable, use update() to change one so the indexes
+    stay consistent.
+    """
+
+    def __init__(self, tasks=None):
+        self._tasks = {}
+        self._by_day = {}
+        self._by_week = {}
+        self._by_hour = {}
+        self._by_priority = {}
+        self._completed = set()
+        self._intervals = IntervalIndex()
+        self._listeners = []
+        self._pending = None  # Collected changes while inside batch()
+        self._dirty = set()  # Keys changed since the last take_changes()
+        self.version = 0  # Incremented on every mutation
+        if tasks:
+            self.load(tasks)
+
+    # Read access
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __contains__(self, key):
+        return key in self._tasks
+
+    def __iter__(self):
+        return iter(self._tasks)
+
+    def __getitem__(self, key):
+        return self._tasks[key]
+
+    def get(self, key, default=None):
+        return self._tasks.get(key, default)
+
+    def keys(self):
+        return self._tasks.keys()
+
+    def values(self):
+        return self._tasks.values()
+
+    def items(self):
+        return self._tasks.items()
+
+    def query(self, day=None, hour=None, priority=None, completed=None, week=None):
+        """Return the sorted keys of tasks matching every given filter"""
+        candidates = []
+        if day is not None:
+            candidates.append(self._by_day.get(day, set()))
+        if week is not None:
+            candidates.append(self._by_week.get(week, set()))
+        if hour is not None:
+            candidates.append(self._by_hour.get(hour, set()))
+        if priority is not None:
+            candidates.append(self._by_priority.get(priority, set()))
+
+        if candidates:
+            # Intersect starting from the smallest index bucket
+            candidates.sort(key=len)
+            keys = set(candidates[0])
+            for bucket in candidates[1:]:
+                keys &= bucket
+        else:
+            keys = set(self._tasks)
+
+        if completed is True:
+            keys &= self._completed
+        elif completed is False:
+            keys -= self._completed
+        return sorted(keys)
+
+    def overlapping(self, start, end):
+        """Keys of tasks taking place at some point in [start, end) minutes"""
+        return self._intervals.overlapping(start, end)
+
+    def at(self, when):
+        """Keys of tasks taking place at the minute when (see moment())"""
+        return self._intervals.at(when)
+
+    def span(self, key):
+        """(start, end) minutes of the task at key, None if it has no date"""
+        return self._intervals.span(key)
+
+    def conflicts(self, key, task=None):
+        """Keys of other tasks overlapping the task at key.
+
+        task is the task as it would be after an add or edit, it defaults to
+        the stored one, so a change can be checked before it is made.
+        """
+        if task is None:
+            task = self._tasks.get(key)
+            if task is None:
+                return []
+        span = task_span(key, Task.coerce(task))
+        if span is None:
+            return []
+        return [other for other in self._intervals.overlapping(*span) if other != key]
+
+    def snapshot(self):
+        """Return a shallow copy of key -> task.
+
+        Stored tasks are replaced rather than modified on update, so the copy
+        can safely be serialised on another thread while editing continues.
+        """
+        return dict(self._tasks)
+
+    def to_dict(self):
+        """Return a plain dict copy of all tasks, suitable for JSON"""
+        return {key: task.to_dict() for key, task in self._tasks.items()}
+
+    # Dirty tracking
+
+    @property
+    def is_dirty(self):
+        return bool(self._dirty)
+
+    def dirty_keys(self):
+        """Return the keys changed since the last take_changes()"""
+        return set(self._dirty)
+
+    def take_changes(self, keys=None):
+        """Return key -> task (None if deleted) for dirty keys and mark them clean.
+
+        keys limits this to the dirty keys among them.
+        """
+        if keys is None:
+            changes = {key: self._tasks.get(key) for key in self._dirty}
+            self._dirty.clear()
+        else:
+            changes = {key: self._tasks.get(key) for key in self._dirty.intersection(keys)}
+            self._dirty.difference_update(changes)
+        return changes
+
+    def mark_dirty(self, keys):
+        """Flag keys as unsaved again, e.g. after a failed write"""
+        self._dirty.update(keys)
+
+    def mark_clean(self, keys):
+        """Forget changes of keys that don't need saving"""
+        self._dirty.difference_update(keys)
+
+    # Mutation
+
+    def add(self, key, task):
+        """Add a task at key, replacing any task already there"""
+        task = Task.coerce(task)
+        old = self._tasks.get(key)
+        if old is not None:
+            self._unindex(key, old)
+        self._tasks[key] = task
+        self._index(key, task)
+        self._changed(key, old, task)
+        return task
+
+    def update(self, key, **fields):
+        """Change some fields of an existing task"""
+        old = self._tasks[key]
+        task = old.replace(**fields)
+        self._unindex(key, old)
+        self._tasks[key] = task
+        self._index(key, task)
+        self._changed(key, old, task)
+        return task
+
+    def delete(self, key):
+        """Remove the task at key, returning it (or None if there was none)"""
+        old = self._tasks.pop(key, None)
+        if old is not None:
+            self._unindex(key, old)
+            self._changed(key, old, None)
+        return old
+
+    def load(self, tasks):
+        """Replace the whole contents of the store with tasks"""
+        changes = [(key, old, None) for key, old in self._tasks.items() if key not in tasks]
+        previous = self._tasks
+        self._tasks = {}
+        self._by_day.clear()
+        self._by_week.clear()
+        self._by_hour.clear()
+        self._by_priority.clear()
+        self._completed.clear()
+        spans = {}
+        for key, task in tasks.items():
+            task = Task.coerce(task)
+            self._tasks[key] = task
+            self._index(key, task, intervals=False)
+            span = task_span(key, task)
+            if span is not None:
+                spans[key] = span
+            changes.append((key, previous.get(key), task))
+        # Sorting all intervals once beats inserting them one by one
+        self._intervals.rebuild(spans)
+        self._dirty.clear()
+        self.version += 1
+        self._notify(changes)
+
+    def clear(self):
+        self.load({})
+
+    @contextmanager
+    def batch(self):
+        """Group mutations so listeners are notified once at the end"""
+        if self._pending is not None:
+            # Nested batches are folded into the outer one
+            yield self
+            return
+        self._pending = []
+        try:
+            yield self
+        finally:
+            changes, self._pending = self._pending, None
+            self._notify(changes)
+
+    # Listeners
+
+    def subscribe(self, callback):
+        """Call callback(changes) after every mutation"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+
+    def _changed(self, key, old, new):
+        self._dirty.add(key)
+        self.version += 1
+        self._notify([(key, old, new)])
+
+    def _notify(self, changes):
+        if not changes:
+            return
+        if self._pending is not None:
+            self._pending.extend(changes)
+            return
+        for callback in list(self._listeners):
+            callback(changes)
+
+    # Index maintenance
+
+    def _index(self, key, task, intervals=True):
+        day, hour = split_key(key)
+        self._by_day.setdefault(day, set()).add(key)
+        week = week_of(day)
+        if week is not None:
+            self._by_week.setdefault(week, set()).add(key)
+        self._by_hour.setdefault(hour, set()).add(key)
+        self._by_priority.setdefault(task.priority, set()).add(key)
+        if task.completed:
+            self._completed.add(key)
+        if intervals:
+            span = task_span(key, task)
+            if span is not None:
+                self._intervals.add(key, *span)
+
+    def _unindex(self, key, task):
+        day, hour = split_key(key)
+        self._discard(self._by_day, day, key)
+        self._discard(self._by_week, week_of(day), key)
+        self._discard(self._by_hour, hour, key)
+        self._discard(self._by_priority, task.priority, key)
+        self._completed.discard(key)
+        self._intervals.remove(key)
+
+    @staticmethod
+    def _discard(index, value, key):
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del index[value]
@@ -0,0 +1,86 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from animation import AnimationScheduler
+
+
+class FakeLoop:
+    """Stand-in for the Tk event loop with a manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = {}
+        self.next_id = 0
+
+    def clock(self):
+        return self.now
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.timers[self.next_id] = (self.now + ms / 1000.0, callback)
+        return self.next_id
+
+    def after_cancel(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def advance(self, ms):
+        self.now += ms / 1000.0
+        for timer_id, (due, callback) in sorted(self.timers.items(), key=lambda item: item[1][0]):
+            if due <= self.now + 1e-9 and timer_id in self.timers:
+                del self.timers[timer_id]
+                callback()
+
+
+class TestAnimationScheduler(unittest.TestCase):
+    def setUp(self):
+        self.loop = FakeLoop()
+        self.scheduler = AnimationScheduler(self.loop.after, self.loop.after_cancel, clock=self.loop.clock)
+        self.log = []
+
+    def blink(self, name, times=2):
+        try:
+            for i in range(times):
+                self.log.append((name, "on"))
+                yield 100
+                self.log.append((name, "off"))
+                yield 100
+            self.log.append((name, "done"))
+        finally:
+            self.log.append((name, "restored"))
+
+    def test_runs_without_blocking(self):
+        self.scheduler.start(self.blink("a"))
+        # Only the first step ran, the rest waits for the event loop
+        self.assertEqual(self.log, [("a", "on")])
+        for i in range(4):
+            self.loop.advance(100)
+        self.assertEqual(self.log[-2:], [("a", "done"), ("a", "restored")])
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertEqual(self.loop.timers, {})
+
+    def test_concurrent_animations_share_one_timer(self):
+        self.scheduler.start(self.blink("a"))
+        self.scheduler.start(self.blink("b"))
+        self.assertEqual(len(self.loop.timers), 1)
+        self.loop.advance(100)
+        self.assertEqual(self.log[-2:], [("a", "off"), ("b", "off")])
+
+    def test_cancel_restores(self):
+        self.scheduler.start(self.blink("a"), tag="goto")
+        self.scheduler.start(self.blink("b"), tag="matches")
+        self.scheduler.cancel_tag("goto")
+        self.assertIn(("a", "restored"), self.log)
+        self.assertNotIn(("a", "done"), self.log)
+        self.assertEqual(len(self.scheduler), 1)
+
+        self.scheduler.cancel_all()
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertEqual(self.loop.timers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date
+from unittest.mock import Mock
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import ApiError, ApiServer, MainThreadCalls, apply_operations, check_key, find_tasks, task_from_json
+from recurrence import Recurrences, make_rule, new_series
+from sqlite_storage import SqliteStorage
+from taskstore import Task, TaskStore, new_task
+
+
+class FakeStorage:
+    def __init__(self, weeks):
+        self._weeks = weeks
+        self.reads = []
+
+    def weeks(self):
+        return sorted(self._weeks)
+
+    def read_week(self, week):
+        self.reads.append(week)
+        return self._weeks.get(week, {})
+
+
+class FakeApp:
+    """What apply_operations() uses of the app: one week of tasks in a TaskStore"""
+
+    def __init__(self, tasks):
+        self.store = TaskStore()
+        for key, task in tasks.items():
+            self.store.add(key, task)
+        self.set_calls = []
+        self.status_var = Mock()
+
+    def get_task(self, key):
+        return self.store.get(key)
+
+    def set_task(self, key, task):
+        self.set_calls.append(key)
+
+    def undoable(self, label):
+        return nullcontext()
+
+
+class TestFindTasks(unittest.TestCase):
+    def setUp(self):
+        self.storage = FakeStorage({
+            "2025-W21": {"2025-05-19|10:00": new_task("Saved", priority="high"), "2025-05-19|9:00": new_task("Early")},
+            "2025-W22": {"2025-05-26|8:00": new_task("Next", completed=True)}
+        })
+        self.recurrences = Recurrences()
+
+    def test_memory_wins_over_storage(self):
+        weeks = {"2025-W21": {"2025-05-20|8:00": new_task("Unsaved")}}
+        tasks = find_tasks(self.storage, weeks, self.recurrences)
+        self.assertEqual([task["name"] for task in tasks.values()], ["Unsaved", "Next"])
+        self.assertEqual(self.storage.reads, ["2025-W22"])
+
+    def test_filters_and_order(self):
+        tasks = find_tasks(self.storage, {}, self.recurrences, start=date(2025, 5, 19), end=date(2025, 5, 25))
+        self.assertEqual(list(tasks), ["2025-05-19|9:00", "2025-05-19|10:00"])
+        self.assertEqual(list(find_tasks(self.storage, {}, self.recurrences, priority="high")), ["2025-05-19|10:00"])
+        self.assertEqual(list(find_tasks(self.storage, {}, self.recurrences, completed=True)), ["2025-05-26|8:00"])
+
+    def test_occurrences_in_a_date_range(self):
+        self.recurrences.add(new_series(new_task("Standup"), "9:00", make_rule("daily", date(2025, 5, 19))), "s1")
+        tasks = find_tasks(self.storage, {}, self.recurrences, start=date(2025, 5, 19), end=date(2025, 5, 20))
+        # A task of its own takes the slot of an occurrence
+        self.assertEqual([task["name"] for task in tasks.values()], ["Early", "Saved", "Standup"])
+
+    def test_database_filters_its_tasks(self):
+        storage = SqliteStorage(":memory:")
+        self.addCleanup(storage.close)
+        for week, tasks in self.storage._weeks.items():
+            storage.compact(week, tasks)
+        storage.weeks = storage.read_week = Mock(side_effect=AssertionError("scanned"))
+        self.assertEqual(list(find_tasks(storage, {}, self.recurrences, priority="high")), ["2025-05-19|10:00"])
+        weeks = {"2025-W22": {"2025-05-27|8:00": new_task("Unsaved", completed=True)}}
+        self.assertEqual(list(find_tasks(storage, weeks, self.recurrences, completed=True)), ["2025-05-27|8:00"])
+
+        # Occurrences stay out of stored slots the filters left out
+        del storage.read_week
+        self.recurrences.add(new_series(new_task("Standup", priority="high"), "9:00", make_rule("daily", date(2025, 5, 19))), "s1")
+        tasks = find_tasks(storage, {}, self.recurrences, start=date(2025, 5, 19), end=date(2025, 5, 20), priority="high")
+        self.assertEqual(list(tasks), ["2025-05-19|10:00", "2025-05-20|9:00"])
+
+
+class TestRequests(unittest.TestCase):
+    def test_task_from_json(self):
+        task = task_from_json({"name": "Report", "priority": "high"})
+        self.assertEqual((task.name, task.priority.value, task.duration), ("Report", "high", 60))
+        self.assertIsNotNone(task.created)
+        for data in ({}, {"name": " "}, {"name": "A", "priority": "urgent"}, {"name": "A", "duration": "long"},
+                     {"name": "A", "series": "s1"}, ["A"], {"name": "A", "completed": "false"},
+                     {"name": "A", "completed": 0}, {"name": "A", "duration": 1.5}, {"name": "A", "duration": True},
+                     {"name": "A", "notes": 3}, {"name": 3}, {"name": "A", "created": 5},
+                     {"name": "A", "duration": 0}, {"name": "A", "duration": 24 * 60 + 1}, {"name": "A", "duration": 10 ** 30}):
+            with self.assertRaises(ApiError) as raised:
+                task_from_json(data)
+            self.assertEqual(raised.exception.status, 400)
+        self.assertEqual(task_from_json({"name": "A", "duration": 24 * 60}).duration, 24 * 60)
+
+    def test_check_key(self):
+        self.assertEqual(check_key("2025-05-19|8:00"), "2025-05-19|8:00")
+        for key in ("Monday|8:00", "2025-05-19", "2025-05-19|noon", None,
+                    # Off the grid, or outside its hours
+                    "2025-05-19|8:30", "2025-05-19|8", "2025-05-19|08:00", "2025-05-19|3:00", "2025-05-19|99:00"):
+            with self.assertRaises(ApiError):
+                check_key(key)
+
+    def test_update_checks_field_types(self):
+        app = FakeApp({"2025-05-19|8:00": Task.from_dict(new_task("Report"))})
+        with self.assertRaises(ApiError) as raised:
+            apply_operations(app, [{"op": "update", "key": "2025-05-19|8:00", "fields": {"completed": "false"}}])
+        self.assertEqual(raised.exception.status, 400)
+        self.assertEqual(app.set_calls, [])
+
+    def test_delete_needs_a_stored_task(self):
+        occurrence = Task.from_dict(dict(new_task("Standup"), series="s1"))
+        app = FakeApp({"2025-05-19|8:00": Task.from_dict(new_task("Report")), "2025-05-19|9:00": occurrence})
+        for key, status in (("2025-05-19|10:00", 404), ("2025-05-19|9:00", 409)):
+            with self.assertRaises(ApiError) as raised:
+                apply_operations(app, [{"op": "delete", "key": "2025-05-19|8:00"}, {"op": "delete", "key": key}])
+            self.assertEqual(raised.exception.status, status)
+        # Deleting twice in one batch finds nothing the second time
+        with self.assertRaises(ApiError):
+            apply_operations(app, [{"op": "delete", "key": "2025-05-19|8:00"}] * 2)
+        self.assertEqual(app.set_calls, [])
+        self.assertEqual(apply_operations(app, [{"op": "delete", "key": "2025-05-19|8:00"}]), {"2025-05-19|8:00": None})
+
+    def test_calls_run_on_the_woken_thread(self):
+        wakes = []
+        calls = MainThreadCalls(wake=lambda: wakes.append(threading.current_thread()))
+        calls.start()
+        results = []
+        thread = threading.Thread(target=lambda: results.extend(calls.submit(threading.current_thread)
+                                                                for _ in range(3)))
+        thread.start()
+        thread.join()
+        # One wake for the calls queued before they run
+        self.assertEqual(len(wakes), 1)
+        calls.run_pending()
+        self.assertEqual({future.result(0) for future in results}, {threading.current_thread()})
+        calls.submit(len, "")
+        self.assertEqual(len(wakes), 2)
+
+    def test_no_wake_while_stopped(self):
+        wakes = []
+        calls = MainThreadCalls(wake=lambda: wakes.append(True))
+        future = calls.submit(len, "ab")
+        self.assertEqual(wakes, [])
+        # Calls queued before start() are run once it is started
+        calls.start()
+        self.assertEqual(wakes, [True])
+        calls.run_pending()
+        self.assertEqual(future.result(0), 2)
+        calls.stop()
+        calls.submit(len, "")
+        self.assertEqual(wakes, [True])
+
+
+class TestServer(unittest.TestCase):
+    def test_unexpected_errors_are_answered(self):
+        app = FakeApp({})
+        app.root = Mock()
+        app.read_view = Mock(side_effect=LookupError("broken"))
+        server = ApiServer(app, port=0)
+        server.start()
+        self.addCleanup(server.stop)
+        # No Tk thread here, the loop below runs the calls
+        server.calls.wake = lambda: None
+        responses = []
+
+        def client():
+            connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+            for method, url, body in [("GET", "/tasks", None),
+                                      ("PUT", "/tasks/2025-05-19|8:00", {"name": "A", "created": 5})]:
+                connection.request(method, url, body=json.dumps(body) if body else None,
+                                   headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                responses.append((response.status, json.loads(response.read())))
+            connection.close()
+
+        thread = threading.Thread(target=client)
+        thread.start()
+        while thread.is_alive():
+            server.calls.run_pending()
+            time.sleep(0.01)
+        # The same connection answers the next request
+        self.assertEqual([status for status, result in responses], [500, 400])
+        self.assertIn("broken", responses[0][1]["error"])
+        self.assertEqual(app.set_calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,14 +5,27 @@ import tkinter as tk
 from unittest.mock import patch, MagicMock, mock_open
 import tempfile
 import sys
+import http.client
+import threading
+from datetime import timedelta
 
 # Add the parent directory to sys.path to import the module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the module to be tested
-from gui import Autodo, format_check
+from gui import Autodo
+from storage import open_storage
+from taskstore import new_task
 
 class TestAutodo(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The tests drive a real Tk window, which needs a display
+        try:
+            tk.Tk().destroy()
+        except tk.TclError as e:
+            raise unittest.SkipTest(f"Tk is not available: {e}")
+
     def setUp(self):
         self.temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.json')
         self.temp_file.close()
@@ -139,32 +152,38 @@ class TestAutodo(unittest.TestCase):
         self.autodo.save_schedule = original_save
     
     def test_has_unsaved_changes_true(self):
-        self.autodo.entries = {
-            ("Monday", "8:00"): self._create_mock_entry("New Task")
-        }
-        self.autodo.saved_schedule = {
-            ("Monday", "8:00"): "Old Task"
-        }
+        key = self.autodo.task_key(("Monday", "8:00"))
+        self.autodo.store.load({key: new_task("Old Task")})
+        self.autodo.store.update(key, name="New Task")
         
         self.assertTrue(self.autodo.has_unsaved_changes())
+        self.assertEqual(self.autodo.store.dirty_keys(), {key})
     
     def test_has_unsaved_changes_false(self):
+        self.autodo.store.load({self.autodo.task_key(("Monday", "8:00")): new_task("Same Task")})
+        
+        self.assertFalse(self.autodo.has_unsaved_changes())
+    
+    def test_has_unsaved_changes_detail_edit(self):
+        key = self.autodo.task_key(("Monday", "8:00"))
+        self.autodo.store.load({key: new_task("Task")})
+        self.autodo.store.update(key, priority="high", completed=True)
+        
+        self.assertTrue(self.autodo.has_unsaved_changes())
+    
+    def test_has_unsaved_changes_cell_being_edited(self):
+        self.autodo.store.load({self.autodo.task_key(("Monday", "8:00")): new_task("Same Task")})
         self.autodo.entries = {
-            ("Monday", "8:00"): self._create_mock_entry("Same Task")
-        }
-        self.autodo.saved_schedule = {
-            ("Monday", "8:00"): "Same Task"
+            ("Monday", "8:00"): self._create_mock_entry("Typed Task")
         }
+        self.autodo._editing_cell = ("Monday", "8:00")
         
-        self.assertFalse(self.autodo.has_unsaved_changes())
+        self.assertTrue(self.autodo.has_unsaved_changes())
     
     @patch('tkinter.messagebox.askyesnocancel')
     def test_on_close_with_unsaved_changes_save(self, mock_messagebox):
         mock_messagebox.return_value = True
-        self.autodo.entries = {
-            ("Monday", "8:00"): self._create_mock_entry("Unsaved Task")
-        }
-        self.autodo.saved_schedule = {}
+        self.autodo.store.add(self.autodo.task_key(("Monday", "8:00")), new_task("Unsaved Task"))
         
         with patch.object(self.autodo, 'save_schedule') as mock_save:
             with patch.object(self.autodo.root, 'destroy') as mock_destroy:
@@ -175,10 +194,7 @@ class TestAutodo(unittest.TestCase):
     @patch('tkinter.messagebox.askyesnocancel')
     def test_on_close_with_unsaved_changes_no_save(self, mock_messagebox):
         mock_messagebox.return_value = False
-        self.autodo.entries = {
-            ("Monday", "8:00"): self._create_mock_entry("Unsaved Task")
-        }
-        self.autodo.saved_schedule = {}
+        self.autodo.store.add(self.autodo.task_key(("Monday", "8:00")), new_task("Unsaved Task"))
         
         with patch.object(self.autodo, 'save_schedule') as mock_save:
             with patch.object(self.autodo.root, 'destroy') as mock_destroy:
@@ -189,10 +205,7 @@ class TestAutodo(unittest.TestCase):
     @patch('tkinter.messagebox.askyesnocancel')
     def test_on_close_with_unsaved_changes_cancel(self, mock_messagebox):
         mock_messagebox.return_value = None
-        self.autodo.entries = {
-            ("Monday", "8:00"): self._create_mock_entry("Unsaved Task")
-        }
-        self.autodo.saved_schedule = {}
+        self.autodo.store.add(self.autodo.task_key(("Monday", "8:00")), new_task("Unsaved Task"))
         
         with patch.object(self.autodo, 'save_schedule') as mock_save:
             with patch.object(self.autodo.root, 'destroy') as mock_destroy:
@@ -201,17 +214,174 @@ class TestAutodo(unittest.TestCase):
                 mock_destroy.assert_not_called()
     
     def test_on_close_without_unsaved_changes(self):
-        self.autodo.entries = {
-            ("Monday", "8:00"): self._create_mock_entry("Saved Task")
-        }
-        self.autodo.saved_schedule = {
-            ("Monday", "8:00"): "Saved Task"
-        }
+        self.autodo.store.load({self.autodo.task_key(("Monday", "8:00")): new_task("Saved Task")})
         
         with patch.object(self.autodo.root, 'destroy') as mock_destroy:
             self.autodo.on_close()
             mock_destroy.assert_called_once()
     
+    def test_task_key_uses_displayed_week(self):
+        key = self.autodo.task_key(("Wednesday", "9:00"))
+        self.assertEqual(self.autodo.cell_for_key(key), ("Wednesday", "9:00"))
+        self.assertIsNone(self.autodo.cell_for_key("1999-01-01|9:00"))
+    
+    def test_recurring_task_is_stored_once(self):
+        self.autodo.add_recurring_tasks("Monday", "7:00", "Run", "medium", "", "Daily")
+        keys = [self.autodo.task_key((day, "7:00")) for day in self.autodo.DAYS]
+        self.assertTrue(all(key in self.autodo.store for key in keys))
+        self.assertEqual(len(self.autodo.recurrences), 1)
+        
+        # Completing one occurrence is saved as an override of the series
+        self.autodo.store.update(keys[1], completed=True)
+        write, on_done = self.autodo._prepare_save()
+        self.assertFalse(self.autodo.store.is_dirty)
+        series = next(iter(self.autodo.recurrences.to_dict().values()))
+        self.assertEqual(list(series["overrides"].values()), [{"completed": True}])
+    
+    def test_weekdays_series_started_on_a_weekend(self):
+        self.autodo.create_week_schedule()
+        key = self.autodo.task_key(("Saturday", "9:00"))
+        self.autodo.commit_text(("Saturday", "9:00"), "Old task")
+        self.autodo.add_recurring_tasks("Saturday", "9:00", "Standup", "medium", "", "Weekdays")
+        # The chosen slot holds the first occurrence, not nothing
+        self.assertEqual(self.autodo.store[key].name, "Standup")
+        self.assertIsNotNone(self.autodo.store[key].series)
+        self.assertNotIn(self.autodo.task_key(("Sunday", "9:00")), self.autodo.store)
+    
+    def test_week_navigation_keeps_edits(self):
+        self.autodo.create_week_schedule()
+        this_week = self.autodo.current_week
+        self.autodo.store.add(self.autodo.task_key(("Monday", "8:00")), new_task("This week"))
+        
+        self.autodo.next_week()
+        next_week = self.autodo.current_week
+        self.assertNotEqual(next_week, this_week)
+        self.assertEqual(len(self.autodo.store), 0)
+        self.autodo.store.add(self.autodo.task_key(("Friday", "8:00")), new_task("Next week"))
+        
+        # The week left behind comes back from the cache, edits included
+        self.autodo.previous_week()
+        self.assertEqual(self.autodo.current_week, this_week)
+        self.assertEqual([task.name for task in self.autodo.store.values()], ["This week"])
+        self.autodo.autosaver.wait()
+        self.assertEqual([task["name"] for task in self.autodo.storage.read_week(next_week).values()], ["Next week"])
+    
+    def test_search_all_weeks(self):
+        self.autodo.create_week_schedule()
+        monday = self.autodo.task_key(("Monday", "8:00"))
+        self.autodo.store.add(monday, new_task("Study Python"))
+        # One week saved and evicted, one only in memory
+        saved = (self.autodo.week_start + timedelta(weeks=5)).isoformat() + "|9:00"
+        self.autodo.storage.append({saved: new_task("Study maths", priority="high")})
+        unsaved = (self.autodo.week_start - timedelta(weeks=1) + timedelta(days=1)).isoformat() + "|9:00"
+        self.autodo.set_task(unsaved, new_task("Study history"))
+        
+        found = list(self.autodo.search_all_weeks("stu"))
+        self.assertEqual([key for key, task in found], [unsaved, monday, saved])
+        self.assertEqual([key for key, task in self.autodo.search_all_weeks("stu", priority="high")], [saved])
+        self.assertEqual([key for key, task in self.autodo.search_all_weeks("stu", weekday=1)], [unsaved])
+        # Only the displayed week is in the index
+        self.assertEqual(self.autodo.search_index.search("stu"), [monday])
+        
+        self.autodo.goto_key(saved)
+        self.assertEqual(self.autodo.cell_for_key(saved), ("Monday", "9:00"))
+    
+    def test_changes_of_other_instances_are_merged(self):
+        self.autodo.create_week_schedule()
+        monday, tuesday = self.autodo.task_key(("Monday", "8:00")), self.autodo.task_key(("Tuesday", "8:00"))
+        self.autodo.store.add(monday, new_task("Mine"))
+        self.autodo.save_schedule()
+        self.autodo.autosaver.wait()
+        
+        # Another instance edits the same week, while this one has an unsaved edit
+        other = open_storage(self.temp_file.name)
+        other.append({monday: new_task("Theirs"), tuesday: new_task("New")})
+        self.autodo.store.add(self.autodo.task_key(("Friday", "8:00")), new_task("Unsaved"))
+        self.autodo.merge_external_changes()
+        self.assertEqual(self.autodo.store[monday].name, "Theirs")
+        self.assertEqual(self.autodo.store[tuesday].name, "New")
+        self.assertEqual(self.autodo.store.dirty_keys(), {self.autodo.task_key(("Friday", "8:00"))})
+        
+        other.append({tuesday: None})
+        self.assertEqual(self.autodo.merge_external_changes(), [tuesday])
+        self.assertNotIn(tuesday, self.autodo.store)
+    
+    def test_undo_redo(self):
+        self.autodo.create_week_schedule()
+        key = self.autodo.task_key(("Monday", "8:00"))
+        self.autodo.commit_text(("Monday", "8:00"), "Mistake")
+        with self.autodo.undoable("delete task"):
+            self.autodo.store.delete(key)
+        self.autodo.undo()
+        self.assertEqual(self.autodo.store[key].name, "Mistake")
+        
+        # A whole series is one step, its occurrences follow
+        self.autodo.add_recurring_tasks("Monday", "9:00", "Daily", "medium", "", "Daily")
+        self.assertEqual(len(self.autodo.store), 8)
+        self.autodo.undo()
+        self.assertEqual(len(self.autodo.store), 1)
+        self.assertEqual(len(self.autodo.recurrences), 0)
+        self.autodo.redo()
+        self.assertEqual(len(self.autodo.store), 8)
+        
+        # Editing one occurrence is undone on its series
+        self.autodo.commit_text(("Tuesday", "9:00"), "Once")
+        self.autodo.undo()
+        self.assertEqual(self.autodo.store[self.autodo.task_key(("Tuesday", "9:00"))].name, "Daily")
+        self.assertEqual(self.autodo.recurrences.to_dict().popitem()[1]["overrides"], {})
+    
+    def test_api_batch(self):
+        self.autodo.create_week_schedule()
+        server = self.autodo.start_api(port=0)
+        # There is no mainloop to take the wake-up event, the loop below runs the calls
+        server.calls.wake = lambda: None
+        monday = self.autodo.task_key(("Monday", "8:00"))
+        other_week = (self.autodo.week_start + timedelta(weeks=1)).isoformat() + "|8:00"
+        responses = []
+        
+        def client():
+            connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+            for method, url, body in [
+                ("POST", "/batch", {"operations": [{"op": "put", "key": monday, "task": {"name": "API"}},
+                                                   {"op": "put", "key": other_week, "task": {"name": "Later"}},
+                                                   {"op": "update", "key": monday, "fields": {"priority": "high"}}]}),
+                ("GET", "/tasks?priority=high", None),
+                ("POST", "/batch", {"operations": [{"op": "delete", "key": monday}, {"op": "update", "key": "nonsense"}]})
+            ]:
+                connection.request(method, url, body=json.dumps(body) if body else None,
+                                   headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                responses.append((response.status, json.loads(response.read())))
+            connection.close()
+        
+        thread = threading.Thread(target=client)
+        thread.start()
+        while thread.is_alive():
+            server.calls.run_pending()
+            self.autodo.root.update()
+            thread.join(0.01)
+        server.stop()
+        
+        self.assertEqual(responses[0][0], 200)
+        self.assertEqual(responses[0][1]["count"], 2)
+        self.assertEqual(list(responses[1][1]["tasks"]), [monday])
+        # A batch with a bad operation changes nothing
+        self.assertEqual(responses[2][0], 400)
+        self.assertEqual(self.autodo.store[monday].priority.value, "high")
+        self.assertEqual(self.autodo.get_task(other_week).name, "Later")
+        self.autodo.undo()
+        self.assertNotIn(monday, self.autodo.store)
+    
+    def test_fast_start_defers_offscreen_rows(self):
+        self.autodo.root.destroy()
+        self.autodo = Autodo(title="Test Schedule", geometry="800x200", SAVE_FILE=self.temp_file.name, fast_start=True)
+        self.autodo.create_week_schedule()
+        self.assertLess(len(self.autodo.entries), 7 * len(self.autodo.HOURS))
+        
+        # Going to a cell that isn't built yet builds the rest of the grid
+        self.autodo.scroll_to_cell(("Sunday", "23:00"))
+        self.assertEqual(len(self.autodo.entries), 7 * len(self.autodo.HOURS))
+    
     def test_entry_format_handling(self):
         test_cases = [
             "Hello, World!",
@@ -233,22 +403,5 @@ class TestAutodo(unittest.TestCase):
         mock_entry.get.return_value = text
         return mock_entry
 
-class TestFormatCheck(unittest.TestCase):
-    @patch('tkinter.Tk')
-    @patch('tkinter.Entry')
-    def test_format_check(self, mock_entry, mock_tk):
-        mock_tk_instance = MagicMock()
-        mock_tk.return_value = mock_tk_instance
-        
-        mock_entry_instance = MagicMock()
-        mock_entry.return_value = mock_entry_instance
-        
-        test_input = "Test String"
-        format_check(test_input)
-        
-        mock_entry_instance.delete.assert_called_with(0, tk.END)
-        mock_entry_instance.insert.assert_called_with(0, test_input)
-        mock_tk_instance.destroy.assert_called_once()
-
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autosave import AutoSaver
+
+
+class FakeScheduler:
+    """Stand-in for Tk's after/after_cancel that runs timers on demand"""
+
+    def __init__(self):
+        self.timers = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.timers[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def run_pending(self):
+        timers, self.timers = self.timers, {}
+        for callback in timers.values():
+            callback()
+
+
+class TestAutoSaver(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = FakeScheduler()
+        self.pending = []
+        self.written = []
+        self.statuses = []
+        self.saver = AutoSaver(self.scheduler.after, self.scheduler.after_cancel, self.prepare, on_status=self.statuses.append)
+
+    def prepare(self):
+        if not self.pending:
+            return None
+        batch, self.pending = self.pending, []
+        return (lambda: self.written.append((batch, threading.current_thread().name))), None
+
+    def test_burst_is_coalesced(self):
+        for i in range(10):
+            self.pending.append(i)
+            self.saver.schedule()
+        self.assertEqual(len(self.scheduler.timers), 1)
+
+        self.scheduler.run_pending()
+        self.assertTrue(self.saver.wait(timeout=5))
+        self.assertEqual(len(self.written), 1)
+        self.assertEqual(self.written[0][0], list(range(10)))
+        self.assertEqual(self.written[0][1], "autodo-autosave")
+        self.assertTrue(self.statuses[-1].startswith("All changes saved"))
+
+    def test_save_now_without_changes(self):
+        self.assertFalse(self.saver.save_now())
+        self.assertEqual(self.written, [])
+
+    def test_failed_write_reports_status(self):
+        errors = []
+
+        def failing_write():
+            raise OSError("disk full")
+
+        self.saver.prepare = lambda: (failing_write, errors.append)
+        self.saver.save_now()
+        self.saver.wait(timeout=5)
+        self.assertIsInstance(errors[0], OSError)
+        self.assertEqual(self.statuses[-1], "Save failed: disk full")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import TASKS_PER_WEEK, compare, main, run_suite, synthetic_tasks, workload_settings
+from taskstore import key_week, week_start
+from datetime import date
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_synthetic_tasks_fill_consecutive_weeks(self):
+        tasks = dict(synthetic_tasks(TASKS_PER_WEEK * 2 + 5, week_start(date(2025, 5, 19))))
+        self.assertEqual(len(tasks), TASKS_PER_WEEK * 2 + 5)
+        self.assertEqual(sorted({key_week(key) for key in tasks}), ["2025-W21", "2025-W22", "2025-W23"])
+        self.assertEqual(tasks, dict(synthetic_tasks(TASKS_PER_WEEK * 2 + 5, week_start(date(2025, 5, 19)))))
+
+    def test_suite_reports_every_headless_benchmark(self):
+        document = run_suite([50], repeat=1, gui=False, label="test")
+        self.assertEqual(document["label"], "test")
+        self.assertIn("store.load/50", document["results"])
+        self.assertIn("csv.export/50", document["results"])
+        for timing in document["results"].values():
+            self.assertEqual(timing["runs"], 1)
+            self.assertGreaterEqual(timing["median"], 0)
+
+    def test_compare_flags_only_real_slowdowns(self):
+        old = {"results": {"a/1": {"median": 0.100}, "b/1": {"median": 0.0001}, "c/1": {"median": 0.1}}}
+        new = {"results": {"a/1": {"median": 0.150}, "b/1": {"median": 0.0005}, "d/1": {"median": 0.1}}}
+        rows = {name: regressed for name, before, after, ratio, regressed in compare(old, new)}
+        # b is five times slower but below the noise floor, c and d are not in both runs
+        self.assertEqual(rows, {"a/1": True, "b/1": False})
+
+    def test_compare_refuses_other_work(self):
+        old = dict(workload_settings("json"), results={"a/1": {"median": 0.1}})
+        self.assertEqual(len(compare(old, dict(old, python="other"))), 1)
+        with self.assertRaises(ValueError):
+            compare(old, dict(workload_settings("sqlite"), results={"a/1": {"median": 0.1}}))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "old.json")
+            with open(path, "w") as f:
+                json.dump(old, f)
+            # Refused before anything runs
+            with contextlib.redirect_stderr(io.StringIO()) as err:
+                self.assertEqual(main(["--sizes", "50", "--backend", "sqlite", "--compare", path]), 2)
+            self.assertIn("backend: json -> sqlite", err.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
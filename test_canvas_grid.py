@@ -0,0 +1,180 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import canvas_grid
+from canvas_grid import (CELL_HEIGHT, HEADER_HEIGHT, LABEL_WIDTH, MIN_CELL_WIDTH, CanvasGrid, cell_index, cell_rect,
+                         fit_text, visible_range)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+HOURS = [f"{h}:00" for h in range(5, 24)]
+
+
+class FakeCanvas:
+    """Stand-in for tk.Canvas that keeps the items' coordinates and options"""
+
+    def __init__(self, *args, **kwargs):
+        self.items = {}
+        self.created = 0
+        self.width, self.height = 400, 200
+        self.x, self.y = 0, 0
+        self.idle = []
+
+    def _create(self, kind, options):
+        self.created += 1
+        self.items[self.created] = dict(options, kind=kind)
+        return self.created
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", options)
+
+    def create_window(self, *coords, **options):
+        return self._create("window", options)
+
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = coords
+
+    def itemconfigure(self, item, **options):
+        self.items[item].update(options)
+
+    def canvasx(self, x):
+        return self.x + x
+
+    def canvasy(self, y):
+        return self.y + y
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def bind(self, *args):
+        pass
+
+    def configure(self, **options):
+        pass
+
+    def tag_raise(self, item):
+        pass
+
+    def shown(self, kind):
+        """Options of the items of kind that are not hidden"""
+        return [item for item in self.items.values() if item["kind"] == kind and item.get("state") == "normal"]
+
+
+class FakeEntry:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def bind(self, *args):
+        pass
+
+
+class TestGeometry(unittest.TestCase):
+    def test_visible_range(self):
+        # 400 pixels show the labels and cells 0-2, the next cell starts right after
+        self.assertEqual(visible_range(7, 0, 400, LABEL_WIDTH, 110), range(0, 3))
+        self.assertEqual(visible_range(7, 0, 401, LABEL_WIDTH, 110), range(0, 4))
+        # Scrolled half a cell past the labels: cells 0 to 4, the first and the last in part
+        self.assertEqual(visible_range(7, LABEL_WIDTH + 55, 400, LABEL_WIDTH, 110), range(0, 5))
+        self.assertEqual(visible_range(7, 300, 400, LABEL_WIDTH, 110), range(2, 6))
+        # Never past the last cell, nothing at all in a window narrower than the labels
+        self.assertEqual(visible_range(7, 0, 5000, LABEL_WIDTH, 110), range(0, 7))
+        self.assertEqual(len(visible_range(7, 0, 20, LABEL_WIDTH, 110)), 0)
+        self.assertEqual(len(visible_range(19, 0, 0, HEADER_HEIGHT, CELL_HEIGHT)), 0)
+
+    def test_cell_rect(self):
+        self.assertEqual(cell_rect(0, 0, 110), (LABEL_WIDTH, HEADER_HEIGHT, LABEL_WIDTH + 110, HEADER_HEIGHT + CELL_HEIGHT))
+        x0, y0, x1, y1 = cell_rect(2, 3, 120, rows=3)
+        self.assertEqual((x0, y0), (LABEL_WIDTH + 240, HEADER_HEIGHT + 3 * CELL_HEIGHT))
+        self.assertEqual((x1 - x0, y1 - y0), (120, 3 * CELL_HEIGHT))
+
+    def test_cell_index(self):
+        self.assertEqual(cell_index(LABEL_WIDTH, HEADER_HEIGHT, 110, 7, 19), (0, 0))
+        self.assertEqual(cell_index(LABEL_WIDTH + 111, HEADER_HEIGHT + 2 * CELL_HEIGHT + 1, 110, 7, 19), (1, 2))
+        for x, y in ((10, 100), (100, 10), (LABEL_WIDTH + 7 * 110, 100), (100, HEADER_HEIGHT + 19 * CELL_HEIGHT)):
+            self.assertIsNone(cell_index(x, y, 110, 7, 19))
+
+    def test_fit_text(self):
+        self.assertEqual(fit_text("Gym", 110), "Gym")
+        fitted = fit_text("A rather long task name", 70)
+        self.assertTrue(fitted.endswith("…"))
+        self.assertLess(len(fitted), 10)
+
+
+class TestCanvasGrid(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.multiple(canvas_grid.tk, Canvas=FakeCanvas, Entry=FakeEntry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.blocks = {}  # First cell -> rows, of the blocks taller than one cell
+        self.grid = CanvasGrid(None, DAYS, HOURS, lambda cell_key: (" ".join(cell_key), "white", None),
+                               on_commit=None, on_open=None, cell_block=self.block)
+        self.canvas = self.grid.canvas
+
+    def block(self, cell_key):
+        day, hour = cell_key
+        for (first_day, first_hour), rows in self.blocks.items():
+            start = HOURS.index(first_hour)
+            if day == first_day and start <= HOURS.index(hour) < start + rows:
+                return (first_day, first_hour), rows
+        return cell_key, 1
+
+    def test_draws_only_visible_cells(self):
+        self.grid.redraw()
+        columns = len(visible_range(7, 0, 400, LABEL_WIDTH, MIN_CELL_WIDTH))
+        rows = len(visible_range(19, 0, 200, HEADER_HEIGHT, CELL_HEIGHT))
+        self.assertEqual(len(self.grid._items), columns * rows)
+        self.assertIn("Monday 5:00", [item["text"] for item in self.canvas.shown("text")])
+        self.assertNotIn("Sunday 23:00", [item["text"] for item in self.canvas.shown("text")])
+
+    def test_scrolling_recycles_items(self):
+        # Scrolled past the labels, then by whole cells, so as many cells show
+        self.canvas.x, self.canvas.y = LABEL_WIDTH, HEADER_HEIGHT
+        self.grid.redraw()
+        created = self.canvas.created
+        self.canvas.x += 3 * MIN_CELL_WIDTH
+        self.canvas.y += 10 * CELL_HEIGHT
+        self.grid.redraw()
+        # The same number of cells shows, drawn with the items that went out of view
+        self.assertEqual(self.canvas.created, created)
+        texts = [item["text"] for item in self.canvas.shown("text")]
+        self.assertIn("Thursday 15:00", texts)
+        self.assertNotIn("Monday 5:00", texts)
+        self.assertEqual(len(self.grid._free), 0)
+
+    def test_block_is_drawn_once(self):
+        self.blocks[("Monday", "6:00")] = 3
+        self.grid.redraw()
+        self.assertIn(("Monday", "6:00"), self.grid._items)
+        self.assertNotIn(("Monday", "7:00"), self.grid._items)
+        rect = self.grid._items[("Monday", "6:00")][0]
+        self.assertEqual(self.canvas.items[rect]["coords"], cell_rect(0, 1, MIN_CELL_WIDTH, rows=3))
+        self.assertEqual(self.grid.cell_at(LABEL_WIDTH + 1, HEADER_HEIGHT + 3 * CELL_HEIGHT + 1), ("Monday", "8:00"))
+        self.assertEqual(self.grid.block_of(("Monday", "8:00")), (("Monday", "6:00"), 3))
+
+    def test_block_above_the_view_is_drawn_by_its_first_cell(self):
+        self.blocks[("Monday", "5:00")] = 4
+        self.canvas.y = 2 * CELL_HEIGHT
+        self.grid.redraw()
+        self.assertIn(("Monday", "5:00"), self.grid._items)
+
+    def test_redraws_are_coalesced(self):
+        for _ in range(5):
+            self.grid.schedule_redraw()
+        self.assertEqual(len(self.canvas.idle), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
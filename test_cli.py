@@ -0,0 +1,154 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import sys
+from datetime import date
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import main
+from recurrence import make_rule, new_series
+from storage import open_storage
+from taskstore import new_task
+
+MONDAY = date(2025, 5, 19)
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "schedule.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_cli(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            code = main(["--file", self.path, *argv])
+        return code, out.getvalue(), err.getvalue()
+
+    def stored(self):
+        storage = open_storage(self.path)
+        return {key: task for week in storage.weeks() for key, task in storage.load_week(week).items()}
+
+    def test_add_and_list(self):
+        self.assertEqual(self.run_cli("add", "2025-05-20", "9", "Gym")[0], 0)
+        self.run_cli("add", "2025-05-19", "08:00", "Study Python", "--priority", "high", "--notes", "chapter 3")
+        code, out, err = self.run_cli("list")
+        self.assertEqual(code, 0)
+        lines = out.splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("2025-05-19  8:00", lines[0])
+        self.assertIn("Study Python", lines[0])
+        self.assertIn("Gym", lines[1])
+
+        code, out, err = self.run_cli("list", "--priority", "high", "--json")
+        record = json.loads(out)
+        self.assertEqual((record["key"], record["notes"]), ("2025-05-19|8:00", "chapter 3"))
+
+    def test_add_checks_the_duration(self):
+        self.assertEqual(self.run_cli("add", "2025-05-19", "8", "Gym", "--duration", "90")[0], 0)
+        self.assertEqual(self.stored()["2025-05-19|8:00"]["duration"], 90)
+        for duration in ("0", "-30", "1441"):
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                self.run_cli("add", "2025-05-19", "9", "Gym", "--duration", duration)
+        self.assertEqual(len(self.stored()), 1)
+
+    def test_list_a_database(self):
+        self.path = os.path.join(self.temp_dir, "schedule.db")
+        self.run_cli("add", "2025-05-19", "8", "Gym", "--priority", "high")
+        self.run_cli("add", "2025-05-19", "9", "Report")
+        storage = open_storage(self.path)
+        storage.append_series({"s1": new_series(new_task("Standup", priority="high"), "9:00", make_rule("daily", MONDAY))})
+        storage.close()
+        code, out, err = self.run_cli("list", "--from", "2025-05-19", "--to", "2025-05-20", "--priority", "high")
+        # The stored task keeps the 9:00 slot of the first occurrence
+        self.assertEqual([line.split()[0:2] for line in out.splitlines()],
+                         [["2025-05-19", "8:00"], ["2025-05-20", "9:00"]])
+        # Unfiltered: both tasks and the other six days of the stored week
+        self.assertEqual(len(self.run_cli("list")[1].splitlines()), 8)
+
+    def test_add_refuses_taken_slot(self):
+        self.run_cli("add", "2025-05-19", "8", "Gym")
+        code, out, err = self.run_cli("add", "2025-05-19", "8", "Swim")
+        self.assertEqual(code, 1)
+        self.assertIn("--replace", err)
+        self.run_cli("add", "2025-05-19", "8", "Swim", "--replace")
+        self.assertEqual(self.stored()["2025-05-19|8:00"]["name"], "Swim")
+
+    def test_search_matches_word_prefixes(self):
+        self.run_cli("add", "2025-05-19", "8", "Study Python")
+        self.run_cli("add", "2025-05-19", "9", "Study maths", "--notes", "algebra")
+        code, out, err = self.run_cli("search", "stu py")
+        self.assertEqual(len(out.splitlines()), 1)
+        self.assertIn("Study Python", out)
+        code, out, err = self.run_cli("search", "alg")
+        self.assertIn("Study maths", out)
+
+    def test_complete(self):
+        self.run_cli("add", "2025-05-19", "8", "Gym")
+        self.assertEqual(self.run_cli("complete", "2025-05-19", "8")[0], 0)
+        self.assertTrue(self.stored()["2025-05-19|8:00"]["completed"])
+        self.assertEqual(self.run_cli("list", "--open")[1], "")
+        self.run_cli("complete", "2025-05-19", "8", "--reopen")
+        self.assertFalse(self.stored()["2025-05-19|8:00"]["completed"])
+
+        code, out, err = self.run_cli("complete", "2025-05-19", "10")
+        self.assertEqual(code, 1)
+        self.assertIn("No task", err)
+
+    def test_complete_occurrence(self):
+        storage = open_storage(self.path)
+        storage.append_series({"s1": new_series(new_task("Standup"), "9:00", make_rule("daily", MONDAY))})
+        self.run_cli("complete", "2025-05-21", "9")
+        code, out, err = self.run_cli("list", "--from", "2025-05-19", "--to", "2025-05-23", "--completed")
+        self.assertEqual(len(out.splitlines()), 1)
+        self.assertIn("2025-05-21", out)
+        # Stored as an override of the series, not as a task
+        self.assertEqual(self.stored(), {})
+
+    def test_export_and_import(self):
+        self.run_cli("add", "2025-05-19", "8", "Gym")
+        self.run_cli("add", "2025-06-02", "8", "Swim")
+        csv_path = os.path.join(self.temp_dir, "tasks.csv")
+        code, out, err = self.run_cli("export", csv_path, "--to", "2025-05-31")
+        self.assertIn("Exported 1 task(s)", out)
+
+        self.path = os.path.join(self.temp_dir, "other.json")
+        code, out, err = self.run_cli("import", csv_path)
+        self.assertEqual(code, 0)
+        self.assertIn("1 added", out)
+        self.assertEqual([task["name"] for task in self.stored().values()], ["Gym"])
+
+    def test_compact(self):
+        for hour in range(8, 12):
+            self.run_cli("add", "2025-05-19", str(hour), f"Task {hour}")
+        code, out, err = self.run_cli("compact")
+        self.assertIn("Compacted 1 week(s)", out)
+        self.assertFalse([name for name in os.listdir(self.path[:-5] + ".weeks") if name.endswith(".journal")])
+        self.assertEqual(len(self.stored()), 4)
+
+    def test_unreadable_file(self):
+        self.path = os.path.join(self.temp_dir, "schedule.db")
+        with open(self.path, "w") as f:
+            f.write("not a database")
+        code, out, err = self.run_cli("list")
+        self.assertEqual(code, 1)
+        self.assertTrue(err)
+
+    def test_does_not_import_tkinter(self):
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run([sys.executable, "-c", "import sys, cli; print('tkinter' in sys.modules)"],
+                                cwd=package_dir, capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
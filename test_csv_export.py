@@ -0,0 +1,81 @@
+import unittest
+import os
+import csv
+import shutil
+import tempfile
+import sys
+from datetime import date
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_export import CsvExport, COLUMN_SETS, csv_rows, iter_tasks, weeks_in_range, write_csv
+from storage import WeeklyStorage
+from taskstore import new_task
+
+
+class TestCsvExport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = WeeklyStorage(os.path.join(self.temp_dir, "schedule.json"))
+        self.out = os.path.join(self.temp_dir, "export.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_rows(self):
+        with open(self.out, newline='', encoding='utf-8') as f:
+            return list(csv.reader(f))
+
+    def test_awkward_text_round_trips(self):
+        task = new_task('Call "Bob", then\nwrite report', notes="a, b; c")
+        rows = csv_rows([("2025-05-19|8:00", task)], COLUMN_SETS["Standard"])
+        write_csv(self.out, rows)
+
+        header, row = self.read_rows()
+        self.assertEqual(header[3], "Task")
+        self.assertEqual(row, ["2025-05-19", "Monday", "8:00", 'Call "Bob", then\nwrite report',
+                               "medium", "a, b; c", "No"])
+
+    def test_tasks_in_date_and_hour_order_within_range(self):
+        self.storage.append({
+            "2025-05-26|8:00": new_task("Next week"),
+            "2025-05-19|10:00": new_task("Late"),
+            "2025-05-19|9:00": new_task("Early"),
+            "2025-05-12|9:00": new_task("Before range")
+        })
+        weeks = weeks_in_range(self.storage.weeks(), date(2025, 5, 19), date(2025, 5, 31))
+        self.assertEqual(weeks, ["2025-W21", "2025-W22"])
+
+        names = [task["name"] for key, task in iter_tasks(self.storage, weeks, start=date(2025, 5, 19))]
+        self.assertEqual(names, ["Early", "Late", "Next week"])
+
+    def test_live_week_replaces_stored_week(self):
+        self.storage.append({"2025-05-19|8:00": new_task("Saved")})
+        live = {"2025-05-19|8:00": new_task("Edited")}
+        tasks = list(iter_tasks(self.storage, ["2025-W21"], "2025-W21", live))
+        self.assertEqual([task["name"] for key, task in tasks], ["Edited"])
+
+    def test_cancel_leaves_no_file(self):
+        rows = (["x"] for _ in range(10))
+        self.assertIsNone(write_csv(self.out, rows, cancelled=lambda: True))
+        self.assertFalse(os.path.exists(self.out))
+        self.assertFalse(os.path.exists(self.out + ".tmp"))
+
+    def test_export_runs_on_worker(self):
+        self.storage.append({f"2025-05-19|{hour}:00": new_task(str(hour)) for hour in range(5, 24)})
+        results = []
+        pending = []
+        job = CsvExport(lambda ms, callback: pending.append(callback), self.out, ["Task"],
+                        self.storage, ["2025-W21"], on_done=lambda count, error: results.append((count, error)))
+        job.start()
+        job._thread.join(5)
+        while pending and not results:
+            pending.pop(0)()
+
+        self.assertEqual(results, [(19, None)])
+        self.assertEqual(len(self.read_rows()), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sys
+from datetime import date
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_import import import_csv, parse_duration, parse_row
+from storage import WeeklyStorage
+from taskstore import TaskStore, new_task
+
+
+class TestCsvImport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = WeeklyStorage(os.path.join(self.temp_dir, "schedule.json"))
+        self.store = TaskStore({"2025-05-19|8:00": new_task("Existing", priority="high", notes="keep")})
+        self.path = os.path.join(self.temp_dir, "import.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, text):
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            f.write(text)
+
+    def run_import(self, policy):
+        return import_csv(self.path, self.store, self.storage, "2025-W21", policy=policy,
+                          default_week=date(2025, 5, 19))
+
+    def test_parse_row(self):
+        key, task, fields = parse_row({"Date": "2025-05-20", "Hour": "09", "Task": "Gym", "Completed": "Yes"})
+        self.assertEqual(key, "2025-05-20|9:00")
+        self.assertTrue(task["completed"])
+        self.assertEqual(fields, {"name", "completed"})
+
+        key, task, fields = parse_row({"Day": "friday", "Hour": "10:00", "Task": "Plan"}, date(2025, 5, 19))
+        self.assertEqual(key, "2025-05-23|10:00")
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration(" 90 "), 90)
+        self.assertEqual(parse_duration(""), 60)
+        self.assertEqual(parse_duration("1440"), 1440)
+        for text in ("0", "-30", "1.5", "1441", "1" + "0" * 30):
+            with self.assertRaises(ValueError):
+                parse_duration(text)
+
+    def test_invalid_rows_are_reported(self):
+        self.write('Date,Hour,Task,Priority\n'
+                   '2025-05-20,8:00,Fine,low\n'
+                   '2025-13-01,8:00,Bad date,low\n'
+                   '2025-05-20,3:00,Too early,low\n'
+                   '2025-05-20,9:00,,low\n'
+                   '2025-05-20,10:00,Odd,urgent\n')
+        report = self.run_import("skip")
+        self.assertEqual((report.added, report.invalid), (1, 4))
+        self.assertEqual([line for line, message in report.errors], [3, 4, 5, 6])
+
+    def test_conflict_policies(self):
+        self.write('Date,Hour,Task\n2025-05-19,8:00,"Imported, with comma"\n')
+        self.assertEqual(self.run_import("skip").skipped, 1)
+        self.assertEqual(self.store["2025-05-19|8:00"]["name"], "Existing")
+
+        self.assertEqual(self.run_import("merge").merged, 1)
+        task = self.store["2025-05-19|8:00"]
+        self.assertEqual((task["name"], task["priority"], task["notes"]), ("Imported, with comma", "high", "keep"))
+
+        self.assertEqual(self.run_import("replace").replaced, 1)
+        self.assertEqual(self.store["2025-05-19|8:00"]["priority"], "medium")
+
+    def test_other_weeks_go_to_storage_in_one_batch(self):
+        notifications = []
+        self.store.subscribe(notifications.append)
+        rows = "".join(f"2025-05-{day},{hour}:00,Task {day} {hour}\n" for day in (20, 21, 27) for hour in range(5, 24))
+        self.write("Date,Hour,Task\n" + rows)
+
+        report = self.run_import("skip")
+        self.assertEqual(report.added, 57)
+        self.assertEqual(len(notifications), 1)
+        self.assertEqual(len(notifications[0]), 38)
+        self.assertEqual(len(WeeklyStorage(self.storage.path).load_week("2025-W22")), 19)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import Histogram, Instrumentation, instrumented
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Worker:
+    def __init__(self, instruments, clock):
+        self.instruments = instruments
+        self.clock = clock
+
+    @instrumented("work")
+    def work(self, seconds):
+        self.clock.now += seconds
+        return [i * i for i in range(1000)]
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.instruments = Instrumentation(clock=self.clock)
+        self.worker = Worker(self.instruments, self.clock)
+
+    def test_disabled_records_nothing(self):
+        self.worker.work(0.01)
+        self.assertEqual(self.instruments.histograms, {})
+
+    def test_histogram_of_recorded_calls(self):
+        self.instruments.enabled = True
+        for seconds in (0.0005, 0.003, 0.003, 0.25, 7):
+            self.worker.work(seconds)
+
+        stats = self.instruments.to_dict()["operations"]["work"]
+        self.assertEqual(stats["count"], 5)
+        self.assertEqual(stats["p50_ms"], 3)
+        self.assertEqual(stats["max_ms"], 7000)
+        self.assertEqual(stats["buckets"]["<=1ms"], 1)
+        self.assertEqual(stats["buckets"]["<=5ms"], 2)
+        self.assertEqual(stats["buckets"]["<=500ms"], 1)
+        self.assertEqual(stats["buckets"][">5000ms"], 1)
+
+    def test_profile_next_run_only(self):
+        self.instruments.profile_next("work")
+        self.assertEqual(len(self.worker.work(0.02)), 1000)
+        profile = self.instruments.profiles["work"]
+        self.assertEqual(profile["elapsed_ms"], 20)
+        self.assertIn("work", profile["functions"])
+        # Profiling counts as a run, later runs are not profiled again
+        self.worker.work(0.5)
+        self.assertEqual(self.instruments.profiles["work"]["elapsed_ms"], 20)
+
+    def test_dump_is_json(self):
+        self.instruments.enabled = True
+        self.worker.work(0.001)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "diagnostics.json")
+            self.instruments.dump(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["operations"]["work"]["count"], 1)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_percentiles_follow_recent_samples(self):
+        histogram = Histogram()
+        self.assertEqual(histogram.percentile(0.95), 0.0)
+        for ms in range(1, 101):
+            histogram.record(ms / 1000)
+        self.assertAlmostEqual(histogram.percentile(0.95), 96)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import os
+import random
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intervals import IntervalIndex
+
+
+class TestIntervalIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = IntervalIndex()
+        self.index.add("a", 0, 60)
+        self.index.add("b", 60, 180)
+        self.index.add("c", 120, 150)
+
+    def test_overlapping_is_half_open(self):
+        self.assertEqual(self.index.overlapping(30, 61), ["a", "b"])
+        self.assertEqual(self.index.overlapping(60, 120), ["b"])
+        self.assertEqual(self.index.at(130), ["b", "c"])
+        self.assertEqual(self.index.at(180), [])
+
+    def test_remove_and_move(self):
+        self.index.remove("b")
+        self.assertEqual(self.index.at(100), [])
+        self.index.add("c", 90, 110)
+        self.assertEqual(self.index.at(100), ["c"])
+        self.assertEqual(self.index.span("c"), (90, 110))
+
+    def test_longest_shrinks_after_removal(self):
+        self.index.add("long", 1000, 5000)
+        self.index.remove("long")
+        self.assertEqual(self.index._longest, 120)
+
+    def test_matches_brute_force(self):
+        spans = {}
+        for i in range(2000):
+            start = random.randrange(0, 100000)
+            spans[str(i)] = (start, start + random.randrange(1, 300))
+        index = IntervalIndex()
+        index.rebuild(spans)
+        for _ in range(200):
+            start = random.randrange(0, 100000)
+            end = start + random.randrange(1, 500)
+            expected = {key for key, (s, e) in spans.items() if s < end and e > start}
+            self.assertEqual(set(index.overlapping(start, end)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from locking import FileLock
+
+
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "schedule.lock")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_reentrant(self):
+        lock = FileLock(self.path)
+        with lock:
+            with lock:
+                pass
+            self.assertTrue(os.path.exists(self.path))
+        # Released, so another instance gets it right away
+        with FileLock(self.path, timeout=0):
+            pass
+
+    def test_other_instance_waits(self):
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with FileLock(self.path):
+                held.set()
+                release.wait(1)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait(1)
+        with self.assertRaises(TimeoutError):
+            FileLock(self.path, timeout=0.05).acquire()
+        release.set()
+        with FileLock(self.path, timeout=1):
+            pass
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
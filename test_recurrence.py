@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+from datetime import date
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recurrence import Recurrences, make_rule, new_series, occurrences, rule_from_repeat
+from taskstore import new_task
+
+MONDAY = date(2025, 5, 19)
+
+
+class TestRules(unittest.TestCase):
+    def dates(self, rule, first, last):
+        return [day.isoformat() for day in occurrences(rule, first, last)]
+
+    def test_daily_with_interval(self):
+        rule = make_rule("daily", MONDAY, interval=3)
+        self.assertEqual(self.dates(rule, date(2025, 5, 20), date(2025, 5, 28)),
+                         ["2025-05-22", "2025-05-25", "2025-05-28"])
+
+    def test_weekdays(self):
+        rule = rule_from_repeat("Weekdays", date(2025, 5, 21))
+        self.assertEqual(self.dates(rule, MONDAY, date(2025, 5, 27)),
+                         ["2025-05-21", "2025-05-22", "2025-05-23", "2025-05-26", "2025-05-27"])
+
+    def test_weekdays_from_a_weekend(self):
+        # The start date is always the first occurrence
+        rule = rule_from_repeat("Weekdays", date(2025, 5, 24))
+        self.assertEqual(self.dates(rule, MONDAY, date(2025, 5, 27)), ["2025-05-24", "2025-05-26", "2025-05-27"])
+        self.assertEqual(self.dates(rule, date(2025, 5, 25), date(2025, 5, 27)), ["2025-05-26", "2025-05-27"])
+        rule["count"] = 2
+        self.assertEqual(self.dates(rule, MONDAY, date(2025, 12, 31)), ["2025-05-24", "2025-05-26"])
+
+    def test_every_other_week_by_day(self):
+        rule = make_rule("weekly", MONDAY, interval=2, by_day=[0, 3])
+        self.assertEqual(self.dates(rule, date(2025, 5, 20), date(2025, 6, 5)),
+                         ["2025-05-22", "2025-06-02", "2025-06-05"])
+
+    def test_only_the_window_is_expanded(self):
+        rule = rule_from_repeat("Daily", date(2000, 1, 1))
+        self.assertEqual(len(self.dates(rule, MONDAY, date(2025, 5, 25))), 7)
+
+    def test_until_count_and_exceptions(self):
+        rule = make_rule("daily", MONDAY, until=date(2025, 5, 21))
+        self.assertEqual(self.dates(rule, MONDAY, date(2025, 6, 30)), ["2025-05-19", "2025-05-20", "2025-05-21"])
+
+        rule = make_rule("weekly", MONDAY, count=3)
+        rule["exceptions"] = ["2025-05-26"]
+        # The skipped date still counts towards the three occurrences
+        self.assertEqual(self.dates(rule, MONDAY, date(2025, 12, 31)), ["2025-05-19", "2025-06-02"])
+
+
+class TestRecurrences(unittest.TestCase):
+    def setUp(self):
+        self.recurrences = Recurrences()
+        rule = rule_from_repeat("Daily", MONDAY)
+        self.series_id = self.recurrences.add(new_series(new_task("Run"), "7:00", rule))
+        self.recurrences.take_changes()
+
+    def test_expand_week(self):
+        tasks = self.recurrences.expand_week(MONDAY)
+        self.assertEqual(len(tasks), 7)
+        self.assertEqual(tasks["2025-05-20|7:00"]["series"], self.series_id)
+
+    def test_override_is_one_change(self):
+        task = dict(self.recurrences.expand_week(MONDAY)["2025-05-20|7:00"], completed=True)
+        self.recurrences.set_override(self.series_id, "2025-05-20", task)
+        self.assertEqual(list(self.recurrences.take_changes()), [self.series_id])
+        self.assertEqual(self.recurrences[self.series_id]["overrides"], {"2025-05-20": {"completed": True}})
+
+        tasks = self.recurrences.expand_week(MONDAY)
+        self.assertTrue(tasks["2025-05-20|7:00"]["completed"])
+        self.assertFalse(tasks["2025-05-21|7:00"]["completed"])
+
+    def test_edit_series_and_skip(self):
+        self.recurrences.update(self.series_id, name="Swim")
+        self.recurrences.skip(self.series_id, "2025-05-22")
+        tasks = self.recurrences.expand_week(MONDAY)
+        self.assertEqual({task["name"] for task in tasks.values()}, {"Swim"})
+        self.assertNotIn("2025-05-22|7:00", tasks)
+
+    def test_snapshot_is_not_affected_by_edits(self):
+        snapshot = self.recurrences.snapshot()
+        self.recurrences.update(self.series_id, name="Swim")
+        self.assertEqual(snapshot[self.series_id]["task"]["name"], "Run")
+
+
+if __name__ == '__main__':
+    unittest.main()
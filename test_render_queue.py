@@ -0,0 +1,66 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_queue import RenderQueue, Debouncer
+
+
+class FakeLoop:
+    """Stand-in for the Tk after/after_idle/after_cancel functions"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 0
+
+    def after(self, delay_ms, callback):
+        self.next_id += 1
+        self.jobs[self.next_id] = callback
+        return self.next_id
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run(self):
+        jobs, self.jobs = self.jobs, {}
+        for callback in jobs.values():
+            callback()
+
+
+class TestRenderQueue(unittest.TestCase):
+    def setUp(self):
+        self.loop = FakeLoop()
+        self.rendered = []
+        self.queue = RenderQueue(self.loop.after_idle, self.loop.after_cancel, self.rendered.append)
+
+    def test_updates_are_coalesced(self):
+        for i in range(500):
+            self.queue.add([("Monday", f"{5 + i % 3}:00")])
+        self.assertEqual(len(self.loop.jobs), 1)
+        self.loop.run()
+        self.assertEqual(self.rendered, [{("Monday", "5:00"), ("Monday", "6:00"), ("Monday", "7:00")}])
+
+    def test_flush_renders_now(self):
+        self.queue.add([("Monday", "5:00")])
+        self.queue.flush()
+        self.assertEqual(len(self.rendered), 1)
+        self.assertEqual(self.loop.jobs, {})
+        self.queue.flush()
+        self.assertEqual(len(self.rendered), 1)
+
+    def test_debouncer_uses_latest_call(self):
+        calls = []
+        resize = Debouncer(self.loop.after, self.loop.after_cancel, calls.append)
+        for width in (100, 200, 300):
+            resize(width)
+        self.loop.run()
+        self.assertEqual(calls, [300])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from searchindex import SearchIndex, tokenize
+from taskstore import TaskStore, new_task
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.store = TaskStore({
+            "2025-05-19|8:00": new_task("Study Python", priority="high"),
+            "2025-05-19|9:00": new_task("Lunch", notes="with the python group"),
+            "2025-05-20|8:00": new_task("Gym", priority="low", completed=True)
+        })
+        self.index = SearchIndex(self.store)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Study, PYTHON!"), {"study", "python"})
+
+    def test_prefix_search(self):
+        self.assertEqual(self.index.search("py"), ["2025-05-19|8:00", "2025-05-19|9:00"])
+        self.assertEqual(self.index.search("stu py"), ["2025-05-19|8:00"])
+        self.assertEqual(self.index.search("Gym"), ["2025-05-20|8:00"])
+        self.assertEqual(self.index.search("java"), [])
+
+    def test_filters(self):
+        self.assertEqual(self.index.search("py", priority="high"), ["2025-05-19|8:00"])
+        self.assertEqual(self.index.search("", completed=True), ["2025-05-20|8:00"])
+        self.assertEqual(self.index.search("", day="2025-05-19"), ["2025-05-19|8:00", "2025-05-19|9:00"])
+
+    def test_follows_store_changes(self):
+        self.store.update("2025-05-20|8:00", name="Swimming")
+        self.assertEqual(self.index.search("gym"), [])
+        self.assertEqual(self.index.search("swim"), ["2025-05-20|8:00"])
+
+        self.store.delete("2025-05-19|8:00")
+        self.assertEqual(self.index.search("study"), [])
+        self.assertNotIn("study", self.index._tokens)
+
+        self.store.add("2025-05-21|8:00", new_task("Python meetup"))
+        self.assertEqual(self.index.search("python"), ["2025-05-19|9:00", "2025-05-21|8:00"])
+
+    def test_bulk_load_rebuilds(self):
+        self.store.load({f"2025-05-19|{i}": new_task(f"task{i}") for i in range(2000)})
+        self.assertEqual(self.index.search("task1999"), ["2025-05-19|1999"])
+        self.assertEqual(self.index.search("lunch"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
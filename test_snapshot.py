@@ -0,0 +1,106 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot import SnapshotReader, SnapshotStorage, write_snapshot, convert
+from storage import WeeklyStorage, open_storage
+from taskstore import Task, new_task
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "schedule.snap")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_and_read_lazily(self):
+        task = dict(new_task("Write report", priority="high", notes="Draft ✓"), series="s1")
+        write_snapshot(self.path, [
+            ("2025-W22", {"2025-05-26|8:00": new_task("B")}),
+            ("2025-W21", {"2025-05-19|9:00": task, "2025-05-20|8:00": new_task("C", completed=True)})
+        ])
+        reader = SnapshotReader(self.path)
+        self.assertEqual(reader.weeks(), ["2025-W21", "2025-W22"])
+        week = reader.week("2025-W21")
+        self.assertEqual(week["2025-05-19|9:00"], task)
+        self.assertTrue(week["2025-05-20|8:00"].completed)
+        self.assertEqual(reader.get("2025-05-26|8:00").name, "B")
+        self.assertIsNone(reader.get("2025-05-26|9:00"))
+        self.assertEqual(reader.week("2030-W01"), {})
+        reader.close()
+
+    def test_rejects_other_files(self):
+        with open(self.path, 'w') as f:
+            f.write('{"tasks": {}}')
+        with self.assertRaises(ValueError):
+            SnapshotReader(self.path)
+
+    def test_journal_over_snapshot(self):
+        storage = SnapshotStorage(self.path, compact_after=3)
+        self.assertIsInstance(open_storage(self.path), SnapshotStorage)
+        storage.append({"2025-05-19|8:00": new_task("A"), "2025-05-26|8:00": new_task("B")})
+        storage.append({"2025-05-26|8:00": None})
+
+        reopened = SnapshotStorage(self.path, compact_after=3)
+        self.assertEqual(reopened.weeks(), ["2025-W21"])
+        self.assertEqual(reopened.get("2025-05-19|8:00").name, "A")
+        self.assertTrue(reopened.needs_compaction("2025-W21"))
+        self.assertEqual(reopened.due_for_compaction({"2025-05-27|8:00": None}), {"2025-W22"})
+
+        reopened.compact("2025-W21", {"2025-05-19|8:00": Task("A2")})
+        self.assertFalse(os.path.exists(f"{self.path}.journal"))
+        self.assertEqual(SnapshotStorage(self.path).load_week("2025-W21"), {"2025-05-19|8:00": Task("A2")})
+        storage.close()
+        reopened.close()
+
+    def test_instances_share_a_snapshot(self):
+        first = SnapshotStorage(self.path)
+        second = SnapshotStorage(self.path)
+        first.append({"2025-05-19|8:00": new_task("A")})
+        stamp = second.stamp("2025-W21")
+        self.assertEqual(list(second.load_week("2025-W21")), ["2025-05-19|8:00"])
+
+        first.append({"2025-05-19|9:00": new_task("B")})
+        self.assertIsNone(second.changes_since("2025-W21", stamp)[1])
+        self.assertEqual(second.get("2025-05-19|9:00").name, "B")
+
+        # Compacting second's stale copy of the week keeps first's task
+        second.append({"2025-05-19|10:00": new_task("C")})
+        second.compact("2025-W21", {"2025-05-19|8:00": Task("A"), "2025-05-19|10:00": Task("C")})
+        self.assertEqual(sorted(first.load_week("2025-W21")), ["2025-05-19|10:00", "2025-05-19|8:00", "2025-05-19|9:00"])
+
+        # Same for a copy from read_week(), which leaves nothing noted
+        third = SnapshotStorage(self.path)
+        stamp = third.stamp("2025-W22")
+        tasks = third.read_week("2025-W22")
+        self.assertEqual(third._seen, {})
+        first.append({"2025-05-26|8:00": new_task("D")})
+        third.compact("2025-W22", tasks, stamp)
+        self.assertEqual(list(first.load_week("2025-W22")), ["2025-05-26|8:00"])
+        first.close()
+        second.close()
+        third.close()
+
+    def test_convert_from_json(self):
+        source = WeeklyStorage(os.path.join(self.temp_dir, "schedule.json"))
+        source.append({"2025-05-19|8:00": new_task("A"), "2025-06-02|8:00": new_task("B")})
+        source.append_series({"s1": {"rule": "daily"}})
+
+        self.assertEqual(convert(source.path, self.path), 2)
+        storage = SnapshotStorage(self.path)
+        self.assertEqual(dict(storage.iter_weeks()),
+                         {week: {key: Task.from_dict(task) for key, task in tasks.items()}
+                          for week, tasks in source.iter_weeks()})
+        self.assertEqual(storage.load_series(), {"s1": {"rule": "daily"}})
+        storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
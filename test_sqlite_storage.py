@@ -0,0 +1,90 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sys
+from datetime import date
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_storage import SqliteStorage, migrate
+from storage import WeeklyStorage, open_storage
+from taskstore import new_task
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "schedule.db")
+        self.storage = SqliteStorage(self.path)
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_backend_is_chosen_by_extension(self):
+        self.assertIsInstance(open_storage(os.path.join(self.temp_dir, "other.sqlite")), SqliteStorage)
+        self.assertIsInstance(open_storage(os.path.join(self.temp_dir, "other.json")), WeeklyStorage)
+
+    def test_append_update_and_delete(self):
+        self.storage.append({"2025-05-19|8:00": new_task("A"), "2025-05-26|8:00": new_task("B")})
+        self.storage.append({"2025-05-19|8:00": new_task("A2"), "2025-05-26|8:00": None})
+
+        reopened = SqliteStorage(self.path)
+        self.assertEqual(reopened.weeks(), ["2025-W21"])
+        self.assertEqual(reopened.load_week("2025-W21")["2025-05-19|8:00"]["name"], "A2")
+        reopened.close()
+
+    def test_compact_replaces_one_week(self):
+        self.storage.append({"2025-05-19|8:00": new_task("A"), "2025-05-26|8:00": new_task("B")})
+        self.storage.compact("2025-W21", {"2025-05-20|9:00": new_task("C")})
+        self.assertEqual(list(self.storage.load_week("2025-W21")), ["2025-05-20|9:00"])
+        self.assertEqual(list(self.storage.load_week("2025-W22")), ["2025-05-26|8:00"])
+
+    def test_query_by_range_priority_and_status(self):
+        self.storage.append({
+            "2025-05-19|8:00": new_task("Open high", priority="high"),
+            "2025-05-19|9:00": new_task("Done high", priority="high", completed=True),
+            "2025-05-20|8:00": new_task("Open low", priority="low"),
+            "2025-06-02|8:00": new_task("Next month", priority="high")
+        })
+        tasks = self.storage.query(date(2025, 5, 1), date(2025, 5, 31), priority="high", completed=False)
+        self.assertEqual([task["name"] for task in tasks.values()], ["Open high"])
+
+    def test_queries_use_indexes(self):
+        plan = self.storage.explain("SELECT key FROM tasks WHERE completed = 0 AND priority = 'high' "
+                                    "AND day >= '2025-05-01' AND day <= '2025-05-31'")
+        self.assertIn("tasks_by_status", plan)
+        self.assertIn("tasks_by_week", self.storage.explain("SELECT key FROM tasks WHERE week = '2025-W21'"))
+
+    def test_series_round_trip(self):
+        self.storage.append_series({"a": {"task": {"name": "Gym"}}, "b": {"task": {"name": "Call"}}})
+        self.storage.append_series({"b": None})
+        self.assertEqual(list(self.storage.load_series()), ["a"])
+
+    def test_key_without_date_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.storage.append({"Monday|8:00": new_task("A")})
+
+    def test_not_a_database(self):
+        path = os.path.join(self.temp_dir, "broken.db")
+        with open(path, 'w') as f:
+            f.write("this is not a database" * 100)
+        with self.assertRaises(ValueError):
+            SqliteStorage(path)
+
+    def test_migrate_from_json(self):
+        source = os.path.join(self.temp_dir, "schedule.json")
+        weekly = WeeklyStorage(source)
+        weekly.append({"2025-05-19|8:00": new_task("A"), "2025-05-26|8:00": new_task("B")})
+        weekly.append_series({"a": {"task": {"name": "Gym"}}})
+
+        self.assertEqual(migrate(source, self.path), 2)
+        self.assertEqual(self.storage.weeks(), ["2025-W21", "2025-W22"])
+        self.assertEqual(self.storage.load_week("2025-W22")["2025-05-26|8:00"]["name"], "B")
+        self.assertEqual(list(self.storage.load_series()), ["a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
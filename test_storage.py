@@ -0,0 +1,184 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import sys
+from datetime import date
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JournalStorage, WeeklyStorage, atomic_write_json
+from taskstore import new_task, week_id
+
+
+class TestJournalStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "schedule.json")
+        self.storage = JournalStorage(self.path, compact_after=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_missing_file(self):
+        self.assertEqual(self.storage.load(), {})
+
+    def test_load_legacy_format(self):
+        with open(self.path, 'w') as f:
+            json.dump({"Monday|8:00": "Test Task"}, f)
+        tasks = self.storage.load()
+        self.assertEqual(tasks["Monday|8:00"]["name"], "Test Task")
+
+    def test_append_and_replay(self):
+        atomic_write_json(self.path, {"tasks": {"Monday|8:00": new_task("A")}})
+        self.storage.append({"Tuesday|9:00": new_task("B")})
+        self.storage.append({"Monday|8:00": None})
+
+        tasks = JournalStorage(self.path).load()
+        self.assertEqual(list(tasks), ["Tuesday|9:00"])
+        # The snapshot itself was never rewritten
+        with open(self.path) as f:
+            self.assertIn("Monday|8:00", json.load(f)["tasks"])
+
+    def test_torn_journal_tail_is_ignored(self):
+        self.storage.append({"Monday|8:00": new_task("A")})
+        with open(self.storage.journal_path, 'a') as f:
+            f.write('{"op":"put","key":"Tuesday|9:00","ta')
+
+        tasks = self.storage.load()
+        self.assertEqual(list(tasks), ["Monday|8:00"])
+
+        # Appends after recovery land on a clean line
+        self.storage.append({"Friday|10:00": new_task("C")})
+        self.assertEqual(sorted(JournalStorage(self.path).load()), ["Friday|10:00", "Monday|8:00"])
+
+    def test_compaction(self):
+        tasks = {}
+        for hour in ("8:00", "9:00", "10:00"):
+            key = f"Monday|{hour}"
+            tasks[key] = new_task(hour)
+            self.storage.append({key: tasks[key]})
+        self.assertTrue(self.storage.needs_compaction())
+
+        self.storage.compact(tasks)
+        self.assertFalse(self.storage.needs_compaction())
+        self.assertFalse(os.path.exists(self.storage.journal_path))
+        self.assertEqual(sorted(JournalStorage(self.path).load()), sorted(tasks))
+
+
+class TestWeeklyStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "schedule.json")
+        self.storage = WeeklyStorage(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_missing_file_is_not_created_by_loading(self):
+        self.assertEqual(self.storage.load_week("2025-W21"), {})
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_append_goes_to_week_shards(self):
+        self.storage.append({
+            "2025-05-19|8:00": new_task("A"),
+            "2025-05-26|8:00": new_task("B")
+        })
+        self.assertEqual(self.storage.weeks(), ["2025-W21", "2025-W22"])
+
+        reopened = WeeklyStorage(self.path)
+        self.assertEqual(list(reopened.load_week("2025-W21")), ["2025-05-19|8:00"])
+        self.assertEqual(list(reopened.load_week("2025-W22")), ["2025-05-26|8:00"])
+
+    def test_loading_a_week_only_reads_its_shard(self):
+        self.storage.append({"2025-05-19|8:00": new_task("A"), "2025-05-26|8:00": new_task("B")})
+        reopened = WeeklyStorage(self.path)
+        with patch.object(JournalStorage, "load", autospec=True, return_value={}) as load:
+            reopened.load_week("2025-W21")
+        self.assertEqual([call[0][0].path for call in load.call_args_list], [reopened.shard("2025-W21").path])
+
+    def test_legacy_file_is_migrated(self):
+        with open(self.path, 'w') as f:
+            json.dump({"tasks": {"Tuesday|11:00": new_task("Legacy")}}, f)
+
+        week = week_id(date.today())
+        tasks = self.storage.load_week(week)
+        self.assertEqual([task["name"] for task in tasks.values()], ["Legacy"])
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["format"], "weekly-shards")
+
+        # The migration only happens once
+        self.assertEqual(WeeklyStorage(self.path).load_week(week), tasks)
+
+    def test_compaction_is_per_week(self):
+        storage = WeeklyStorage(self.path, compact_after=2)
+        changes = {"2025-05-19|8:00": new_task("A"), "2025-05-19|9:00": new_task("B"), "2025-05-26|8:00": new_task("C")}
+        self.assertEqual(storage.due_for_compaction(changes), {"2025-W21"})
+
+    def test_key_without_date_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.storage.append({"Monday|8:00": new_task("A")})
+
+    def test_changes_since_reads_only_new_lines(self):
+        self.storage.append({"2025-05-19|8:00": new_task("A")})
+        other = WeeklyStorage(self.path)
+        stamp = other.stamp("2025-W21")
+        self.assertEqual(other.changes_since("2025-W21", stamp), (stamp, {}))
+
+        task = new_task("B")
+        self.storage.append({"2025-05-19|9:00": task, "2025-05-19|8:00": None})
+        stamp, changes = other.changes_since("2025-W21", stamp)
+        self.assertEqual(changes, {"2025-05-19|9:00": task, "2025-05-19|8:00": None})
+        self.assertEqual(other.changes_since("2025-W21", stamp), (stamp, {}))
+
+        # A new snapshot has to be read as a whole
+        self.storage.compact("2025-W21", {"2025-05-19|9:00": new_task("B")})
+        self.assertIsNone(other.changes_since("2025-W21", stamp)[1])
+
+    def test_half_written_line_is_read_once_complete(self):
+        self.storage.append({"2025-05-19|8:00": new_task("A")})
+        stamp = self.storage.stamp("2025-W21")
+        line = json.dumps({"op": "delete", "key": "2025-05-19|8:00"}) + "\n"
+        journal = self.storage.shard("2025-W21").journal_path
+        with open(journal, 'a') as f:
+            f.write(line[:10])
+        stamp, changes = self.storage.changes_since("2025-W21", stamp)
+        self.assertEqual(changes, {})
+        with open(journal, 'a') as f:
+            f.write(line[10:])
+        self.assertEqual(self.storage.changes_since("2025-W21", stamp)[1], {"2025-05-19|8:00": None})
+
+    def test_compaction_keeps_changes_of_other_instances(self):
+        self.storage.append({"2025-05-19|8:00": new_task("A")})
+        tasks = self.storage.load_week("2025-W21")
+        WeeklyStorage(self.path).append({"2025-05-19|9:00": new_task("B")})
+
+        # This instance's copy of the week misses B, the files are folded instead
+        tasks["2025-05-19|10:00"] = new_task("C")
+        self.storage.append({"2025-05-19|10:00": tasks["2025-05-19|10:00"]})
+        self.storage.compact("2025-W21", tasks)
+        self.assertEqual(sorted(WeeklyStorage(self.path).load_week("2025-W21")),
+                         ["2025-05-19|10:00", "2025-05-19|8:00", "2025-05-19|9:00"])
+
+        # Without writes of others the caller's copy is written
+        self.storage.compact("2025-W21", {"2025-05-19|8:00": new_task("A2")})
+        self.assertEqual([task["name"] for task in WeeklyStorage(self.path).load_week("2025-W21").values()], ["A2"])
+
+    def test_read_week_notes_nothing_and_compact_takes_its_stamp(self):
+        self.storage.append({"2025-05-19|8:00": new_task("A")})
+        reader = WeeklyStorage(self.path)
+        stamp = reader.stamp("2025-W21")
+        tasks = reader.read_week("2025-W21")
+        self.assertEqual(reader._seen, {})
+        self.storage.append({"2025-05-19|9:00": new_task("B")})
+
+        # The copy read at stamp misses B, the files are folded instead
+        reader.compact("2025-W21", tasks, stamp)
+        self.assertEqual(sorted(reader.load_week("2025-W21")), ["2025-05-19|8:00", "2025-05-19|9:00"])
+
+
+if __name__ == '__main__':
+    unittest.main()
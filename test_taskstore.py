@@ -0,0 +1,185 @@
+import unittest
+import os
+import sys
+from datetime import date
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskstore import (TaskStore, Task, Priority, Repeat, make_key, split_key, new_task, date_key, week_id, week_start,
+                       key_week, migrate_legacy_tasks, moment, parse_created, format_created)
+
+
+class TestTaskStore(unittest.TestCase):
+    def setUp(self):
+        self.store = TaskStore()
+        self.changes = []
+        self.store.subscribe(self.changes.append)
+
+    def test_keys(self):
+        self.assertEqual(make_key("Monday", "8:00"), "Monday|8:00")
+        self.assertEqual(split_key("Monday|8:00"), ("Monday", "8:00"))
+
+    def test_add_get_delete(self):
+        self.store.add("Monday|8:00", new_task("Study"))
+        self.assertIn("Monday|8:00", self.store)
+        self.assertEqual(self.store["Monday|8:00"]["name"], "Study")
+        self.assertEqual(len(self.store), 1)
+
+        removed = self.store.delete("Monday|8:00")
+        self.assertEqual(removed["name"], "Study")
+        self.assertNotIn("Monday|8:00", self.store)
+        self.assertIsNone(self.store.delete("Monday|8:00"))
+
+    def test_update_reindexes(self):
+        self.store.add("Monday|8:00", new_task("Study", priority="low"))
+        self.store.update("Monday|8:00", priority="high", completed=True)
+        self.assertEqual(self.store.query(priority="low"), [])
+        self.assertEqual(self.store.query(priority="high"), ["Monday|8:00"])
+        self.assertEqual(self.store.query(completed=True), ["Monday|8:00"])
+        self.assertEqual(self.store.query(completed=False), [])
+
+    def test_update_missing_raises(self):
+        with self.assertRaises(KeyError):
+            self.store.update("Monday|8:00", name="Nope")
+
+    def test_query_intersects_indexes(self):
+        self.store.add("Monday|8:00", new_task("A", priority="high"))
+        self.store.add("Monday|9:00", new_task("B", priority="low"))
+        self.store.add("Tuesday|8:00", new_task("C", priority="high"))
+        self.assertEqual(self.store.query(day="Monday"), ["Monday|8:00", "Monday|9:00"])
+        self.assertEqual(self.store.query(hour="8:00", priority="high"), ["Monday|8:00", "Tuesday|8:00"])
+        self.assertEqual(self.store.query(day="Monday", priority="high"), ["Monday|8:00"])
+        self.assertEqual(self.store.query(day="Sunday"), [])
+
+    def test_listener_changes(self):
+        self.store.add("Monday|8:00", new_task("A"))
+        self.store.update("Monday|8:00", name="B")
+        self.store.delete("Monday|8:00")
+        self.assertEqual([len(c) for c in self.changes], [1, 1, 1])
+        key, old, new = self.changes[0][0]
+        self.assertIsNone(old)
+        self.assertEqual(new["name"], "A")
+        key, old, new = self.changes[2][0]
+        self.assertEqual(old["name"], "B")
+        self.assertIsNone(new)
+
+    def test_batch_notifies_once(self):
+        with self.store.batch():
+            for day in ("Monday", "Tuesday", "Wednesday"):
+                self.store.add(make_key(day, "8:00"), new_task("Gym"))
+        self.assertEqual(len(self.changes), 1)
+        self.assertEqual(len(self.changes[0]), 3)
+
+    def test_load_replaces_contents(self):
+        self.store.add("Monday|8:00", new_task("Old"))
+        self.store.load({"Friday|10:00": new_task("New")})
+        self.assertEqual(list(self.store.keys()), ["Friday|10:00"])
+        self.assertEqual(self.store.query(day="Monday"), [])
+        deleted = [c for c in self.changes[-1] if c[2] is None]
+        self.assertEqual(deleted[0][0], "Monday|8:00")
+
+    def test_dirty_tracking(self):
+        self.store.load({"Monday|8:00": new_task("A")})
+        self.assertFalse(self.store.is_dirty)
+        version = self.store.version
+
+        self.store.update("Monday|8:00", priority="high")
+        self.store.add("Tuesday|9:00", new_task("B"))
+        self.store.delete("Tuesday|9:00")
+        self.assertTrue(self.store.is_dirty)
+        self.assertEqual(self.store.dirty_keys(), {"Monday|8:00", "Tuesday|9:00"})
+        self.assertEqual(self.store.version, version + 3)
+
+        changes = self.store.take_changes()
+        self.assertEqual(changes["Monday|8:00"]["priority"], "high")
+        self.assertIsNone(changes["Tuesday|9:00"])
+        self.assertFalse(self.store.is_dirty)
+
+        self.store.mark_dirty(changes)
+        self.assertEqual(self.store.dirty_keys(), set(changes))
+
+    def test_week_helpers(self):
+        self.assertEqual(week_start(date(2025, 5, 23)), date(2025, 5, 19))
+        self.assertEqual(week_id(date(2025, 5, 23)), "2025-W21")
+        # ISO weeks can belong to the neighbouring year
+        self.assertEqual(week_id(date(2024, 12, 30)), "2025-W01")
+        self.assertEqual(key_week(date_key(date(2025, 5, 23), "8:00")), "2025-W21")
+        self.assertIsNone(key_week("Monday|8:00"))
+
+    def test_query_by_week(self):
+        self.store.add("2025-05-19|8:00", new_task("A"))
+        self.store.add("2025-05-26|8:00", new_task("B"))
+        self.assertEqual(self.store.query(week="2025-W21"), ["2025-05-19|8:00"])
+        self.store.delete("2025-05-19|8:00")
+        self.assertEqual(self.store.query(week="2025-W21"), [])
+
+    def test_migrate_legacy_tasks(self):
+        tasks = migrate_legacy_tasks({"Tuesday|11:00": new_task("A")}, date(2025, 5, 19))
+        self.assertEqual(list(tasks), ["2025-05-20|11:00"])
+
+    def test_stored_task_is_a_copy(self):
+        task = new_task("A")
+        self.store.add("Monday|8:00", task)
+        task["name"] = "Changed"
+        self.assertEqual(self.store["Monday|8:00"]["name"], "A")
+
+    def test_durations_and_conflicts(self):
+        day = date(2025, 5, 19)
+        self.store.load({
+            "2025-05-19|8:00": new_task("Meeting", duration=120),
+            "2025-05-19|9:00": new_task("Call"),
+            "2025-05-19|11:00": new_task("Lunch"),
+            "Monday|8:00": new_task("Undated")
+        })
+        self.assertEqual(self.store.at(moment(day, 9 * 60 + 30)), ["2025-05-19|8:00", "2025-05-19|9:00"])
+        self.assertEqual(self.store.conflicts("2025-05-19|9:00"), ["2025-05-19|8:00"])
+        self.assertEqual(self.store.conflicts("Monday|8:00"), [])
+
+        # A change can be checked before it is made
+        longer = dict(self.store["2025-05-19|8:00"], duration=240)
+        self.assertEqual(self.store.conflicts("2025-05-19|8:00", longer), ["2025-05-19|9:00", "2025-05-19|11:00"])
+
+        self.store.update("2025-05-19|8:00", duration=60)
+        self.assertEqual(self.store.conflicts("2025-05-19|9:00"), [])
+        self.store.delete("2025-05-19|11:00")
+        self.assertEqual(self.store.at(moment(day, 11 * 60)), [])
+
+
+class TestTask(unittest.TestCase):
+    def test_round_trip(self):
+        data = new_task("Write report", priority="high")
+        data["notes"] = "Draft first"
+        task = Task.from_dict(data)
+        self.assertIs(task.priority, Priority.HIGH)
+        self.assertIs(task.repeat, Repeat.NONE)
+        self.assertEqual(task.to_dict(), data)
+        self.assertEqual(format_created(parse_created(data["created"])), data["created"])
+
+    def test_mapping_view(self):
+        task = Task.from_dict(new_task("Call"))
+        self.assertEqual(task["name"], "Call")
+        self.assertEqual(task.get("missing", 1), 1)
+        self.assertEqual(dict(task), task.to_dict())
+        self.assertEqual(task, task.to_dict())
+        with self.assertRaises(AttributeError):
+            task.other = 1
+
+    def test_replace_and_coerce(self):
+        task = Task.from_dict(new_task("Call"))
+        done = task.replace(completed=True, priority="low")
+        self.assertFalse(task.completed)
+        self.assertTrue(done.completed)
+        self.assertIs(done.priority, Priority.LOW)
+        self.assertIs(Task.coerce(task), task)
+        self.assertIs(Repeat("daily"), Repeat.DAILY)
+        with self.assertRaises(ValueError):
+            Repeat("Hourly")
+
+    def test_bad_created_time_is_dropped(self):
+        data = dict(new_task("Call"), created="yesterday")
+        self.assertEqual(Task.from_dict(data)["created"], "")
+
+
+if __name__ == '__main__':
+    unittest.main()
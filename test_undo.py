@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from undo import UndoLog
+
+
+class TestUndoLog(unittest.TestCase):
+    def setUp(self):
+        self.values = {}
+        self.log = UndoLog(self.apply)
+
+    def apply(self, changes):
+        for kind, key, value in changes:
+            self.set(key, value)
+
+    def set(self, key, value):
+        self.log.record("task", key, self.values.get(key), value)
+        if value is None:
+            self.values.pop(key, None)
+        else:
+            self.values[key] = value
+
+    def test_group_is_one_step(self):
+        self.set("a", "outside")  # Not recorded
+        with self.log.group("bulk"):
+            for key in "bcd":
+                self.set(key, key)
+            self.set("a", "changed")
+            self.set("a", "again")
+        self.assertEqual(self.log.undo_label(), "bulk")
+
+        self.assertEqual(self.log.undo(), "bulk")
+        self.assertEqual(self.values, {"a": "outside"})
+        self.assertIsNone(self.log.undo())
+        self.assertEqual(self.log.redo(), "bulk")
+        self.assertEqual(self.values, {"a": "again", "b": "b", "c": "c", "d": "d"})
+
+    def test_new_step_clears_redo(self):
+        with self.log.group("first"):
+            self.set("a", 1)
+        self.log.undo()
+        self.assertTrue(self.log.can_redo())
+        with self.log.group("second"):
+            self.set("b", 2)
+        self.assertFalse(self.log.can_redo())
+
+    def test_unchanged_group_is_no_step(self):
+        self.set("a", 1)
+        with self.log.group("nothing"):
+            self.set("a", 2)
+            self.set("a", 1)
+        self.assertFalse(self.log.can_undo())
+
+    def test_oldest_steps_are_dropped(self):
+        log = UndoLog(self.apply, limit=2)
+        self.log = log
+        for value in range(3):
+            with log.group(str(value)):
+                self.set("a", value)
+        self.assertEqual([log.undo(), log.undo(), log.undo()], ["2", "1", None])
+        self.assertEqual(self.values, {"a": 0})
+
+        # A step larger than the budget can't be kept
+        log = UndoLog(self.apply, budget=1000)
+        self.log = log
+        with log.group("big"):
+            for key in range(100):
+                self.set(key, "x" * 100)
+        self.assertFalse(log.can_undo())
+        self.assertEqual(log.size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import virtual_list
+from virtual_list import VirtualList, clamp_top, scrollbar_range, visible_rows
+
+ROW_HEIGHT = 20
+
+
+class FakeWidget:
+    """Stand-in for the Tk frames, labels and scrollbar of the list"""
+
+    def __init__(self, *args, **kwargs):
+        self.placed = None
+        self.jobs = {}
+        self.scrolled = None
+
+    def pack(self, **kwargs):
+        pass
+
+    def bind(self, *args):
+        pass
+
+    def configure(self, **options):
+        pass
+
+    def place(self, **geometry):
+        self.placed = geometry
+
+    def place_forget(self):
+        self.placed = None
+
+    def set(self, first, last):
+        self.scrolled = (first, last)
+
+    def after(self, delay_ms, callback):
+        job = len(self.jobs) + 1
+        self.jobs[job] = callback
+        return job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run_jobs(self):
+        jobs, self.jobs = self.jobs, {}
+        for callback in jobs.values():
+            callback()
+
+
+class TestGeometry(unittest.TestCase):
+    def test_visible_rows(self):
+        self.assertEqual(visible_rows(200, ROW_HEIGHT), 11)
+        self.assertEqual(visible_rows(210, ROW_HEIGHT), 11)
+        self.assertEqual(visible_rows(0, ROW_HEIGHT), 1)
+
+    def test_clamp_top(self):
+        self.assertEqual(clamp_top(-5, 100, 11), 0)
+        self.assertEqual(clamp_top(42.7, 100, 11), 42)
+        # The last item ends up in the last fully visible slot
+        self.assertEqual(clamp_top(1000, 100, 11), 90)
+        # Fewer items than slots never scroll
+        self.assertEqual(clamp_top(3, 5, 11), 0)
+
+    def test_scrollbar_range(self):
+        self.assertEqual(scrollbar_range(0, 11, 0), (0.0, 1.0))
+        self.assertEqual(scrollbar_range(0, 11, 5), (0.0, 1.0))
+        self.assertEqual(scrollbar_range(50, 10, 100), (0.5, 0.6))
+
+
+class TestVirtualList(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.multiple(virtual_list.tk, Frame=FakeWidget)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.multiple(virtual_list.ttk, Frame=FakeWidget, Scrollbar=FakeWidget, Label=FakeWidget)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.made = 0
+        self.completed = []
+        self.list = VirtualList(None, ROW_HEIGHT, self.make_row, self.fill_row, page_size=100)
+        self.list.on_complete = self.completed.append
+
+    def make_row(self, parent):
+        self.made += 1
+        return SimpleNamespace(frame=FakeWidget(), item=None)
+
+    def fill_row(self, row, item):
+        row.item = item
+
+    def resize(self, height):
+        self.list._on_resize(SimpleNamespace(height=height))
+
+    def shown(self):
+        return [row.item for row in self.list._rows if row.frame.placed is not None]
+
+    def test_streams_a_page_per_turn(self):
+        self.list.set_items(iter(range(250)))
+        self.assertEqual(len(self.list.items), 100)
+        self.list.body.run_jobs()
+        self.assertEqual(len(self.list.items), 200)
+        self.assertEqual(self.completed, [])
+        self.list.body.run_jobs()
+        self.assertEqual(len(self.list.items), 250)
+        self.assertEqual(self.completed, [250])
+        self.assertEqual(self.list.body.jobs, {})
+
+    def test_source_ending_on_a_page_boundary(self):
+        self.list.set_items(range(200))
+        self.list.body.run_jobs()
+        self.list.body.run_jobs()
+        self.assertEqual(self.completed, [200])
+
+    def test_new_items_cancel_the_stream(self):
+        self.list.set_items(range(1000))
+        self.list.set_items(["a", "b"])
+        self.list.body.run_jobs()
+        self.assertEqual(self.list.items, ["a", "b"])
+        self.assertEqual(self.completed, [2])
+
+    def test_rows_are_pooled_and_recycled(self):
+        self.resize(100)
+        self.list.set_items(range(50))
+        self.assertEqual(self.made, visible_rows(100, ROW_HEIGHT))
+        self.assertEqual(self.shown(), list(range(6)))
+        self.list.scroll(10)
+        self.assertEqual(self.shown(), list(range(10, 16)))
+        self.assertEqual(self.list._rows[0].frame.placed["y"], 0)
+        # No new rows for scrolling, and none for shrinking the window
+        self.resize(60)
+        self.assertEqual(self.made, 6)
+        self.assertEqual(self.shown(), list(range(10, 14)))
+
+    def test_scrolling_is_clamped(self):
+        self.resize(100)
+        self.list.set_items(range(50))
+        self.list.scroll(-3)
+        self.assertEqual(self.list.top, 0)
+        self.list._on_scrollbar("moveto", "1.0")
+        self.assertEqual(self.list.top, clamp_top(50, 50, 6))
+        # The last item fills the last full row, the partly shown one stays empty
+        self.assertEqual(self.shown(), list(range(45, 50)))
+        self.list._on_scrollbar("scroll", "-1", "pages")
+        self.assertEqual(self.list.top, 45 - 5)
+
+    def test_fewer_items_than_rows(self):
+        self.resize(100)
+        self.list.set_items(["a", "b"])
+        self.assertEqual(self.shown(), ["a", "b"])
+        self.assertEqual(self.list.scrollbar.scrolled, (0.0, 1.0))
+        self.list.show_message("No matches")
+        self.assertEqual(self.shown(), [])
+        self.assertIsNotNone(self.list.message.placed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add the parent directory to sys.path to import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from week_cache import WeekCache
+
+
+class TestWeekCache(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+        self.cache = WeekCache(self.load, capacity=2)
+
+    def load(self, week):
+        self.loads.append(week)
+        return {f"{week}|8:00": week}
+
+    def test_get_loads_once(self):
+        self.assertEqual(self.cache.get("W1"), {"W1|8:00": "W1"})
+        self.cache.get("W1")
+        self.assertEqual(self.loads, ["W1"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_least_recently_used_week_is_evicted(self):
+        self.cache.get("W1")
+        self.cache.get("W2")
+        self.cache.get("W1")
+        self.cache.get("W3")
+        self.assertIn("W1", self.cache)
+        self.assertNotIn("W2", self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_pinned_week_is_kept(self):
+        self.cache.put("W1", {"edited": True})
+        self.cache.pin(["W1"])
+        self.cache.get("W2")
+        self.cache.get("W3")
+        self.assertEqual(self.cache.peek("W1"), {"edited": True})
+        self.assertNotIn("W2", self.cache)
+
+        self.cache.unpin(["W1"])
+        self.cache.get("W4")
+        self.assertNotIn("W1", self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_prefetch_loads_in_background(self):
+        self.cache.prefetch(["W1", "W2"])
+        for _ in range(100):
+            if len(self.cache) == 2:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(sorted(self.loads), ["W1", "W2"])
+        self.cache.get("W1")
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_prefetch_does_not_overwrite_newer_content(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_load(week):
+            started.set()
+            release.wait(1)
+            return {"from": "storage"}
+
+        cache = WeekCache(slow_load)
+        cache.prefetch(["W1"])
+        started.wait(1)
+        cache.put("W1", {"from": "editor"})
+        release.set()
+        cache.prefetch(["W2"])
+        for _ in range(100):
+            if "W2" in cache:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(cache.get("W1"), {"from": "editor"})
+
+    def test_drop_changed(self):
+        stamps = {"W1": 1, "W2": 1}
+        cache = WeekCache(self.load, stamp=stamps.get)
+        cache.get("W1")
+        cache.get("W2")
+        cache.put("W3", {"edited": True})  # No stamp, kept
+        stamps["W1"] = 2
+        self.assertEqual(cache.drop_changed(), ["W1"])
+        self.assertNotIn("W1", cache)
+        self.assertIn("W3", cache)
+
+        stamps["W2"] = 2
+        self.assertEqual(cache.drop_changed(keep={"W2"}), [])
+        cache.get("W1")
+        self.assertEqual(cache.stamp_of("W1"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
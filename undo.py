@@ -0,0 +1,144 @@
+import sys
+from collections import deque
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+# Most steps kept for undo and redo together
+UNDO_LIMIT = 200
+# Approximate bytes the recorded steps may hold before the oldest are dropped
+UNDO_MEMORY_BUDGET = 4 * 1024 * 1024
+
+
+def approximate_size(value):
+    """Rough bytes held by a recorded value: the object plus its direct items"""
+    if value is None:
+        return 0
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += sum(sys.getsizeof(item) for item in value.values())
+    return size
+
+
+class UndoStep:
+    """One undoable user action: its label and (kind, key, before, after) changes"""
+
+    __slots__ = ("label", "changes", "size")
+
+    def __init__(self, label, changes):
+        self.label = label
+        self.changes = changes
+        # The kind is a shared constant, the key and the values are counted
+        self.size = sum(sys.getsizeof(change) + sum(approximate_size(value) for value in change[1:])
+                        for change in changes)
+
+
+class UndoLog:
+    """Undo and redo of user actions, recorded as the values they replaced.
+
+    Changes are record()ed while a group() is open, as (kind, key, before,
+    after) for a task or a series; what happens outside a group, e.g.
+    loading a week, isn't undoable. A group is one step however many
+    changes it makes, and several changes of one key keep only the first
+    before and the last after. Tasks and series are immutable, so a step
+    holds references to them, never copies, and undoing adding a series
+    is a single change however many occurrences it had.
+
+    apply(changes) is called with (kind, key, value) to set each key back
+    (undo) or forth (redo); what it changes meanwhile isn't recorded.
+    Steps are dropped oldest first beyond limit steps or budget bytes.
+    """
+
+    def __init__(self, apply, limit=UNDO_LIMIT, budget=UNDO_MEMORY_BUDGET):
+        self.apply = apply
+        self.limit = limit
+        self.budget = budget
+        self.size = 0  # Approximate bytes of all steps
+        self._undo = deque()
+        self._redo = []
+        self._open = None  # (kind, key) -> [before, after] of the group being recorded
+        self._label = None
+        self._applying = False
+
+    @property
+    def recording(self):
+        return self._open is not None and not self._applying
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    @contextmanager
+    def group(self, label):
+        """Record the changes made inside as one step"""
+        if self._open is not None:
+            # Nested groups are part of the outer step
+            yield
+            return
+        self._open, self._label = {}, label
+        try:
+            yield
+        finally:
+            changes = [(kind, key, before, after) for (kind, key), (before, after) in self._open.items()
+                       if before != after]
+            self._open = self._label = None
+            if changes:
+                self._redo.clear()
+                self._push(self._undo, UndoStep(label, changes))
+
+    def record(self, kind, key, before, after):
+        """Note that key changed from before to after, if a group is open"""
+        if not self.recording:
+            return
+        change = self._open.get((kind, key))
+        if change is None:
+            self._open[kind, key] = [before, after]
+        else:
+            change[1] = after
+
+    def undo(self):
+        """Revert the last step and return its label, None if there is nothing to undo"""
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self.size -= step.size
+        self._run([(kind, key, before) for kind, key, before, after in reversed(step.changes)])
+        self._push(self._redo, step)
+        return step.label
+
+    def redo(self):
+        """Repeat the last undone step and return its label, None if there is nothing to redo"""
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self.size -= step.size
+        self._run([(kind, key, after) for kind, key, before, after in step.changes])
+        self._push(self._undo, step)
+        return step.label
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.size = 0
+
+    def _run(self, changes):
+        self._applying = True
+        try:
+            self.apply(changes)
+        finally:
+            self._applying = False
+
+    def _push(self, steps, step):
+        steps.append(step)
+        self.size += step.size
+        # Redo steps go first, an undo step older than the others last
+        while self.size > self.budget or len(self._undo) + len(self._redo) > self.limit:
+            oldest = self._redo.pop(0) if self._redo else self._undo.popleft()
+            self.size -= oldest.size
@@ -0,0 +1,149 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Items pulled from the source per event loop turn while streaming
+PAGE_SIZE = 200
+
+
+def visible_rows(height, row_height):
+    """Row slots needed to fill height pixels, a partly shown last row included"""
+    return height // row_height + 1
+
+
+def clamp_top(top, count, visible):
+    """top limited to the indexes the first visible row may have, the last
+    item being shown in the last fully visible slot at most"""
+    return min(max(int(top), 0), max(count - visible + 1, 0))
+
+
+def scrollbar_range(top, visible, count):
+    """(first, last) fractions of count items shown, for Scrollbar.set()"""
+    if not count:
+        return 0.0, 1.0
+    return top / count, min((top + visible) / count, 1.0)
+
+
+class VirtualList:
+    """Scrollable list that only has widgets for the rows in view.
+
+    A small pool of row widgets is created with make_row(parent) to fill the
+    visible height and reused while scrolling: fill_row(row, item) rebinds
+    a pooled row to whichever item now sits in its slot. set_items() accepts
+    any iterable and consumes it a page at a time from the event loop, so
+    the first matches show up at once even for huge or lazy sources.
+    """
+
+    def __init__(self, parent, row_height, make_row, fill_row, bg=None, page_size=PAGE_SIZE):
+        self.row_height = row_height
+        self.make_row = make_row
+        self.fill_row = fill_row
+        self.page_size = page_size
+        self.on_complete = None  # Called with the item count once streaming ends
+
+        self.frame = ttk.Frame(parent)
+        self.body = tk.Frame(self.frame, bg=bg)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.body.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.message = ttk.Label(self.body)
+
+        self.items = []
+        self.top = 0  # Index of the first visible item
+        self._rows = []  # Pool of row widgets, one per visible slot
+        self._visible = 0
+        self._source = None
+        self._stream_job = None
+
+        self.body.bind("<Configure>", self._on_resize)
+        self.bind_scroll(self.body)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind_scroll(self, widget):
+        """Make mouse wheel events over widget scroll the list"""
+        widget.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1))
+        widget.bind("<Button-4>", lambda e: self.scroll(-1))
+        widget.bind("<Button-5>", lambda e: self.scroll(1))
+
+    # Content
+
+    def set_items(self, iterable):
+        """Replace the list content, streaming it in pages"""
+        self._cancel_stream()
+        self.items = []
+        self.top = 0
+        self._source = iter(iterable)
+        self._pull_page()
+
+    def show_message(self, text):
+        """Clear the list and show a single line of text instead"""
+        self._cancel_stream()
+        self.items = []
+        self.top = 0
+        self.message.configure(text=text)
+        self.message.place(x=10, y=10)
+        self._refresh()
+
+    def _pull_page(self):
+        self._stream_job = None
+        count = len(self.items)
+        for item in self._source:
+            self.items.append(item)
+            if len(self.items) - count >= self.page_size:
+                break
+        exhausted = len(self.items) - count < self.page_size
+        self._refresh()
+        if exhausted:
+            self._source = None
+            if self.on_complete is not None:
+                self.on_complete(len(self.items))
+        else:
+            self._stream_job = self.body.after(1, self._pull_page)
+
+    def _cancel_stream(self):
+        if self._stream_job is not None:
+            self.body.after_cancel(self._stream_job)
+            self._stream_job = None
+        self._source = None
+
+    # Scrolling
+
+    def scroll(self, rows):
+        self._scroll_to(self.top + rows)
+
+    def _scroll_to(self, top):
+        top = clamp_top(top, len(self.items), self._visible)
+        if top != self.top:
+            self.top = top
+            self._refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(value) * len(self.items))
+        elif unit == "pages":
+            self.scroll(int(value) * max(self._visible - 1, 1))
+        else:
+            self.scroll(int(value))
+
+    # Drawing
+
+    def _on_resize(self, event):
+        self._visible = visible_rows(event.height, self.row_height)
+        while len(self._rows) < self._visible:
+            self._rows.append(self.make_row(self.body))
+        self._refresh()
+
+    def _refresh(self):
+        """Bind pooled rows to the items currently in view"""
+        if self.items:
+            self.message.place_forget()
+        for slot, row in enumerate(self._rows):
+            index = self.top + slot
+            if slot < self._visible and index < len(self.items):
+                self.fill_row(row, self.items[index])
+                row.frame.place(x=0, y=slot * self.row_height, relwidth=1, height=self.row_height)
+            else:
+                row.frame.place_forget()
+
+        self.scrollbar.set(*scrollbar_range(self.top, self._visible, len(self.items)))
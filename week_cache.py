@@ -0,0 +1,179 @@
+import queue
+import threading
+from collections import Counter, OrderedDict
+
+# Weeks kept decoded in memory besides the displayed one
+WEEK_CACHE_SIZE = 8
+
+
+class WeekCache:
+    """LRU cache of decoded weeks (week id -> key -> task) with background prefetch.
+
+    load(week) reads a week from storage. get() serves a week from the
+    cache or loads it on the spot, prefetch(weeks) loads weeks on a worker
+    thread ahead of time, so paging to a neighbouring week usually finds it
+    decoded already. At most capacity weeks are kept, the least recently
+    used go first, which bounds memory however far a user pages.
+
+    A week whose changes are still being written must not be read back
+    from storage, so pin() keeps it cached until unpin(). A week put() or
+    discarded while it is being prefetched keeps the newer content.
+    Cached tasks are shared, callers must not modify them.
+
+    If stamp(week) is given, it is taken before each load and kept with
+    the week, and drop_changed() forgets the weeks whose stamp has changed
+    since, e.g. because another instance wrote them.
+    """
+
+    def __init__(self, load, capacity=WEEK_CACHE_SIZE, stamp=None):
+        self.load = load
+        self.capacity = capacity
+        self.stamp = stamp
+        self.hits = 0
+        self.misses = 0
+        self._weeks = OrderedDict()  # Least recently used first
+        self._stamps = {}  # Week -> stamp as of its cached content, if known
+        self._versions = Counter()  # Week -> bumped whenever its content is replaced
+        self._epoch = 0  # Bumped by clear()
+        self._pins = Counter()
+        self._requested = {}  # Week -> version, of the weeks waiting for the prefetch worker
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._worker = None
+
+    def __len__(self):
+        return len(self._weeks)
+
+    def __contains__(self, week):
+        return week in self._weeks
+
+    def get(self, week):
+        """Tasks of week, loaded now if they aren't cached"""
+        with self._lock:
+            tasks = self._weeks.get(week)
+            if tasks is not None:
+                self._weeks.move_to_end(week)
+                self.hits += 1
+                return tasks
+            self.misses += 1
+            version = self._version(week)
+        stamp = self._stamp(week)
+        return self._add(week, self.load(week), version, stamp)
+
+    def peek(self, week):
+        """Cached tasks of week or None, without loading or counting as a use"""
+        return self._weeks.get(week)
+
+    def snapshot(self):
+        """week -> tasks of every cached week"""
+        with self._lock:
+            return dict(self._weeks)
+
+    def put(self, week, tasks, stamp=None):
+        """Cache tasks as the current content of week, e.g. when it was edited"""
+        with self._lock:
+            self._versions[week] += 1
+            self._weeks[week] = tasks
+            self._weeks.move_to_end(week)
+            self._set_stamp(week, stamp)
+            self._evict()
+
+    def discard(self, week):
+        with self._lock:
+            self._versions[week] += 1
+            self._weeks.pop(week, None)
+            self._stamps.pop(week, None)
+
+    def clear(self):
+        """Forget every week, e.g. after storage was changed behind the cache's back"""
+        with self._lock:
+            self._epoch += 1
+            self._weeks.clear()
+            self._stamps.clear()
+
+    def stamp_of(self, week):
+        """Stamp of the cached content of week, None if not known"""
+        return self._stamps.get(week)
+
+    def drop_changed(self, keep=()):
+        """Forget the cached weeks whose stamp changed, except pinned ones and keep, and return them"""
+        with self._lock:
+            stamps = [(week, stamp) for week, stamp in self._stamps.items()
+                      if not self._pins[week] and week not in keep]
+        changed = [week for week, stamp in stamps if self.stamp(week) != stamp]
+        with self._lock:
+            # Unless the week was replaced meanwhile
+            changed = [week for week, stamp in stamps if week in changed and self._stamps.get(week) == stamp]
+            for week in changed:
+                self._versions[week] += 1
+                del self._weeks[week]
+                del self._stamps[week]
+        return changed
+
+    def pin(self, weeks):
+        with self._lock:
+            self._pins.update(weeks)
+
+    def unpin(self, weeks):
+        with self._lock:
+            self._pins.subtract(weeks)
+            self._pins += Counter()  # Drop weeks that are no longer pinned
+            self._evict()
+
+    def prefetch(self, weeks):
+        """Load weeks that aren't cached yet on the worker thread"""
+        for week in weeks:
+            with self._lock:
+                version = self._version(week)
+                if week in self._weeks or self._requested.get(week) == version:
+                    continue
+                self._requested[week] = version
+                self._requests.put((week, version))
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="autodo-prefetch", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            week, version = self._requests.get()
+            with self._lock:
+                if self._requested.get(week) == version:
+                    del self._requested[week]
+                if week in self._weeks or self._version(week) != version:
+                    continue
+            try:
+                stamp = self._stamp(week)
+                tasks = self.load(week)
+            except Exception:
+                continue  # get() will load it again and report the error
+            self._add(week, tasks, version, stamp)
+
+    def _version(self, week):
+        return self._epoch, self._versions[week]
+
+    def _stamp(self, week):
+        # Taken before the load, a write in between makes the week look changed
+        return self.stamp(week) if self.stamp is not None else None
+
+    def _set_stamp(self, week, stamp):
+        if stamp is None:
+            self._stamps.pop(week, None)
+        else:
+            self._stamps[week] = stamp
+
+    def _add(self, week, tasks, version, stamp=None):
+        """Cache tasks loaded for week unless newer content arrived meanwhile, return the newest"""
+        with self._lock:
+            if week not in self._weeks and self._version(week) == version:
+                self._weeks[week] = tasks
+                self._set_stamp(week, stamp)
+                self._evict()
+            return self._weeks.get(week, tasks)
+
+    def _evict(self):
+        while len(self._weeks) > self.capacity:
+            unpinned = next((week for week in self._weeks if not self._pins[week]), None)
+            if unpinned is None:
+                break
+            del self._weeks[unpinned]
+            self._stamps.pop(unpinned, None)